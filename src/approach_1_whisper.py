@@ -3,27 +3,48 @@ Approach 1: Using OpenAI Whisper for Speech Recognition
 This approach uses Whisper which has built-in language detection
 """
 import os
+import time
 import whisper
 import torch
-import soundfile as sf
-from typing import Optional, Tuple
+import numpy as np
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+from whisper_utils import (
+    WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS,
+    prepare_audio, encode_batch, decode_features, split_windows,
+    load_decoding_profile, decode_with_profile, transcribe_options, load_configured_model,
+    load_whisper_config
+)
+from whisper_gate import NoSpeechGate
 
 class WhisperLanguageSwitch:
-    def __init__(self, model_size="base"):
+    def __init__(self, model_size="base", decoding_profile=None, quantize=False):
         """
         Initialize Whisper-based language switch
-        model_size: tiny, base, small, medium, large
+        model_size: tiny, base, small, medium, large, or auto (RTF calibration)
+        decoding_profile: realtime, balanced, archive; None reads models.whisper.decoding_profile
+            from config.yaml, "none" forces Whisper defaults
+        quantize: int8 dynamic-quantized CPU model
         """
         self.model_size = model_size
+        self.quantize = quantize
+        if decoding_profile is None:
+            decoding_profile = load_whisper_config().get("decoding_profile")
+        self.profile_name = decoding_profile if decoding_profile and decoding_profile != "none" else None
+        self.decoding_profile = load_decoding_profile(self.profile_name) if self.profile_name else None
         self.model = None
+        self.gate = None
         self.current_language = "en"
         self._load_model()
     
     def _load_model(self):
         """Load Whisper model"""
         try:
-            print(f"🔄 Loading Whisper model ({self.model_size})...")
-            self.model = whisper.load_model(self.model_size)
+            print(f"🔄 Loading Whisper model ({self.model_size}{', int8' if self.quantize else ''})...")
+            self.model, self.model_size = load_configured_model(
+                model_size=self.model_size, quantize=self.quantize
+            )
+            self.gate = NoSpeechGate(self.model)
             print("✓ Whisper model loaded successfully")
         except Exception as e:
             print(f"✗ Failed to load Whisper model: {e}")
@@ -34,15 +55,93 @@ class WhisperLanguageSwitch:
         Process audio file with Whisper
         Returns: dict with transcription, language, and confidence
         """
+        return self._transcribe(audio_path)
+    
+    def process_audio_data(self, audio_data: np.ndarray, sample_rate: int = 16000) -> dict:
+        """
+        Process audio data directly (no temporary files)
+        Windows of up to 30 s go through the no-speech gate first
+        """
+        if self.model is None:
+            return {"error": "Model not loaded"}
+        
+        try:
+            audio = prepare_audio(audio_data, sample_rate)
+        except Exception as e:
+            return {"error": f"Processing failed: {e}"}
+        
+        if len(audio) <= WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE:
+            return self._transcribe_gated(audio)
+        
+        return self._transcribe(audio)
+    
+    def _transcribe_gated(self, audio: np.ndarray) -> dict:
+        """Skip silent/noise windows; decode speech windows from the gate's encoder output"""
+        try:
+            decision = self.gate.check(audio)
+            if not decision["speech"]:
+                no_speech_prob = decision["no_speech_prob"]
+                return {
+                    "transcription": "",
+                    "language": self.current_language,
+                    "confidence": 0.0 if no_speech_prob is None else 1 - no_speech_prob,
+                    "segments": [],
+                    "skipped": decision["reason"]
+                }
+            
+            probs = decision["language_probs"]
+            language = max(probs, key=probs.get)
+            features = decision["audio_features"]
+            if self.decoding_profile:
+                result = decode_with_profile(self.model, features, self.decoding_profile, language=language)
+            else:
+                result = decode_features(self.model, features, language=language)
+            
+            # Whisper's own silence rule needs the decode's avg_logprob as well
+            if self.gate.is_silent(decision["no_speech_prob"], result.avg_logprob):
+                return {
+                    "transcription": "",
+                    "language": language,
+                    "confidence": 1 - decision["no_speech_prob"],
+                    "segments": [],
+                    "skipped": "no_speech"
+                }
+            
+            return {
+                "transcription": result.text.strip(),
+                "language": language,
+                "confidence": 1 - decision["no_speech_prob"],
+                "segments": [{"id": 0, "start": 0.0, "end": len(audio) / WHISPER_SAMPLE_RATE,
+                              "text": result.text, "no_speech_prob": decision["no_speech_prob"]}]
+            }
+        
+        except Exception as e:
+            return {"error": f"Processing failed: {e}"}
+    
+    def get_skip_stats(self) -> dict:
+        """Per-window no-speech gate statistics"""
+        if self.gate is None:
+            return {}
+        return self.gate.get_stats()
+    
+    def _transcribe(self, audio: Union[str, np.ndarray]) -> dict:
+        """
+        Run Whisper on a file path or a 16 kHz float32 array
+        Uses transcribe()'s timestamp-based seeking, so words are never cut at
+        fixed window boundaries; a decoding profile sets its beam size,
+        temperatures and thresholds
+        Returns: dict with transcription, language, and confidence
+        """
         if self.model is None:
             return {"error": "Model not loaded"}
         
         try:
-            # Transcribe with language detection
+            options = transcribe_options(self.decoding_profile) if self.decoding_profile else {}
             result = self.model.transcribe(
-                audio_path,
+                audio,
                 language=None,  # Auto-detect language
-                task="transcribe"
+                task="transcribe",
+                **options
             )
             
             detected_lang = result.get("language", "en")
@@ -63,34 +162,146 @@ class WhisperLanguageSwitch:
         except Exception as e:
             return {"error": f"Processing failed: {e}"}
     
-    def process_audio_data(self, audio_data: np.ndarray, sample_rate: int = 16000) -> dict:
+    def process_batch(self, audio_paths: List[str], batch_size: int = 8) -> Dict[str, dict]:
         """
-        Process audio data directly
+        Transcribe many files with batched encoder/decoder passes
+        Each file is cut into 30 s windows; windows from different files share a batch
+        and Whisper detects the language of every window separately.
+        Returns: dict mapping path to the same result dict as process_audio_file
         """
         if self.model is None:
-            return {"error": "Model not loaded"}
+            return {path: {"error": "Model not loaded"} for path in audio_paths}
         
-        try:
-            # Save temporary file
-            temp_path = "temp_audio.wav"
-            sf.write(temp_path, audio_data, sample_rate)
-            
-            result = self.process_audio_file(temp_path)
-            
-            # Clean up
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
+        windows = {path: [] for path in audio_paths}
+        batch = []
+        
+        for item in self._iter_windows(audio_paths):
+            if "error" in item:
+                windows[item["path"]] = item
+                continue
             
-            return result
+            batch.append(item)
+            if len(batch) == batch_size:
+                self._decode_window_batch(batch, windows)
+                batch = []
+        
+        if batch:
+            self._decode_window_batch(batch, windows)
+        
+        return {path: self._combine_windows(decoded) for path, decoded in windows.items()}
+    
+    def _iter_windows(self, audio_paths: List[str]) -> Iterator[dict]:
+        """Load files one at a time and yield their 30 s windows"""
+        for path in audio_paths:
+            try:
+                audio = whisper.load_audio(path)
+            except Exception as e:
+                yield {"path": path, "error": f"Loading failed: {e}"}
+                continue
             
+            for index, window in enumerate(split_windows(audio)):
+                yield {"path": path, "index": index, "audio": window}
+    
+    def _decode_window_batch(self, batch: List[dict], windows: Dict[str, list]):
+        """Encode and decode one batch of windows, storing results per file"""
+        try:
+            features = encode_batch(self.model, [item["audio"] for item in batch])
+            results = decode_features(self.model, features)
+            if not isinstance(results, list):
+                results = [results]
         except Exception as e:
-            return {"error": f"Processing failed: {e}"}
+            for item in batch:
+                windows[item["path"]] = {"error": f"Processing failed: {e}"}
+            return
+        
+        for item, result in zip(batch, results):
+            if isinstance(windows[item["path"]], list):
+                windows[item["path"]].append((item["index"], result, len(item["audio"]) / WHISPER_SAMPLE_RATE))
+    
+    def _combine_windows(self, decoded) -> dict:
+        """Merge per-window results into one file-level result"""
+        if isinstance(decoded, dict):
+            return decoded
+        if not decoded:
+            return {"error": "No audio"}
+        
+        decoded.sort(key=lambda pair: pair[0])
+        results = [result for _, result, _ in decoded]
+        
+        # File language = highest summed probability across windows
+        language_scores = {}
+        for result in results:
+            for lang, prob in (result.language_probs or {result.language: 1.0}).items():
+                language_scores[lang] = language_scores.get(lang, 0.0) + prob
+        detected_lang = max(language_scores, key=language_scores.get)
+        
+        no_speech = [result.no_speech_prob for result in results]
+        return {
+            "transcription": " ".join(r.text.strip() for r in results if r.text.strip()),
+            "language": detected_lang,
+            "confidence": 1 - sum(no_speech) / len(no_speech),
+            "segments": [
+                {"id": index, "start": index * WHISPER_WINDOW_SECONDS,
+                 "end": index * WHISPER_WINDOW_SECONDS + seconds,
+                 "text": result.text, "language": result.language, "no_speech_prob": result.no_speech_prob}
+                for index, result, seconds in decoded
+            ]
+        }
     
     def switch_language(self, new_language: str):
         """Manually switch language"""
         self.current_language = new_language
         print(f"Language switched to: {new_language}")
 
+def write_result(result: dict, output_path: str):
+    """Write one result in the text format used by --output"""
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(f"Language: {result['language']}\n")
+        f.write(f"Confidence: {result['confidence']:.2f}\n")
+        f.write(f"Transcription: {result['transcription']}\n")
+
+def run_batch(system: WhisperLanguageSwitch, inputs: List[str], batch_size: int, output_dir: str = None):
+    """Transcribe many files and write one result file per input"""
+    start = time.perf_counter()
+    results = system.process_batch(inputs, batch_size=batch_size)
+    elapsed = time.perf_counter() - start
+    
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+    
+    for path, result in results.items():
+        if "error" in result:
+            print(f"✗ {path}: {result['error']}")
+            continue
+        
+        print(f"[{result['language']}] {path}: {result['transcription']}")
+        if output_dir:
+            stem = os.path.splitext(os.path.basename(path))[0]
+            write_result(result, os.path.join(output_dir, f"{stem}.txt"))
+    
+    print(f"📊 {len(inputs)} files in {elapsed:.1f}s ({len(inputs) / elapsed:.2f} files/s, batch size {batch_size})")
+
+def benchmark_batch_sizes(system: WhisperLanguageSwitch, inputs: List[str], sizes=(1, 4, 8, 16)) -> dict:
+    """
+    Report batched throughput for several batch sizes against sequential decoding
+    (batch size 1: one window per encoder/decoder pass)
+    Returns: dict mapping batch size to files per second
+    """
+    audio_seconds = sum(len(whisper.load_audio(path)) for path in inputs) / 16000
+    sizes = sorted(set(sizes) | {1})
+    
+    print(f"📊 Throughput on {len(inputs)} files ({audio_seconds:.0f}s audio)")
+    throughput = {}
+    for size in sizes:
+        start = time.perf_counter()
+        system.process_batch(inputs, batch_size=size)
+        elapsed = time.perf_counter() - start
+        throughput[size] = len(inputs) / elapsed
+        label = "sequential" if size == 1 else f"batch {size:>2}"
+        print(f"   {label:>10}: {throughput[size]:.2f} files/s, {audio_seconds / elapsed:.1f}x real time, "
+              f"{throughput[size] / throughput[1]:.2f}x sequential")
+    return throughput
+
 def main():
     """Test Whisper approach"""
     import argparse
@@ -98,14 +309,29 @@ def main():
     parser = argparse.ArgumentParser(description="Whisper Language Switch")
     parser.add_argument("--input", type=str, help="Input audio file")
     parser.add_argument("--output", type=str, help="Output text file")
-    parser.add_argument("--model", type=str, default="base", help="Whisper model size")
+    parser.add_argument("--model", type=str, default="base", help="Whisper model size, or auto")
+    parser.add_argument("--quantize", action="store_true", help="Use int8 dynamic-quantized CPU model")
+    parser.add_argument("--profile", choices=["realtime", "balanced", "archive", "none"],
+                       help="Latency-bounded decoding profile (default: models.whisper.decoding_profile)")
+    parser.add_argument("--inputs", type=str, nargs="+", help="Batch mode: many input audio files")
+    parser.add_argument("--batch-size", type=int, default=8, help="Windows per batched forward pass")
+    parser.add_argument("--output-dir", type=str, help="Batch mode: directory for per-file results")
+    parser.add_argument("--benchmark", action="store_true",
+                       help="Batch mode: report throughput for batch sizes 1/4/8/16")
     
     args = parser.parse_args()
     
     # Create system
-    system = WhisperLanguageSwitch(model_size=args.model)
+    system = WhisperLanguageSwitch(
+        model_size=args.model, decoding_profile=args.profile, quantize=args.quantize
+    )
     
-    if args.input:
+    if args.inputs:
+        if args.benchmark:
+            benchmark_batch_sizes(system, args.inputs)
+        else:
+            run_batch(system, args.inputs, args.batch_size, args.output_dir)
+    elif args.input:
         # Process file
         result = system.process_audio_file(args.input)
         
@@ -117,13 +343,10 @@ def main():
             print(f"Transcription: {result['transcription']}")
             
             if args.output:
-                with open(args.output, 'w', encoding='utf-8') as f:
-                    f.write(f"Language: {result['language']}\n")
-                    f.write(f"Confidence: {result['confidence']:.2f}\n")
-                    f.write(f"Transcription: {result['transcription']}\n")
+                write_result(result, args.output)
                 print(f"Results saved to: {args.output}")
     else:
-        print("Please provide --input audio file")
+        print("Please provide --input audio file (or --inputs for batch mode)")
 
 if __name__ == "__main__":
     main()
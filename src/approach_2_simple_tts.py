@@ -5,30 +5,162 @@ This approach provides multiple TTS options for better compatibility
 import os
 import subprocess
 import tempfile
+import threading
+import time
 from typing import Optional, List
 
+from tts_worker import TTSWorker
+from pcm_io import read_wav_bytes, write_pcm, espeak_to_array
+from voice_pool import VoicePool, DEFAULT_LANGUAGES
+
+
+class EngineHealth:
+    """
+    Per-(engine, voice) latency/failure tracker
+    Latency is an EWMA per operation ("speak": time-to-audio, "save"/"array": full
+    render time), so engines are only compared on the same measurement; an engine
+    voice that fails repeatedly is skipped for an exponentially growing cooldown
+    instead of being retried every call, without benching the engine's other voices
+    """
+    
+    def __init__(self, name: str, order: int, language: str = "en", alpha: float = 0.3, max_failures: int = 2,
+                 cooldown_seconds: float = 30.0, max_cooldown_seconds: float = 600.0):
+        self.name = name
+        self.order = order
+        self.language = language
+        self.alpha = alpha
+        self.max_failures = max_failures
+        self.cooldown_seconds = cooldown_seconds
+        self.max_cooldown_seconds = max_cooldown_seconds
+        self.latency = {}  # operation -> EWMA seconds
+        self.failures = 0
+        self.cooldown_until = 0.0
+        self.calls = 0
+        self.total_failures = 0
+    
+    def record_success(self, operation: str, latency: Optional[float] = None):
+        """A call succeeded; latency, when it could be measured, feeds that operation's EWMA"""
+        self.calls += 1
+        self.failures = 0
+        if latency is not None:
+            previous = self.latency.get(operation)
+            self.latency[operation] = latency if previous is None else self.alpha * latency + (1 - self.alpha) * previous
+    
+    def record_failure(self):
+        self.calls += 1
+        self.failures += 1
+        self.total_failures += 1
+        if self.failures >= self.max_failures:
+            backoff = self.cooldown_seconds * 2 ** (self.failures - self.max_failures)
+            self.cooldown_until = time.monotonic() + min(backoff, self.max_cooldown_seconds)
+    
+    @property
+    def available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+    
+    def rank_key(self, operation: str):
+        # Measured engines by latency, unmeasured ones keep detection order after them
+        latency = self.latency.get(operation)
+        return (latency is None, latency or 0.0, self.order)
+
+
+class EspeakPool:
+    """Long-lived `espeak --stdin` processes, one per voice, fed one line per utterance"""
+    
+    def __init__(self, startup_seconds: float = 0.1):
+        self.processes = {}
+        self.startup_seconds = startup_seconds  # espeak exits at once on an unknown voice
+        self._lock = threading.Lock()
+    
+    def _spawn(self, voice: str):
+        process = subprocess.Popen(
+            ["espeak", "-v", voice, "--stdin"],
+            stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+            text=True, bufsize=1
+        )
+        self.processes[voice] = process
+        return process
+    
+    def _process(self, voice: str):
+        """Running process for voice, spawned if missing or exited (caller holds the lock)"""
+        process = self.processes.get(voice)
+        if process is None or process.poll() is not None:
+            process = self._spawn(voice)
+            try:
+                process.wait(timeout=self.startup_seconds)
+            except subprocess.TimeoutExpired:
+                return process
+            del self.processes[voice]
+            raise RuntimeError(f"espeak exited on start for voice '{voice}' (code {process.returncode})")
+        return process
+    
+    def warm(self, voices):
+        """Spawn a process per voice up front so the first switch to it is instant"""
+        with self._lock:
+            for voice in voices:
+                self._spawn(voice)
+            time.sleep(self.startup_seconds)
+            failed = [voice for voice in voices if self.processes[voice].poll() is not None]
+            for voice in failed:
+                del self.processes[voice]
+        if failed:
+            print(f"⚠️ espeak voices unavailable: {', '.join(failed)}")
+    
+    def speak(self, text: str, voice: str):
+        """Queue one line on the voice's process; raises if the process is gone"""
+        with self._lock:
+            process = self._process(voice)
+            process.stdin.write(" ".join(text.split()) + "\n")
+            process.stdin.flush()
+            if process.poll() is not None:
+                raise RuntimeError(f"espeak exited for voice '{voice}' (code {process.returncode})")
+    
+    def close(self):
+        with self._lock:
+            for process in self.processes.values():
+                try:
+                    process.stdin.close()
+                    process.wait(timeout=2)
+                except Exception:
+                    process.kill()
+            self.processes = {}
+
+
 class MultiTTSEngine:
-    def __init__(self):
+    def __init__(self, pyttsx3_timeout: float = 30.0, languages: Optional[List[str]] = None):
         self.engines = []
+        self.health = {}
+        self.pyttsx3_timeout = pyttsx3_timeout
+        self.languages = languages or DEFAULT_LANGUAGES
+        self.espeak_pool = EspeakPool()
+        self.voice_pool = None
+        self.pyttsx3_worker = None
+        self._health_lock = threading.Lock()
         self._detect_engines()
     
     def _detect_engines(self):
         """Detect available TTS engines"""
-        # Try pyttsx3
+        # Try pyttsx3 (engine created and driven on its own worker thread)
         try:
             import pyttsx3
-            engine = pyttsx3.init()
-            self.engines.append(("pyttsx3", engine))
-            print("✓ pyttsx3 TTS available")
+            worker = TTSWorker(engine_factory=self._create_pyttsx3, speak_fn=self._pyttsx3_speak,
+                               save_fn=self._pyttsx3_save)
+            if worker.start():
+                self.pyttsx3_worker = worker
+                self.engines.append(("pyttsx3", worker))
+                print("✓ pyttsx3 TTS available")
+            else:
+                worker.stop(wait=False)
         except:
             pass
         
         # Try espeak (if available)
         try:
-            result = subprocess.run(["espeak", "--version"], 
+            result = subprocess.run(["espeak", "--version"],
                                   capture_output=True, text=True, timeout=5)
             if result.returncode == 0:
-                self.engines.append(("espeak", None))
+                self.espeak_pool.warm(self.languages)
+                self.engines.append(("espeak", self.espeak_pool))
                 print("✓ espeak TTS available")
         except:
             pass
@@ -45,26 +177,99 @@ class MultiTTSEngine:
         if not self.engines:
             print("⚠️ No TTS engines available")
     
+    def _create_pyttsx3(self):
+        """Runs on the pyttsx3 worker thread: create the engine and preselect its voices"""
+        import pyttsx3
+        engine = pyttsx3.init()
+        self.voice_pool = VoicePool(engine, self.languages)
+        return engine
+    
+    def _pyttsx3_speak(self, engine, text: str, language: str):
+        """Worker-thread speak that stamps the utterance being spoken when audio actually starts"""
+        self.voice_pool.activate(language)
+        utterance = self.pyttsx3_worker.current if self.pyttsx3_worker is not None else None
+        
+        def on_start(name):
+            if utterance is not None:
+                utterance.started_at = time.perf_counter()
+        
+        token = engine.connect('started-utterance', on_start)
+        try:
+            engine.say(text)
+            engine.runAndWait()
+        finally:
+            engine.disconnect(token)
+    
+    def _pyttsx3_save(self, engine, text: str, language: str, output_path: str):
+        self.voice_pool.activate(language)
+        engine.save_to_file(text, output_path)
+        engine.runAndWait()
+    
+    def _health(self, engine_name: str, language: str) -> EngineHealth:
+        """Tracker for one engine voice, created on first use"""
+        key = (engine_name, language)
+        with self._health_lock:
+            health = self.health.get(key)
+            if health is None:
+                order = [name for name, _ in self.engines].index(engine_name)
+                health = self.health[key] = EngineHealth(engine_name, order, language)
+            return health
+    
+    def ranked_engines(self, operation: str = "speak", language: str = "en") -> list:
+        """Engines whose voice for language is healthy, fastest measured latency for operation first"""
+        engines = [(name, engine) for name, engine in self.engines if self._health(name, language).available]
+        return sorted(engines, key=lambda item: self._health(item[0], language).rank_key(operation))
+    
+    def _run_on_worker(self, worker: TTSWorker, text: str, language: str, output_path: str = None):
+        """
+        Queue on the pyttsx3 worker and wait for it
+        Returns: (ok, seconds) - time to the started-utterance event when speaking (None if it
+        never fired), time to the finished file when saving
+        """
+        done = threading.Event()
+        outcome = {}
+        start = time.perf_counter()
+        
+        def on_done(utterance, status):
+            outcome["status"] = status
+            outcome["started_at"] = utterance.started_at
+            done.set()
+        
+        if output_path is None:
+            worker.speak(text, language, on_done=on_done)
+        else:
+            worker.save(text, output_path, language, on_done=on_done)
+        if not done.wait(self.pyttsx3_timeout) or outcome.get("status") != "done":
+            return False, None
+        
+        if output_path is not None:
+            return True, time.perf_counter() - start
+        started = outcome["started_at"]
+        return True, started - start if started is not None else None
+    
     def speak_text(self, text: str, language: str = "en") -> bool:
         """Speak text using available engines"""
         if not text.strip():
             return False
         
-        for engine_name, engine in self.engines:
+        for engine_name, engine in self.ranked_engines("speak", language):
+            health = self._health(engine_name, language)
             try:
+                # Only pyttsx3 reports when audio starts; espeak plays asynchronously after the
+                # write and SAPI's Speak() blocks to the end, so neither is ranked on latency
+                latency = None
                 if engine_name == "pyttsx3":
-                    engine.say(text)
-                    engine.runAndWait()
-                    return True
+                    ok, latency = self._run_on_worker(engine, text, language)
+                    if not ok:
+                        raise RuntimeError("pyttsx3 worker did not finish the utterance")
                 elif engine_name == "espeak":
-                    # Use espeak command
-                    cmd = ["espeak", "-v", language, text]
-                    subprocess.run(cmd, check=True)
-                    return True
+                    engine.speak(text, language)
                 elif engine_name == "sapi":
                     engine.Speak(text)
-                    return True
+                health.record_success("speak", latency)
+                return True
             except Exception as e:
+                health.record_failure()
                 print(f"TTS engine {engine_name} failed: {e}")
                 continue
         
@@ -76,36 +281,105 @@ class MultiTTSEngine:
         if not text.strip():
             return False
         
-        for engine_name, engine in self.engines:
+        for engine_name, engine in self.ranked_engines("save", language):
+            health = self._health(engine_name, language)
+            start = time.perf_counter()
             try:
                 if engine_name == "pyttsx3":
-                    engine.save_to_file(text, output_path)
-                    engine.runAndWait()
-                    return True
+                    ok, latency = self._run_on_worker(engine, text, language, output_path)
+                    if not ok:
+                        raise RuntimeError("pyttsx3 worker did not write the file")
                 elif engine_name == "espeak":
                     cmd = ["espeak", "-v", language, "-w", output_path, text]
                     subprocess.run(cmd, check=True)
-                    return True
+                    latency = time.perf_counter() - start
                 elif engine_name == "sapi":
                     # SAPI doesn't directly support file output
                     continue
+                health.record_success("save", latency)
+                return True
             except Exception as e:
+                health.record_failure()
                 print(f"TTS engine {engine_name} failed: {e}")
                 continue
         
         print(f"[TTS] Would save: '{text}' to {output_path}")
         return False
     
+    def synthesize_to_array(self, text: str, language: str = "en", dtype: str = "float32"):
+        """
+        Synthesize into memory: espeak renders to stdout, pyttsx3 can only
+        write files so it goes through a temporary file
+        Returns:
+            tuple: (pcm np.ndarray of float32 or int16, sample_rate), or (None, 0)
+        """
+        if not text.strip():
+            return None, 0
+        
+        for engine_name, engine in self.ranked_engines("array", language):
+            health = self._health(engine_name, language)
+            start = time.perf_counter()
+            try:
+                if engine_name == "espeak":
+                    result = espeak_to_array(text, language, dtype)
+                elif engine_name == "pyttsx3":
+                    fd, path = tempfile.mkstemp(suffix=".wav")
+                    os.close(fd)
+                    try:
+                        ok, _ = self._run_on_worker(engine, text, language, path)
+                        if not ok:
+                            raise RuntimeError("pyttsx3 worker did not write the file")
+                        with open(path, "rb") as f:
+                            result = read_wav_bytes(f.read(), dtype)
+                    finally:
+                        os.remove(path)
+                else:
+                    continue
+                if result is None:
+                    raise RuntimeError("no audio produced")
+                health.record_success("array", time.perf_counter() - start)
+                return result
+            except Exception as e:
+                health.record_failure()
+                print(f"TTS engine {engine_name} failed: {e}")
+                continue
+        
+        return None, 0
+    
+    def synthesize_to_stream(self, text: str, target, language: str = "en", fmt: str = "wav") -> int:
+        """Synthesize and write into a buffer (write) or socket (sendall); returns bytes written"""
+        pcm, sample_rate = self.synthesize_to_array(text, language)
+        if pcm is None:
+            return 0
+        return write_pcm(target, pcm, sample_rate, fmt)
+    
+    def get_engine_stats(self) -> dict:
+        """Per-operation latency EWMAs, failure counts and cooldown state per engine voice ("engine/language")"""
+        now = time.monotonic()
+        with self._health_lock:
+            healths = list(self.health.values())
+        return {
+            f"{health.name}/{health.language}": {
+                "latency": dict(health.latency),
+                "calls": health.calls,
+                "failures": health.total_failures,
+                "cooldown_remaining": max(health.cooldown_until - now, 0.0)
+            }
+            for health in healths
+        }
+    
     def get_available_voices(self) -> List[str]:
-        """Get list of available voices"""
-        voices = []
+        """Get list of available voices (enumerated on the pyttsx3 worker thread at startup)"""
+        if self.voice_pool is None:
+            return []
+        return list(self.voice_pool.voice_names)
+    
+    def close(self):
+        """Stop engine workers and espeak processes"""
         for engine_name, engine in self.engines:
             if engine_name == "pyttsx3":
-                try:
-                    voices.extend([v.name for v in engine.getProperty('voices')])
-                except:
-                    pass
-        return voices
+                engine.stop()
+        self.espeak_pool.close()
 
 def main():
     """Test Multi-TTS approach"""
@@ -122,6 +396,12 @@ def main():
         if text:
             tts.speak_text(text)
             print("✓ Speech completed")
+    
+    for name, stats in tts.get_engine_stats().items():
+        speak_latency = stats["latency"].get("speak")
+        if speak_latency is not None:
+            print(f"📊 {name}: {speak_latency * 1000:.0f} ms to audio, {stats['failures']} failures")
+    tts.close()
 
 if __name__ == "__main__":
     main()
@@ -2,19 +2,35 @@
 Approach 3: Hybrid System - Combines multiple approaches
 This approach uses the best available components for each task
 """
+import hashlib
 import os
 import time
 import numpy as np
 import torch
 import soundfile as sf
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Hashable
+
+from whisper_utils import (
+    WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS,
+    prepare_audio, encode_audio, detect_language_probs, decode_features, load_configured_model
+)
+from pcm_io import to_dtype, write_pcm, espeak_to_array
 
 class HybridLanguageSwitch:
-    def __init__(self):
+    def __init__(self, asr_mode="auto", escalation_threshold=0.6):
+        """
+        asr_mode: auto (best single recognizer) or cascade (Vosk, Whisper on low confidence)
+        escalation_threshold: mean Vosk word confidence below which cascade re-decodes with Whisper
+        """
+        self.asr_mode = asr_mode
+        self.escalation_threshold = escalation_threshold
+        self.cascade = None
         self.language_detector = None
         self.speech_recognizer = None
         self.text_to_speech = None
+        self.last_audio = (None, 0)
         self.current_language = "en"
+        self._encoded = None  # (segment key, encoder output) from the last Whisper detection
         self._initialize_components()
     
     def _initialize_components(self):
@@ -49,9 +65,8 @@ class HybridLanguageSwitch:
         
         # Try Whisper for language detection
         try:
-            import whisper
-            self.language_detector = whisper.load_model("base")
-            print("✓ Whisper language detection loaded")
+            self.language_detector, model_size = load_configured_model()
+            print(f"✓ Whisper language detection loaded ({model_size})")
             return
         except:
             pass
@@ -63,6 +78,9 @@ class HybridLanguageSwitch:
     
     def _init_speech_recognition(self):
         """Initialize speech recognition (try multiple options)"""
+        if self.asr_mode == "cascade" and self._init_cascade():
+            return
+        
         # Try Vosk first
         try:
             from vosk import Model, KaldiRecognizer
@@ -79,6 +97,7 @@ class HybridLanguageSwitch:
             import whisper
             if self.language_detector and hasattr(self.language_detector, 'transcribe'):
                 # Whisper is already loaded for language detection
+                self.speech_recognizer = self.language_detector
                 print("✓ Whisper speech recognition loaded")
                 return
         except:
@@ -89,6 +108,32 @@ class HybridLanguageSwitch:
         self.speech_recognizer = SimpleSpeechRecognizer()
         print("✓ Simple speech recognition loaded")
     
+    def _init_cascade(self) -> bool:
+        """Vosk for every utterance, Whisper only for low-confidence ones"""
+        try:
+            from vosk import Model
+            from asr_cascade import CascadeRecognizer
+            if not os.path.exists("models/vosk"):
+                print("⚠️ Cascade needs the Vosk model, falling back")
+                return False
+            
+            # Reuse Whisper if it is already loaded for language detection
+            if hasattr(self.language_detector, 'transcribe'):
+                whisper_loader = lambda: self.language_detector
+            else:
+                whisper_loader = lambda: load_configured_model()[0]
+            
+            self.cascade = CascadeRecognizer(
+                Model("models/vosk"), whisper_loader,
+                confidence_threshold=self.escalation_threshold
+            )
+            self.speech_recognizer = self.cascade
+            print("✓ Vosk → Whisper cascade loaded")
+            return True
+        except Exception as e:
+            print(f"⚠️ Cascade initialization failed: {e}")
+            return False
+    
     def _init_text_to_speech(self):
         """Initialize text-to-speech (try multiple options)"""
         # Try Coqui TTS
@@ -115,8 +160,12 @@ class HybridLanguageSwitch:
         self.text_to_speech = SimpleTextToSpeech()
         print("✓ Simple TTS loaded")
     
-    def detect_language(self, audio_data: np.ndarray) -> tuple:
-        """Detect language from audio"""
+    def detect_language(self, audio_data: np.ndarray, sample_rate: int = 16000,
+                        segment_id: Optional[Hashable] = None) -> tuple:
+        """
+        Detect language from audio
+        segment_id: identifies this audio for encoder reuse in transcribe_audio (default: content hash)
+        """
         if self.language_detector is None:
             return "en", 0.5
         
@@ -128,17 +177,17 @@ class HybridLanguageSwitch:
                     audio_tensor = audio_tensor.unsqueeze(0)
                 prediction = self.language_detector.classify_batch(audio_tensor)
                 language = prediction[3][0]
-                confidence = float(prediction[1][0])
+                confidence = float(prediction[1][0].exp())  # log-prob → probability
                 return language, confidence
             
             # Check if it's Whisper
             elif hasattr(self.language_detector, 'transcribe'):
-                # Save temporary file for Whisper
-                temp_path = "temp_detect.wav"
-                sf.write(temp_path, audio_data, 16000)
-                result = self.language_detector.transcribe(temp_path, language=None)
-                os.remove(temp_path)
-                return result.get("language", "en"), 0.8
+                audio = prepare_audio(audio_data, sample_rate)
+                features = encode_audio(self.language_detector, audio)
+                self._encoded = (self._segment_key(audio, segment_id), features)
+                probs = detect_language_probs(self.language_detector, features)
+                language = max(probs, key=probs.get)
+                return language, float(probs[language])
             
             # Fallback to simple detection
             else:
@@ -148,14 +197,20 @@ class HybridLanguageSwitch:
             print(f"Language detection error: {e}")
             return "en", 0.5
     
-    def transcribe_audio(self, audio_data: np.ndarray, language: str = "en") -> str:
-        """Transcribe audio to text"""
+    def transcribe_audio(self, audio_data: np.ndarray, language: str = "en", sample_rate: int = 16000,
+                         segment_id: Optional[Hashable] = None) -> str:
+        """Transcribe audio to text; pass the segment_id given to detect_language to reuse its encoder pass"""
         if self.speech_recognizer is None:
             return ""
         
         try:
+            # Check if it's the Vosk → Whisper cascade
+            if self.cascade is not None:
+                result = self.cascade.transcribe(prepare_audio(audio_data, sample_rate), language)
+                return result["text"]
+            
             # Check if it's Vosk
-            if hasattr(self.speech_recognizer, 'AcceptWaveform'):
+            elif hasattr(self.speech_recognizer, 'AcceptWaveform'):
                 audio_bytes = (audio_data * 32768.0).astype(np.int16).tobytes()
                 if self.speech_recognizer.AcceptWaveform(audio_bytes):
                     import json
@@ -167,10 +222,17 @@ class HybridLanguageSwitch:
             
             # Check if it's Whisper
             elif hasattr(self.speech_recognizer, 'transcribe'):
-                temp_path = "temp_transcribe.wav"
-                sf.write(temp_path, audio_data, 16000)
-                result = self.speech_recognizer.transcribe(temp_path, language=language)
-                os.remove(temp_path)
+                audio = prepare_audio(audio_data, sample_rate)
+                
+                # Reuse the encoder output from detect_language for short segments
+                if len(audio) <= WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE:
+                    features = self._cached_features(audio, segment_id)
+                    if features is None:
+                        features = encode_audio(self.speech_recognizer, audio)
+                    result = decode_features(self.speech_recognizer, features, language=language)
+                    return result.text.strip()
+                
+                result = self.speech_recognizer.transcribe(audio, language=language)
                 return result.get("text", "").strip()
             
             # Fallback
@@ -181,8 +243,62 @@ class HybridLanguageSwitch:
             print(f"Speech recognition error: {e}")
             return ""
     
+    @staticmethod
+    def _segment_key(audio: np.ndarray, segment_id: Optional[Hashable] = None) -> Hashable:
+        """Caller-provided id, else a digest of the samples (equal audio matches, mutated audio doesn't)"""
+        if segment_id is not None:
+            return segment_id
+        return hashlib.blake2b(np.ascontiguousarray(audio, dtype=np.float32).tobytes(), digest_size=16).digest()
+    
+    def _cached_features(self, audio: np.ndarray, segment_id: Optional[Hashable] = None):
+        """Return encoder output for audio if detect_language just encoded the same segment"""
+        if self._encoded is None or self.speech_recognizer is not self.language_detector:
+            return None
+        
+        cached_key, features = self._encoded
+        self._encoded = None
+        if cached_key == self._segment_key(audio, segment_id):
+            return features
+        return None
+    
+    def synthesize_to_array(self, text: str, language: str = "en", dtype: str = "float32"):
+        """
+        Synthesize into memory
+        Returns:
+            tuple: (pcm np.ndarray of float32 or int16, sample_rate), or (None, 0)
+        """
+        if self.text_to_speech is None or not text.strip():
+            return None, 0
+        
+        try:
+            # Coqui TTS returns samples directly
+            if hasattr(self.text_to_speech, 'tts_to_file'):
+                wav = self.text_to_speech.tts(text=text, language=language)
+                sample_rate = getattr(self.text_to_speech.synthesizer, 'output_sample_rate', 24000)
+                return to_dtype(wav, dtype), int(sample_rate)
+            
+            # pyttsx3 can't render to memory; espeak --stdout can
+            if hasattr(self.text_to_speech, 'save_to_file'):
+                result = espeak_to_array(text, language, dtype)
+                return result if result is not None else (None, 0)
+            
+            return self.text_to_speech.synthesize_to_array(text, language, dtype)
+        except Exception as e:
+            print(f"TTS synthesis error: {e}")
+            return None, 0
+    
+    def synthesize_to_stream(self, text: str, target, language: str = "en", fmt: str = "wav") -> int:
+        """Synthesize and write into a buffer (write) or socket (sendall); returns bytes written"""
+        pcm, sample_rate = self.synthesize_to_array(text, language)
+        if pcm is None:
+            return 0
+        return write_pcm(target, pcm, sample_rate, fmt)
+    
     def synthesize_speech(self, text: str, language: str = "en", output_path: str = None) -> bool:
-        """Synthesize speech from text"""
+        """
+        Synthesize speech from text
+        Without output_path, Coqui audio is kept in memory as self.last_audio (pcm, sample_rate)
+        """
         if self.text_to_speech is None or not text.strip():
             return False
         
@@ -192,7 +308,8 @@ class HybridLanguageSwitch:
                 if output_path:
                     self.text_to_speech.tts_to_file(text=text, file_path=output_path, language=language)
                 else:
-                    self.text_to_speech.tts_to_file(text=text, file_path="temp_output.wav", language=language)
+                    self.last_audio = self.synthesize_to_array(text, language)
+                    return self.last_audio[0] is not None
                 return True
             
             # Check if it's pyttsx3
@@ -218,12 +335,15 @@ class HybridLanguageSwitch:
             # Load audio
             audio_data, sample_rate = sf.read(input_path)
             
+            # Resample/downmix once, in memory
+            audio_data = prepare_audio(audio_data, sample_rate)
+            
             # Detect language
-            language, confidence = self.detect_language(audio_data)
+            language, confidence = self.detect_language(audio_data, segment_id=input_path)
             print(f"Detected language: {language} (confidence: {confidence:.2f})")
             
             # Transcribe
-            transcription = self.transcribe_audio(audio_data, language)
+            transcription = self.transcribe_audio(audio_data, language, segment_id=input_path)
             print(f"Transcription: {transcription}")
             
             # Synthesize response
@@ -249,11 +369,15 @@ def main():
     parser = argparse.ArgumentParser(description="Hybrid Language Switch")
     parser.add_argument("--input", type=str, help="Input audio file")
     parser.add_argument("--output", type=str, help="Output audio file")
+    parser.add_argument("--asr", choices=["auto", "cascade"], default="auto",
+                       help="auto: best single recognizer; cascade: Vosk, Whisper on low confidence")
+    parser.add_argument("--escalation-threshold", type=float, default=0.6,
+                       help="Mean Vosk word confidence below which the cascade uses Whisper")
     
     args = parser.parse_args()
     
     # Create system
-    system = HybridLanguageSwitch()
+    system = HybridLanguageSwitch(asr_mode=args.asr, escalation_threshold=args.escalation_threshold)
     
     if args.input:
         result = system.process_audio_file(args.input, args.output)
@@ -261,6 +385,14 @@ def main():
             print("✓ Processing completed successfully")
         else:
             print(f"✗ Processing failed: {result.get('error', 'Unknown error')}")
+        
+        if system.cascade is not None:
+            stats = system.cascade.get_stats()
+            print(f"📊 Escalation rate: {stats['escalation_rate']:.0%} "
+                  f"({stats['escalations']}/{stats['utterances']} utterances)")
+            if "cost_per_hour" in stats:
+                print(f"📊 Cost per audio hour: {stats['cost_per_hour']:.0f}s "
+                      f"(Vosk {stats['vosk_cost_per_hour']:.0f}s, Whisper {stats['whisper_cost_per_hour']:.0f}s)")
     else:
         print("Please provide --input audio file")
 
@@ -7,7 +7,11 @@ import numpy as np
 import pyaudio
 import threading
 import queue
-from typing import Optional, Callable
+from typing import Optional, Callable, Sequence
+
+from echo_gate import EchoGate, load_echo_tail
+from feature_stream import StreamingFeatureExtractor
+from pcm_io import AudioPlayer
 
 class RealTimeLanguageSwitch:
     def __init__(self):
@@ -16,6 +20,9 @@ class RealTimeLanguageSwitch:
         self.audio_stream = None
         self.audio = None
         self.callback = None
+        self.feature_callback = None
+        self.features = None  # created when a feature consumer registers
+        self.echo_gate = None
         self.current_language = "en"
         
         # Audio parameters
@@ -40,9 +47,24 @@ class RealTimeLanguageSwitch:
         """Set callback function for processed audio"""
         self.callback = callback
     
+    def set_feature_callback(self, callback: Callable[[StreamingFeatureExtractor, int, str], None],
+                             views: Sequence[str] = ("whisper", "fbank")):
+        """
+        Set callback receiving the shared feature extractor and end frame of each window
+        Call features.whisper_window(n, end_frame) / features.fbank_window(n, end_frame)
+        to get views of the window without recomputing the half already seen;
+        only the requested views are computed
+        """
+        self.features = StreamingFeatureExtractor(sample_rate=self.sample_rate, capacity_seconds=10.0, views=views)
+        self.feature_callback = callback
+    
+    def set_echo_gate(self, echo_gate: EchoGate):
+        """Discard captured frames while the system's own speech is playing"""
+        self.echo_gate = echo_gate
+    
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """Audio callback function"""
-        if self.is_recording:
+        if self.is_recording and (self.echo_gate is None or self.echo_gate.process(in_data) is not None):
             # Convert bytes to numpy array
             audio_data = np.frombuffer(in_data, dtype=np.int16)
             audio_data = audio_data.astype(np.float32) / 32768.0
@@ -90,21 +112,30 @@ class RealTimeLanguageSwitch:
         """Process audio from queue"""
         buffer = []
         buffer_size = self.sample_rate * 2  # 2 seconds of audio
+        samples_seen = 0
         
         while self.is_recording:
             try:
                 # Get audio data from queue
                 audio_chunk = self.audio_queue.get(timeout=0.1)
                 buffer.extend(audio_chunk)
+                samples_seen += len(audio_chunk)
+                if self.features is not None:
+                    # Each hop's frames are computed once and shared by the overlapping windows
+                    self.features.push(audio_chunk)
                 
                 # Process when buffer is full
                 if len(buffer) >= buffer_size:
+                    window_end = samples_seen - (len(buffer) - buffer_size)
                     audio_array = np.array(buffer[:buffer_size])
                     buffer = buffer[buffer_size//2:]  # Keep overlap
                     
                     # Call callback if set
                     if self.callback:
                         self.callback(audio_array, self.current_language)
+                    if self.feature_callback:
+                        end_frame = min(window_end // self.features.hop_length, self.features.frame_count)
+                        self.feature_callback(self.features, end_frame, self.current_language)
                 
             except queue.Empty:
                 continue
@@ -147,12 +178,16 @@ class SimpleRealTimeProcessor:
         self.language_detector = None
         self.speech_recognizer = None
         self.text_to_speech = None
+        self.responder = None
         
         # Initialize components
         self._init_components()
         
         # Set up callback
         self.rt_system.set_callback(self.process_audio)
+        self.rt_system.set_echo_gate(EchoGate(
+            self.responder, tail_seconds=load_echo_tail(), sample_rate=self.rt_system.sample_rate
+        ))
     
     def _init_components(self):
         """Initialize processing components"""
@@ -166,7 +201,11 @@ class SimpleRealTimeProcessor:
         
         # Simple TTS
         from text_to_speech_simple import SimpleTextToSpeech
+        from response_templates import ResponseSpeaker, load_response_settings
         self.text_to_speech = SimpleTextToSpeech()
+        # "I heard:" prefixes are pre-rendered; only the transcription is synthesized per response
+        self.responder = ResponseSpeaker(self.text_to_speech, player=AudioPlayer(self.rt_system.audio),
+                                         **load_response_settings())
         
         print("✓ Components initialized")
     
@@ -192,8 +231,7 @@ class SimpleRealTimeProcessor:
                     print(f"[{detected_lang.upper()}] {transcription}")
                     
                     # Simple response
-                    response = f"I heard: {transcription}"
-                    self.text_to_speech.speak_text(response, detected_lang)
+                    self.responder.speak(transcription, detected_lang)
         
         except Exception as e:
             print(f"Processing error: {e}")
@@ -204,6 +242,8 @@ class SimpleRealTimeProcessor:
     
     def cleanup(self):
         """Clean up"""
+        self.responder.stop()
+        self.text_to_speech.stop_worker()
         self.rt_system.cleanup()
 
 def main():
@@ -0,0 +1,118 @@
+"""
+Confidence-based ASR Cascade
+Decodes with Vosk first and re-decodes only low-confidence utterances with Whisper
+"""
+import json
+import time
+import numpy as np
+from typing import Callable, Optional
+
+from whisper_gate import NoSpeechGate
+from whisper_utils import (
+    WHISPER_SAMPLE_RATE, WHISPER_WINDOW_SECONDS, encode_audio, decode_features
+)
+
+
+class CascadeRecognizer:
+    """
+    Vosk → Whisper cascade
+    Args:
+        vosk_model: loaded vosk.Model
+        whisper_loader: callable returning a Whisper model (called on first escalation)
+        confidence_threshold: float - escalate when mean word confidence is below this
+        low_word_fraction: float - or when this fraction of words is below the threshold
+        speech_floor_db: float - escalate empty Vosk output only above this RMS level
+    """
+
+    def __init__(self, vosk_model, whisper_loader: Callable, confidence_threshold: float = 0.6,
+                 low_word_fraction: float = 0.3, speech_floor_db: float = -40.0, sample_rate: int = 16000):
+        self.vosk_model = vosk_model
+        self.whisper_loader = whisper_loader
+        self.whisper_model = None
+        self.confidence_threshold = confidence_threshold
+        self.low_word_fraction = low_word_fraction
+        self.speech_floor_db = speech_floor_db
+        self.sample_rate = sample_rate
+        self.stats = {
+            "utterances": 0, "escalations": 0, "audio_seconds": 0.0,
+            "vosk_seconds": 0.0, "whisper_seconds": 0.0
+        }
+
+    def transcribe(self, audio: np.ndarray, language: Optional[str] = None) -> dict:
+        """
+        Transcribe one utterance
+        Args:
+            audio: np.ndarray - float32 mono at sample_rate
+            language: str - language hint for Whisper
+        Returns:
+            dict with text, engine, confidence, escalated
+        """
+        self.stats["utterances"] += 1
+        self.stats["audio_seconds"] += len(audio) / self.sample_rate
+
+        start = time.perf_counter()
+        text, words = self._decode_vosk(audio)
+        self.stats["vosk_seconds"] += time.perf_counter() - start
+
+        confidence = float(np.mean([w.get("conf", 1.0) for w in words])) if words else 0.0
+        if not self._should_escalate(audio, words, confidence):
+            return {"text": text, "engine": "vosk", "confidence": confidence, "escalated": False}
+
+        self.stats["escalations"] += 1
+        start = time.perf_counter()
+        whisper_text = self._decode_whisper(audio, language)
+        self.stats["whisper_seconds"] += time.perf_counter() - start
+        return {"text": whisper_text, "engine": "whisper", "confidence": confidence, "escalated": True}
+
+    def _decode_vosk(self, audio: np.ndarray):
+        """Decode a whole utterance with per-word confidences"""
+        from vosk import KaldiRecognizer
+
+        recognizer = KaldiRecognizer(self.vosk_model, self.sample_rate)
+        recognizer.SetWords(True)
+
+        audio_bytes = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+        words = []
+        texts = []
+        for i in range(0, len(audio_bytes), 8000):
+            if recognizer.AcceptWaveform(audio_bytes[i:i + 8000]):
+                result = json.loads(recognizer.Result())
+                words.extend(result.get("result", []))
+                texts.append(result.get("text", ""))
+        result = json.loads(recognizer.FinalResult())
+        words.extend(result.get("result", []))
+        texts.append(result.get("text", ""))
+        return " ".join(t for t in texts if t).strip(), words
+
+    def _should_escalate(self, audio: np.ndarray, words: list, confidence: float) -> bool:
+        if not words:
+            return NoSpeechGate.energy_db(audio) > self.speech_floor_db
+
+        low_words = sum(1 for w in words if w.get("conf", 1.0) < self.confidence_threshold)
+        return confidence < self.confidence_threshold or low_words / len(words) > self.low_word_fraction
+
+    def _decode_whisper(self, audio: np.ndarray, language: Optional[str]) -> str:
+        if self.whisper_model is None:
+            self.whisper_model = self.whisper_loader()
+        if language:
+            language = language.split(":")[0].strip()  # VoxLingua labels look like "en: English"
+
+        if self.sample_rate == WHISPER_SAMPLE_RATE and len(audio) <= WHISPER_WINDOW_SECONDS * WHISPER_SAMPLE_RATE:
+            features = encode_audio(self.whisper_model, audio)
+            return decode_features(self.whisper_model, features, language=language).text.strip()
+
+        result = self.whisper_model.transcribe(audio, language=language, fp16=False)
+        return result.get("text", "").strip()
+
+    def get_stats(self) -> dict:
+        """
+        Escalation rate and cost in processing seconds per audio hour
+        """
+        stats = dict(self.stats)
+        hours = stats["audio_seconds"] / 3600
+        stats["escalation_rate"] = stats["escalations"] / stats["utterances"] if stats["utterances"] else 0.0
+        if hours > 0:
+            stats["vosk_cost_per_hour"] = stats["vosk_seconds"] / hours
+            stats["whisper_cost_per_hour"] = stats["whisper_seconds"] / hours
+            stats["cost_per_hour"] = (stats["vosk_seconds"] + stats["whisper_seconds"]) / hours
+        return stats
@@ -8,6 +8,8 @@ import torch
 import soundfile as sf
 from typing import Optional, Tuple
 
+from feature_stream import StreamingFeatureExtractor
+
 
 class AudioHandler:
     def __init__(self, sample_rate=16000, chunk_size=4000):
@@ -15,6 +17,34 @@ class AudioHandler:
         self.chunk_size = chunk_size
         self.audio = pyaudio.PyAudio()
         self.stream = None
+        
+        # Shared fbank ring: computed once per frame while at least one consumer holds it
+        self.features = None
+        self._feature_refs = 0
+    
+    def acquire_features(self, fbank_mels=80, capacity_seconds=10.0) -> StreamingFeatureExtractor:
+        """Register a feature consumer; the ring is created by the first one"""
+        if self.features is None:
+            self.features = StreamingFeatureExtractor(
+                sample_rate=self.sample_rate,
+                capacity_seconds=capacity_seconds,
+                fbank_mels=fbank_mels,
+                views=("fbank",)  # language ID is the only consumer; no Whisper log-mel per frame
+            )
+        self._feature_refs += 1
+        return self.features
+    
+    def release_features(self):
+        """Unregister a feature consumer; the ring is dropped with the last one"""
+        self._feature_refs = max(self._feature_refs - 1, 0)
+        if self._feature_refs == 0:
+            self.features = None
+    
+    def feature_window(self, num_samples: int) -> Optional[np.ndarray]:
+        """Log fbanks (frames, n_mels) covering the most recent num_samples of audio"""
+        if self.features is None or self.features.frame_count == 0:
+            return None
+        return self.features.fbank_window(num_samples // self.features.hop_length)
     
     def start_recording(self):
         """Start audio recording stream"""
@@ -42,7 +72,10 @@ class AudioHandler:
         """Read a chunk of audio data"""
         if self.stream:
             try:
-                return self.stream.read(self.chunk_size, exception_on_overflow=False)
+                chunk = self.stream.read(self.chunk_size, exception_on_overflow=False)
+                if self.features is not None:
+                    self.features.push(np.frombuffer(chunk, dtype=np.int16).astype(np.float32) / 32768.0)
+                return chunk
             except Exception as e:
                 print(f"Audio read error: {e}")
                 return None
@@ -0,0 +1,187 @@
+"""
+Batch Text-to-Speech Rendering
+Renders a manifest of (id, text, language) prompts to <output_dir>/<id>.wav
+across a process pool; each worker loads TextToSpeech once and reuses it
+"""
+import csv
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, List, Optional
+
+_tts = None  # per-worker TextToSpeech, created by _init_worker
+_file_mode = 0o644  # permissions for rendered files, set from the umask by _init_worker
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """
+    Read prompts from JSONL (one object per line) or CSV (header row)
+    Rows without id or text, and ids that repeat or map to an already used
+    file name (e.g. "a/b" and "a_b"), are skipped with a warning
+    Returns: list of {"id", "text", "language"}
+    """
+    with open(path, encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    items, files = [], {}
+    for number, row in enumerate(rows, 1):
+        item_id = str(row.get("id") or "").strip()
+        text = str(row.get("text") or "").strip()
+        if not item_id or not text:
+            print(f"⚠️ Manifest row {number}: missing id or text, skipped")
+            continue
+        # Compared case-insensitively: "A" and "a" are one file on macOS and Windows
+        filename = _file_name(item_id).lower()
+        if filename in files:
+            other = files[filename]
+            reason = f"duplicate id '{item_id}'" if other == item_id else \
+                f"id '{item_id}' maps to the same file as '{other}'"
+            print(f"⚠️ Manifest row {number}: {reason}, skipped")
+            continue
+        files[filename] = item_id
+        items.append({"id": item_id, "text": text, "language": str(row.get("language") or "en").strip()})
+    return items
+
+
+def _file_name(item_id: str) -> str:
+    """<id>.wav with filesystem-unsafe characters replaced"""
+    return re.sub(r"[^\w.-]", "_", item_id) + ".wav"
+
+
+def output_path(output_dir: str, item_id: str) -> str:
+    """<output_dir>/<id>.wav with filesystem-unsafe characters replaced"""
+    return os.path.join(output_dir, _file_name(item_id))
+
+
+def _init_worker(model_name: str, cache_dir: Optional[str], speaker_wav: Optional[str], threads: int):
+    """Process pool initializer: load the model once per worker"""
+    global _tts, _file_mode
+    umask = os.umask(0)
+    os.umask(umask)
+    _file_mode = 0o666 & ~umask
+    try:
+        import torch
+        torch.set_num_threads(threads)  # keep workers from oversubscribing the CPU
+    except ImportError:
+        pass
+
+    from text_to_speech import TextToSpeech
+    _tts = TextToSpeech(model_name=model_name, cache_dir=cache_dir, speaker_wav=speaker_wav)
+    if _tts.model is None:
+        raise RuntimeError(f"TTS model '{model_name}' failed to load")
+
+
+def _render_item(item: Dict[str, str], path: str) -> tuple:
+    """
+    Render one prompt in a worker; the file only appears under its final name once complete
+    Returns: (id, success, seconds)
+    """
+    start = time.perf_counter()
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".wav")
+    os.close(fd)
+    try:
+        ok = _tts.synthesize_speech(item["text"], item["language"], tmp_path)
+        if ok:
+            os.chmod(tmp_path, _file_mode)  # mkstemp creates the file 0600
+            os.replace(tmp_path, path)
+    except Exception as e:
+        print(f"✗ {item['id']}: {e}")
+        ok = False
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return item["id"], ok, time.perf_counter() - start
+
+
+def render_manifest(items: List[Dict[str, str]], output_dir: str, workers: int = 2,
+                    model_name: str = "tts_models/multilingual/multi-dataset/xtts_v2",
+                    cache_dir: Optional[str] = None, speaker_wav: Optional[str] = None,
+                    progress_every: int = 50) -> dict:
+    """
+    Render every prompt whose output does not exist yet
+    Returns: dict with total, skipped, rendered, failed, failed_ids, elapsed, utterances_per_minute
+        and error (set when the worker pool broke, e.g. the model failed to load)
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    pending = [item for item in items if not os.path.exists(output_path(output_dir, item["id"]))]
+    stats = {"total": len(items), "skipped": len(items) - len(pending), "rendered": 0, "failed": 0,
+             "failed_ids": [], "elapsed": 0.0, "utterances_per_minute": 0.0, "error": None}
+    print(f"🎯 {len(pending)} to render, {stats['skipped']} already rendered")
+    if not pending:
+        return stats
+
+    workers = max(1, min(workers, len(pending)))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    start = time.perf_counter()
+
+    # spawn: forking a parent that already holds torch/OpenMP threads can deadlock
+    finished = set()
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                                 initializer=_init_worker,
+                                 initargs=(model_name, cache_dir, speaker_wav, threads)) as pool:
+            futures = [pool.submit(_render_item, item, output_path(output_dir, item["id"])) for item in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                item_id, ok, _ = future.result()
+                finished.add(item_id)
+                if ok:
+                    stats["rendered"] += 1
+                else:
+                    stats["failed"] += 1
+                    stats["failed_ids"].append(item_id)
+                if done % progress_every == 0 or done == len(futures):
+                    elapsed = time.perf_counter() - start
+                    print(f"📊 {done}/{len(futures)} done, {done / elapsed * 60:.1f} utterances/min")
+    except BrokenProcessPool as e:
+        # A worker died, most often because the initializer could not load the model
+        stats["error"] = f"worker pool broke ({e}); check that '{model_name}' loads in this environment"
+        print(f"✗ {stats['error']}")
+        unfinished = [item["id"] for item in pending if item["id"] not in finished]
+        stats["failed"] += len(unfinished)
+        stats["failed_ids"].extend(unfinished)
+
+    stats["elapsed"] = time.perf_counter() - start
+    stats["utterances_per_minute"] = stats["rendered"] / stats["elapsed"] * 60 if stats["elapsed"] else 0.0
+    return stats
+
+
+def main():
+    """Render a prompt manifest"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Batch TTS rendering")
+    parser.add_argument("--manifest", required=True, help="JSONL or CSV with id, text, language")
+    parser.add_argument("--output-dir", default="output/prompts")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                        help="Worker processes, each holding its own model")
+    parser.add_argument("--model", default="tts_models/multilingual/multi-dataset/xtts_v2")
+    parser.add_argument("--speaker-wav", default=None,
+                        help="XTTS reference clip for every prompt (default: the model's first built-in speaker)")
+    parser.add_argument("--cache-dir", default=None, help="Optional synthesis cache directory shared by the workers; "
+                             "the disk budget covers the whole directory")
+
+    args = parser.parse_args()
+
+    items = load_manifest(args.manifest)
+    stats = render_manifest(items, args.output_dir, workers=args.workers, model_name=args.model,
+                            cache_dir=args.cache_dir, speaker_wav=args.speaker_wav)
+    if stats["error"]:
+        raise SystemExit(1)
+
+    print(f"✓ Rendered {stats['rendered']}, skipped {stats['skipped']}, failed {stats['failed']} "
+          f"in {stats['elapsed']:.1f}s ({stats['utterances_per_minute']:.1f} utterances/min)")
+    if stats["failed_ids"]:
+        print(f"✗ Failed: {', '.join(stats['failed_ids'][:20])}"
+              + (" ..." if len(stats["failed_ids"]) > 20 else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Self-echo Suppression
+Keeps the system from transcribing its own TTS output: microphone frames are
+discarded while the TTS worker is speaking (plus a tail for device latency and
+room reverb), or cleaned by NLMS subtraction when the played signal is known
+"""
+import time
+import numpy as np
+from collections import deque
+from typing import Optional, Union
+
+Frame = Union[bytes, np.ndarray]
+
+
+class NLMSCanceller:
+    """
+    Normalized LMS adaptive filter that removes a known reference (the TTS output)
+    from the microphone signal
+    Args:
+        taps: int - filter length in samples; must cover the speaker→mic delay
+        step: float - adaptation rate (0 < step < 2)
+    """
+
+    def __init__(self, taps: int = 1024, step: float = 0.5, eps: float = 1e-6):
+        self.taps = taps
+        self.step = step
+        self.eps = eps
+        self.weights = np.zeros(taps, dtype=np.float64)
+        self.history = np.zeros(taps, dtype=np.float64)  # most recent reference sample first
+        self.reference = deque()
+        self.mic_power = 0.0
+        self.residual_power = 0.0
+
+    def push_reference(self, samples: np.ndarray):
+        """Queue samples as they are sent to the speaker"""
+        self.reference.extend(np.asarray(samples, dtype=np.float64).ravel())
+
+    @property
+    def active(self) -> bool:
+        """True while there is reference signal left to cancel"""
+        return len(self.reference) > 0
+
+    def cancel(self, mic: np.ndarray) -> np.ndarray:
+        """Subtract the filtered reference from mic samples, adapting the filter as it goes"""
+        mic = np.asarray(mic, dtype=np.float64)
+        residual = np.empty_like(mic)
+        for i, sample in enumerate(mic):
+            self.history[1:] = self.history[:-1]
+            self.history[0] = self.reference.popleft() if self.reference else 0.0
+            error = sample - self.weights @ self.history
+            self.weights += self.step * error * self.history / (self.history @ self.history + self.eps)
+            residual[i] = error
+        self.mic_power += float(mic @ mic)
+        self.residual_power += float(residual @ residual)
+        return residual.astype(np.float32)
+
+    @property
+    def erle_db(self) -> float:
+        """Echo return loss enhancement so far"""
+        if self.residual_power <= 0:
+            return 0.0
+        return 10 * np.log10(max(self.mic_power, 1e-12) / self.residual_power)
+
+
+def load_echo_tail(config_path: str = "config.yaml", default: float = 0.5) -> float:
+    """processing.echo_tail_seconds from config.yaml, or default when unset or unreadable"""
+    try:
+        import yaml
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file)
+        return float(config['processing']['echo_tail_seconds'])
+    except Exception:
+        return default
+
+
+class EchoGate:
+    """
+    Half-duplex gate tied to TTS playback state
+    Args:
+        playback: object with is_speaking and last_spoken_end (perf_counter time), e.g. TTSWorker
+        tail_seconds: float - keep discarding this long after playback ends
+        canceller: NLMSCanceller - when given and fed the played audio, frames are
+            cleaned instead of discarded
+    """
+
+    def __init__(self, playback=None, tail_seconds: float = 0.5, sample_rate: int = 16000,
+                 canceller: Optional[NLMSCanceller] = None):
+        self.playback = playback
+        self.tail_seconds = tail_seconds
+        self.sample_rate = sample_rate
+        self.canceller = canceller
+        self.stats = {"frames": 0, "discarded_frames": 0, "discarded_seconds": 0.0, "cancelled_frames": 0}
+
+    def in_echo_window(self) -> bool:
+        """True while speaking or within tail_seconds of the end of playback"""
+        if self.playback is None:
+            return False
+        if self.playback.is_speaking:
+            return True
+        last_end = self.playback.last_spoken_end
+        return last_end > 0 and time.perf_counter() - last_end < self.tail_seconds
+
+    def process(self, frame: Frame) -> Optional[Frame]:
+        """
+        Gate one microphone frame (int16 bytes or float32 samples)
+        Returns: the frame (possibly echo-cancelled) or None if it was discarded as echo
+        """
+        self.stats["frames"] += 1
+
+        if self.canceller is not None and self.canceller.active:
+            self.stats["cancelled_frames"] += 1
+            if isinstance(frame, bytes):
+                samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32) / 32768.0
+                cleaned = self.canceller.cancel(samples)
+                return (np.clip(cleaned, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+            return self.canceller.cancel(frame)
+
+        if self.in_echo_window():
+            num_samples = len(frame) // 2 if isinstance(frame, bytes) else len(frame)
+            self.stats["discarded_frames"] += 1
+            self.stats["discarded_seconds"] += num_samples / self.sample_rate
+            return None
+        return frame
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["discard_rate"] = stats["discarded_frames"] / stats["frames"] if stats["frames"] else 0.0
+        if self.canceller is not None:
+            stats["erle_db"] = self.canceller.erle_db
+        return stats
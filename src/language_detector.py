@@ -1,9 +1,14 @@
 """
 Minimalistic Language Detection Module using SpeechBrain
 """
+import numpy as np
 import torch
+import torch.nn.functional as F
 import speechbrain as sb
 from speechbrain.pretrained import EncoderClassifier
+from typing import List, Tuple
+
+from feature_stream import fbank_parity
 
 
 class LanguageDetector:
@@ -25,17 +30,46 @@ class LanguageDetector:
             print(f"✗ Failed to load language model: {e}")
             self.model = None
     
-    def detect_language(self, audio_tensor):
+    @property
+    def feature_bins(self) -> int:
+        """Number of fbank bins the encoder expects"""
+        try:
+            return int(self.model.hparams.compute_features.compute_fbanks.n_mels)
+        except Exception:
+            return 80
+    
+    def features_compatible(self, tolerance_db=0.5) -> bool:
+        """
+        Check that shared streaming fbanks reproduce this model's compute_features
+        Returns: True only if they agree within tolerance_db on a test signal
+        """
+        if self.model is None:
+            return False
+        try:
+            match, diff = fbank_parity(self.model.hparams.compute_features, self.feature_bins,
+                                       tolerance_db=tolerance_db)
+        except Exception as e:
+            print(f"⚠️ Fbank parity check failed: {e}")
+            return False
+        if not match:
+            print(f"⚠️ Shared fbanks differ from the model's front-end by {diff:.2f} dB")
+        return match
+    
+    def detect_language(self, audio_tensor, features=None):
         """
         Detect language from audio tensor
         Args:
             audio_tensor: torch.Tensor of shape (samples,) or (1, samples)
+            features: optional precomputed log fbanks (frames, n_mels); skips the model's own fbank pass
         Returns:
             tuple: (language_code, confidence_score)
         """
         if self.model is None:
             return "en", 0.0
         
+        if features is not None and features.shape[-1] == self.feature_bins and len(features) > 0:
+            return self.detect_language_features(features)
+        
         try:
             # Ensure audio is in correct format
             if audio_tensor.dim() == 1:
@@ -43,14 +77,215 @@ class LanguageDetector:
             
             # Get prediction
             prediction = self.model.classify_batch(audio_tensor)
-            language = prediction[3][0]  # Language code
-            confidence = float(prediction[1][0])  # Confidence score
+            language = prediction[3][0].split(":")[0].strip()  # "en: English" -> "en"
+            confidence = float(prediction[1][0].exp())  # classifier emits log-probs
             
             return language, confidence
         except Exception as e:
             print(f"Language detection error: {e}")
             return "en", 0.0
     
+    def detect_language_features(self, features):
+        """
+        Classify precomputed log fbanks, bypassing compute_features
+        Runs the same mean_var_norm → embedding_model → classifier chain as classify_batch
+        Returns: (language_code, probability), on the same scale as detect_language
+        """
+        try:
+            feats = torch.as_tensor(features, dtype=torch.float32)
+            if feats.dim() == 2:
+                feats = feats.unsqueeze(0)
+            wav_lens = torch.ones(feats.shape[0])
+            
+            with torch.no_grad():
+                feats = self.model.mods.mean_var_norm(feats, wav_lens)
+                embeddings = self.model.mods.embedding_model(feats, wav_lens)
+                log_probs = self.model.mods.classifier(embeddings).squeeze(1)
+            
+            score, index = torch.max(log_probs, dim=-1)
+            language = self.model.hparams.label_encoder.decode_torch(index)[0].split(":")[0].strip()
+            return language, float(score[0].exp())
+        except Exception as e:
+            print(f"Feature language detection error: {e}")
+            return "en", 0.0
+    
+    def detect_language_windows(self, blocks, sample_rate=16000, window_seconds=3.0,
+                                stride_seconds=1.5, batch_size=16) -> dict:
+        """
+        Windowed language ID over a long input with bounded memory
+        Args:
+            blocks: iterable of float32 mono arrays at sample_rate (e.g. from sf.blocks)
+            window_seconds: float - length of each classified window
+            stride_seconds: float - hop between window starts
+            batch_size: int - windows per classify_batch call
+        Returns:
+            dict with language (highest mean posterior), confidence (mean top-1 probability
+            of the windows that language won), vote_share (fraction of windows it won),
+            distribution (top languages by mean posterior) and
+            timeline (list of (start, end, language, confidence), neighbours merged)
+        """
+        result = {"language": "en", "confidence": 0.0, "vote_share": 0.0, "distribution": {},
+                  "timeline": [], "windows": 0}
+        if self.model is None:
+            return result
+        
+        win = int(window_seconds * sample_rate)
+        stride = int(stride_seconds * sample_rate)
+        buffer = np.zeros(0, dtype=np.float32)
+        consumed = 0  # samples dropped from the front of buffer
+        batch, starts = [], []
+        posterior_sum = None
+        timeline = []
+        window_votes = []  # (language, top-1 probability) per window
+        
+        def classify(windows, window_starts):
+            nonlocal posterior_sum
+            with torch.no_grad():
+                out_prob, score, index, labels = self.model.classify_batch(torch.from_numpy(np.stack(windows)))
+            probs = out_prob.exp()
+            posterior_sum = probs.sum(0) if posterior_sum is None else posterior_sum + probs.sum(0)
+            for start, label, p in zip(window_starts, labels, probs.max(dim=-1).values.tolist()):
+                language = label.split(":")[0].strip()
+                window_votes.append((language, p))
+                begin, end = start / sample_rate, (start + len(windows[0])) / sample_rate
+                if timeline and timeline[-1][2] == language and begin <= timeline[-1][1]:
+                    prev = timeline.pop()
+                    timeline.append((prev[0], end, language, max(prev[3], p)))
+                else:
+                    timeline.append((begin, end, language, p))
+            result["windows"] += len(windows)
+        
+        try:
+            for block in blocks:
+                buffer = np.concatenate([buffer, np.asarray(block, dtype=np.float32)])
+                while len(buffer) >= win:
+                    batch.append(buffer[:win].copy())
+                    starts.append(consumed)
+                    buffer = buffer[stride:]
+                    consumed += stride
+                    if len(batch) == batch_size:
+                        classify(batch, starts)
+                        batch, starts = [], []
+            if batch:
+                classify(batch, starts)
+            
+            # Tail shorter than a window: classify it on its own unless it was already covered
+            tail_is_new = result["windows"] == 0 or len(buffer) > win - stride
+            if len(buffer) >= sample_rate * 0.5 and tail_is_new:
+                classify([buffer], [consumed])
+            
+            if posterior_sum is None:
+                return result
+            
+            distribution = posterior_sum / result["windows"]
+            top_probs, top_ids = torch.topk(distribution, k=min(5, distribution.numel()))
+            labels = self.model.hparams.label_encoder.decode_torch(top_ids)
+            result["distribution"] = {
+                label.split(":")[0].strip(): float(p) for label, p in zip(labels, top_probs)
+            }
+            result["language"] = next(iter(result["distribution"]))
+            
+            # A file that is mostly one language has a diluted mean posterior; the windows
+            # that language actually won say how sure the model is about it
+            won = [p for language, p in window_votes if language == result["language"]]
+            result["vote_share"] = len(won) / len(window_votes)
+            result["confidence"] = sum(won) / len(won) if won else 0.0
+            result["timeline"] = timeline
+            return result
+        except Exception as e:
+            print(f"Windowed language detection error: {e}")
+            return result
+    
+    def embed_windows(self, audio_tensor, window_seconds=1.0, hop_seconds=0.25,
+                      sample_rate=16000, batch_size=32):
+        """
+        ECAPA embeddings over short overlapping windows
+        Returns: torch.Tensor of shape (num_windows, embedding_dim)
+        """
+        audio_tensor = audio_tensor.flatten()
+        win = int(window_seconds * sample_rate)
+        hop = int(hop_seconds * sample_rate)
+        if audio_tensor.numel() < win:
+            audio_tensor = F.pad(audio_tensor, (0, win - audio_tensor.numel()))
+        
+        windows = audio_tensor.unfold(0, win, hop)
+        embeddings = []
+        with torch.no_grad():
+            for i in range(0, windows.shape[0], batch_size):
+                embeddings.append(self.model.encode_batch(windows[i:i + batch_size]).squeeze(1))
+        return torch.cat(embeddings)
+    
+    @staticmethod
+    def find_change_points(embeddings, context=4, threshold=0.3, min_gap=4) -> List[int]:
+        """
+        Vectorized change-point detection over an embedding sequence
+        Scores every index by the cosine distance between the mean embedding of the
+        `context` windows before it and after it, then keeps local maxima above threshold
+        Returns: window indices where a new segment starts
+        """
+        n = embeddings.shape[0]
+        if n < 2 * context:
+            return []
+        
+        normed = F.normalize(embeddings, dim=-1)
+        cumsum = torch.cat([torch.zeros(1, normed.shape[1]), normed.cumsum(0)])
+        idx = torch.arange(context, n - context + 1)
+        left = cumsum[idx] - cumsum[idx - context]
+        right = cumsum[idx + context] - cumsum[idx]
+        scores = 1 - F.cosine_similarity(left, right, dim=-1)
+        
+        # Local maxima within +/- min_gap windows
+        padded = F.pad(scores.view(1, 1, -1), (min_gap, min_gap), value=-1.0)
+        local_max = F.max_pool1d(padded, 2 * min_gap + 1, stride=1).view(-1)
+        peaks = (scores >= local_max) & (scores > threshold)
+        return (idx[peaks]).tolist()
+    
+    def classify_embeddings(self, embeddings) -> Tuple[str, float]:
+        """Classify a mean embedding with the model's own classifier head"""
+        with torch.no_grad():
+            log_probs = self.model.mods.classifier(embeddings.mean(0).view(1, 1, -1)).squeeze(1)
+        score, index = torch.max(log_probs, dim=-1)
+        label = self.model.hparams.label_encoder.decode_torch(index)[0]
+        return label.split(":")[0].strip(), float(score.exp())
+    
+    def detect_segments(self, audio_tensor, window_seconds=1.0, hop_seconds=0.25,
+                        sample_rate=16000, threshold=0.3) -> List[Tuple[float, float, str, float]]:
+        """
+        Segment-level language ID for code-switched speech
+        Embeddings are computed once per window; each span is classified from the
+        mean of its windows' embeddings, so no audio is re-encoded
+        Returns:
+            list of (start_seconds, end_seconds, language_code, confidence)
+        """
+        if self.model is None:
+            return []
+        
+        try:
+            embeddings = self.embed_windows(audio_tensor, window_seconds, hop_seconds, sample_rate)
+            boundaries = [0] + self.find_change_points(embeddings, threshold=threshold) + [embeddings.shape[0]]
+            duration = audio_tensor.numel() / sample_rate
+            
+            spans = []
+            for start_idx, end_idx in zip(boundaries[:-1], boundaries[1:]):
+                language, confidence = self.classify_embeddings(embeddings[start_idx:end_idx])
+                # Boundary sits midway between the centres of the two windows it separates
+                start = 0.0 if start_idx == 0 else start_idx * hop_seconds + (window_seconds - hop_seconds) / 2
+                end = duration if end_idx == embeddings.shape[0] else end_idx * hop_seconds + (window_seconds - hop_seconds) / 2
+                
+                # Merge neighbours that ended up with the same label
+                if spans and spans[-1][2] == language:
+                    prev = spans.pop()
+                    spans.append((prev[0], end, language, max(prev[3], confidence)))
+                else:
+                    spans.append((start, end, language, confidence))
+            return spans
+        except Exception as e:
+            print(f"Segment language detection error: {e}")
+            return []
+    
     def is_confidence_high(self, confidence):
-        """Check if confidence is above threshold"""
+        """
+        Check if confidence is above threshold
+        Every detect_* method reports the winning language's posterior probability (0-1)
+        """
         return confidence >= self.confidence_threshold
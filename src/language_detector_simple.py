@@ -35,31 +35,57 @@ class SimpleLanguageDetector:
         return self.current_language, 0.7
     
     def _detect_from_text(self, text: str) -> Tuple[str, float]:
-        """Detect language from text patterns"""
+        """
+        Detect language from text patterns
+        Space-delimited languages are matched on whole words (substrings would let
+        "el" match "hello"); confidence combines how many words are function words
+        of the best language with its margin over the runner-up
+        """
         text_lower = text.lower()
+        words = [word.strip(".,!?;:¿¡\"()«»।") for word in text_lower.split()]
+        words = [word for word in words if word]
         
-        # Simple pattern matching for common languages
-        patterns = {
-            'en': ['the', 'and', 'is', 'are', 'was', 'were', 'have', 'has', 'had'],
-            'es': ['el', 'la', 'de', 'que', 'y', 'en', 'un', 'es', 'se', 'no'],
-            'fr': ['le', 'la', 'de', 'et', 'à', 'un', 'il', 'que', 'ne', 'se'],
-            'de': ['der', 'die', 'das', 'und', 'ist', 'sind', 'haben', 'mit', 'von'],
-            'hi': ['है', 'हैं', 'का', 'की', 'के', 'में', 'से', 'को', 'पर', 'तो'],
+        # Common function words per language
+        word_patterns = {
+            'en': {'the', 'and', 'is', 'are', 'was', 'were', 'have', 'has', 'had', 'you', 'i', 'it', 'to',
+                   'of', 'a', 'in', 'that', 'what', 'how', 'do', 'this', 'my', 'me', 'we', 'not', 'for',
+                   'on', 'with', 'can', 'be', 'your', 'will', 'there'},
+            'es': {'el', 'la', 'de', 'que', 'y', 'en', 'un', 'una', 'es', 'se', 'no', 'los', 'las', 'por',
+                   'con', 'para', 'como', 'está', 'estoy', 'yo', 'tú', 'qué', 'muy', 'pero', 'mi', 'del'},
+            'fr': {'le', 'la', 'de', 'et', 'à', 'un', 'une', 'il', 'que', 'ne', 'se', 'les', 'des', 'est',
+                   'je', 'tu', 'vous', 'nous', 'pas', 'pour', 'avec', 'dans', 'ce', "c'est", 'qui', 'du'},
+            'de': {'der', 'die', 'das', 'und', 'ist', 'sind', 'haben', 'mit', 'von', 'ich', 'du', 'nicht',
+                   'ein', 'eine', 'zu', 'es', 'wir', 'sie', 'auf', 'für', 'auch', 'wie', 'was'},
+            'it': {'il', 'di', 'che', 'e', 'la', 'un', 'una', 'è', 'per', 'non', 'sono', 'con', 'mi', 'ti',
+                   'lo', 'gli', 'della', 'come', 'sei', 'ciao'},
+            'pt': {'o', 'a', 'de', 'que', 'e', 'do', 'da', 'em', 'um', 'uma', 'é', 'não', 'para', 'com',
+                   'eu', 'você', 'os', 'as', 'está', 'muito'},
+            'hi': {'है', 'हैं', 'का', 'की', 'के', 'में', 'से', 'को', 'पर', 'तो'},
+        }
+        # Languages written without spaces are matched as substrings
+        char_patterns = {
             'zh': ['的', '了', '在', '是', '我', '你', '他', '她', '它', '们'],
             'ja': ['です', 'ます', 'の', 'を', 'に', 'は', 'が', 'と', 'で', 'から'],
             'ko': ['입니다', '습니다', '의', '을', '를', '에', '에서', '와', '과', '로']
         }
         
-        scores = {}
-        for lang, patterns_list in patterns.items():
-            score = sum(1 for pattern in patterns_list if pattern in text_lower)
-            if score > 0:
-                scores[lang] = score / len(patterns_list)
+        hits = {}
+        for lang, vocabulary in word_patterns.items():
+            count = sum(1 for word in words if word in vocabulary)
+            if count:
+                hits[lang] = count
+        for lang, patterns_list in char_patterns.items():
+            count = sum(1 for pattern in patterns_list if pattern in text_lower)
+            if count:
+                hits[lang] = count
         
-        if scores:
-            best_lang = max(scores, key=scores.get)
-            confidence = min(scores[best_lang] * 2, 1.0)  # Scale confidence
-            return best_lang, confidence
+        if hits:
+            ranked = sorted(hits.values(), reverse=True)
+            best_lang = max(hits, key=hits.get)
+            coverage = min(ranked[0] / max(len(words), 1) * 2, 1.0) if best_lang in word_patterns else \
+                min(ranked[0] / 5, 1.0)
+            margin = (ranked[0] - (ranked[1] if len(ranked) > 1 else 0)) / ranked[0]
+            return best_lang, coverage * margin
         
         return 'en', 0.5  # Default fallback
     
@@ -0,0 +1,165 @@
+"""
+Late Fusion of Acoustic and Text Language ID
+Uses the script and word evidence in ASR output to confirm the language
+cheaply, skipping the ECAPA pass for the next window when text is decisive
+"""
+from typing import Dict, Optional, Tuple
+
+from language_detector_simple import SimpleLanguageDetector
+
+# Unicode blocks that identify a language on their own
+SCRIPT_RANGES = {
+    'hi': [(0x0900, 0x097F)],                      # Devanagari
+    'ru': [(0x0400, 0x04FF)],                      # Cyrillic
+    'ar': [(0x0600, 0x06FF)],                      # Arabic
+    'ja': [(0x3040, 0x309F), (0x30A0, 0x30FF)],    # Hiragana, Katakana
+    'ko': [(0xAC00, 0xD7AF), (0x1100, 0x11FF)],    # Hangul
+    'zh': [(0x4E00, 0x9FFF)],                      # CJK ideographs
+}
+
+
+def script_scores(text: str) -> Dict[str, float]:
+    """Share of letters belonging to each language-specific script, plus 'latin'"""
+    counts = {}
+    letters = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        code = ord(char)
+        if code < 0x0250:
+            counts['latin'] = counts.get('latin', 0) + 1
+            continue
+        for lang, ranges in SCRIPT_RANGES.items():
+            if any(lo <= code <= hi for lo, hi in ranges):
+                counts[lang] = counts.get(lang, 0) + 1
+                break
+
+    if letters == 0:
+        return {}
+
+    # Kana marks Japanese even when mixed with kanji
+    if counts.get('ja') and counts.get('zh'):
+        counts['ja'] += counts.pop('zh')
+    return {lang: count / letters for lang, count in counts.items()}
+
+
+class LanguageFusion:
+    """
+    Combines acoustic (LanguageDetector) and text (script + word patterns) scores
+    Args:
+        acoustic_detector: object with detect_language(audio_tensor, features) -> (lang, conf)
+        text_weight: float - weight of text evidence in the fused score
+        decisive_threshold: float - text confidence that lets the next window skip ECAPA
+        min_chars: int - letters needed before text evidence counts as decisive
+        max_consecutive_skips: int - ECAPA runs at least once every this many + 1 windows,
+            so a recognizer that only writes one script (e.g. a Hindi-only Vosk model)
+            cannot keep the system locked to its language
+    """
+
+    def __init__(self, acoustic_detector, text_weight: float = 0.5, decisive_threshold: float = 0.9,
+                 min_chars: int = 8, max_consecutive_skips: int = 2):
+        self.acoustic_detector = acoustic_detector
+        self.text_detector = SimpleLanguageDetector()
+        self.text_weight = text_weight
+        self.decisive_threshold = decisive_threshold
+        self.min_chars = min_chars
+        self.max_consecutive_skips = max_consecutive_skips
+
+        self.language = "en"
+        self.confidence = 0.0
+        self._acoustic: Optional[Tuple[str, float]] = None
+        self._skip_next = False
+        self._consecutive_skips = 0
+        self.stats = {"windows": 0, "ecapa_calls": 0, "ecapa_skipped": 0, "ecapa_forced": 0,
+                      "text_decisive": 0, "text_overruled": 0}
+
+    def text_scores(self, text: str) -> Tuple[Dict[str, float], bool]:
+        """
+        Language scores from text alone
+        Returns: (scores, decisive)
+        """
+        scripts = script_scores(text)
+        letters = sum(1 for c in text if c.isalpha())
+        if not scripts:
+            return {}, False
+
+        best_script = max(scripts, key=scripts.get)
+        if best_script != 'latin':
+            decisive = letters >= self.min_chars and scripts[best_script] >= self.decisive_threshold
+            return {best_script: scripts[best_script]}, decisive
+
+        # Latin script: fall back to common-word patterns
+        language, confidence = self.text_detector._detect_from_text(text)
+        decisive = len(text.split()) >= 3 and confidence >= self.decisive_threshold
+        return {language: confidence * scripts['latin']}, decisive
+
+    def detect_acoustic(self, audio_tensor, features=None) -> Tuple[str, float]:
+        """
+        Acoustic pass for a window, skipped when the previous window's text was decisive
+        (at most max_consecutive_skips windows in a row)
+        Returns: (language, confidence) to route ASR with
+        """
+        self.stats["windows"] += 1
+        if self._skip_next and self._consecutive_skips < self.max_consecutive_skips:
+            self._skip_next = False
+            self._consecutive_skips += 1
+            self._acoustic = None
+            self.stats["ecapa_skipped"] += 1
+            return self.language, self.confidence
+
+        if self._skip_next:
+            self.stats["ecapa_forced"] += 1
+        self._skip_next = False
+        self._consecutive_skips = 0
+        self.stats["ecapa_calls"] += 1
+        self._acoustic = self.acoustic_detector.detect_language(audio_tensor, features=features)
+        return self._acoustic
+
+    def update_text(self, text: str) -> Tuple[str, float]:
+        """
+        Fuse the window's acoustic result with its transcription
+        Returns: fused (language, confidence)
+        """
+        scores: Dict[str, float] = {}
+        if self._acoustic is not None:
+            lang, conf = self._acoustic
+            scores[lang] = (1 - self.text_weight) * conf
+
+        decisive = False
+        overruled = False
+        if text and text.strip():
+            text_scores, decisive = self.text_scores(text)
+            for lang, conf in text_scores.items():
+                scores[lang] = scores.get(lang, 0.0) + self.text_weight * conf
+
+        if decisive and self._acoustic is not None:
+            # The transcript's script reflects the recognizer that produced it, so a
+            # confident acoustic vote for another language wins over it
+            acoustic_lang, acoustic_conf = self._acoustic
+            overruled = acoustic_lang not in text_scores and acoustic_conf >= self.decisive_threshold
+            decisive = decisive and not overruled
+
+        if overruled:
+            self.language, self.confidence = self._acoustic
+            self.stats["text_overruled"] += 1
+        elif decisive:
+            # Decisive text (unambiguous script or strong word evidence) overrides the acoustic vote
+            self.language = max(text_scores, key=text_scores.get)
+            self.confidence = text_scores[self.language]
+        elif scores:
+            self.language = max(scores, key=scores.get)
+            # Text alone (skipped window) is renormalized so confidence stays comparable
+            total_weight = (1 - self.text_weight if self._acoustic is not None else 0) + \
+                (self.text_weight if text and text.strip() else 0)
+            self.confidence = min(scores[self.language] / total_weight, 1.0) if total_weight else 0.0
+
+        if decisive:
+            self.stats["text_decisive"] += 1
+        self._skip_next = decisive
+        return self.language, self.confidence
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["skip_rate"] = stats["ecapa_skipped"] / stats["windows"] if stats["windows"] else 0.0
+        return stats
@@ -7,12 +7,20 @@ import os
 import numpy as np
 import torch
 import soundfile as sf
-from typing import Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Tuple
 
 from language_detector import LanguageDetector
+from language_fusion import LanguageFusion
 from speech_recognizer import SpeechRecognizer
+from speculative_asr import SpeculativeTranscriber
 from text_to_speech import TextToSpeech
 from audio_handler import AudioHandler
+from echo_gate import EchoGate
+from response_templates import ResponseSpeaker
+from pcm_io import AudioPlayer
+from whisper_utils import prepare_audio
 
 
 class LanguageSwitchSystem:
@@ -22,10 +30,16 @@ class LanguageSwitchSystem:
             confidence_threshold=self.config['models']['language_detection']['confidence_threshold']
         )
         self.speech_recognizer = SpeechRecognizer(
-            model_path=self.config['models']['speech_recognition']['model_path']
+            model_path=self.config['models']['speech_recognition']['model_path'],
+            partial_interval=self.config['models']['speech_recognition'].get('partial_interval', 0.25)
         )
+        tts_config = self.config['models']['text_to_speech']
         self.text_to_speech = TextToSpeech(
-            model_name=self.config['models']['text_to_speech']['model_name']
+            model_name=tts_config['model_name'],
+            cache_dir=tts_config.get('cache_dir', 'models/tts-cache'),
+            cache_max_mb=tts_config.get('cache_max_mb', 200),
+            speaker_wav=tts_config.get('speaker_wav'),
+            speaker_dir=tts_config.get('speaker_dir', 'models/speakers')
         )
         self.audio_handler = AudioHandler(
             sample_rate=self.config['audio']['sample_rate'],
@@ -33,6 +47,63 @@ class LanguageSwitchSystem:
         )
         self.current_language = "en"
         self.is_running = False
+        
+        # Late fusion with ASR text; decisive text skips the next window's ECAPA pass
+        self.fusion = None
+        lid_config = self.config['models']['language_detection']
+        if lid_config.get('text_fusion', False):
+            self.fusion = LanguageFusion(
+                self.language_detector,
+                text_weight=lid_config.get('text_weight', 0.5),
+                decisive_threshold=lid_config.get('text_decisive_threshold', 0.9),
+                max_consecutive_skips=lid_config.get('text_max_skips', 2)
+            )
+        
+        # Spoken "I heard: ..." responses play on a worker thread (created with the output
+        # device in run_realtime); the gate drops mic frames while they play
+        self.responder = None
+        self.echo_gate = EchoGate(
+            tail_seconds=self.config.get('processing', {}).get('echo_tail_seconds', 0.5),
+            sample_rate=self.config['audio']['sample_rate']
+        )
+        
+        # Optional per-language Vosk models; languages without one use the default model
+        self.recognizers = self._load_recognizers()
+        
+        # Speculative mode: decode now in current_language, let LID confirm in the background
+        self.speculative = None
+        self.lid_executor = None
+        self._confirmations = deque()  # pending LID results, oldest first
+        if self.config.get('processing', {}).get('speculative_asr', False):
+            if self.fusion is not None:
+                print("⚠️ speculative_asr and text_fusion are both enabled; "
+                      "text fusion is disabled (speculative ASR runs LID on every span)")
+                self.fusion = None
+            self.speculative = SpeculativeTranscriber(
+                self.get_recognizer,
+                language=self.current_language,
+                ring_seconds=self.config['processing'].get('speculative_ring_seconds', 10.0),
+                sample_rate=self.config['audio']['sample_rate']
+            )
+            self.lid_executor = ThreadPoolExecutor(max_workers=1)
+    
+    def _load_recognizers(self) -> dict:
+        """Load one recognizer per language listed in speech_recognition.model_paths"""
+        recognizers = {}
+        model_paths = self.config['models']['speech_recognition'].get('model_paths') or {}
+        for language, model_path in model_paths.items():
+            if model_path == self.speech_recognizer.model_path:
+                recognizers[language] = self.speech_recognizer
+            else:
+                recognizers[language] = SpeechRecognizer(
+                    model_path=model_path,
+                    partial_interval=self.speech_recognizer.partial_interval
+                )
+        return recognizers
+    
+    def get_recognizer(self, language: str) -> SpeechRecognizer:
+        """Recognizer for a language, falling back to the default model"""
+        return self.recognizers.get(language, self.speech_recognizer)
     
     def _load_config(self, config_path: str) -> dict:
         """Load configuration from YAML file"""
@@ -65,8 +136,17 @@ class LanguageSwitchSystem:
         if audio_tensor.numel() == 0:
             return None
         
+        # Fbanks already computed by the audio handler for this audio, if it is tracking features
+        features = self.audio_handler.feature_window(audio_tensor.numel())
+        
+        if self.speculative is not None:
+            return self._process_speculative(audio_bytes, audio_tensor, features)
+        
+        if self.fusion is not None:
+            return self._process_fused(audio_bytes, audio_tensor, features)
+        
         # Detect language
-        detected_lang, confidence = self.language_detector.detect_language(audio_tensor)
+        detected_lang, confidence = self.language_detector.detect_language(audio_tensor, features=features)
         
         # Only process if confidence is high enough
         if self.language_detector.is_confidence_high(confidence):
@@ -75,11 +155,57 @@ class LanguageSwitchSystem:
                 self.current_language = detected_lang
             
             # Transcribe speech
-            transcription = self.speech_recognizer.transcribe_audio(audio_bytes, detected_lang)
+            transcription = self.get_recognizer(detected_lang).transcribe_audio(audio_bytes, detected_lang)
             return transcription
         
         return None
     
+    def _process_fused(self, audio_bytes: bytes, audio_tensor: torch.Tensor, features=None) -> Optional[str]:
+        """Acoustic LID (unless skipped) routes ASR; the transcript then refines the language"""
+        detected_lang, confidence = self.fusion.detect_acoustic(audio_tensor, features=features)
+        if self.language_detector.is_confidence_high(confidence):
+            language = detected_lang
+        else:
+            language = self.current_language
+        
+        transcription = self.get_recognizer(language).transcribe_audio(audio_bytes, language)
+        
+        fused_lang, fused_conf = self.fusion.update_text(transcription)
+        if self.language_detector.is_confidence_high(fused_conf) and fused_lang != self.current_language:
+            print(f"Language switched: {self.current_language} → {fused_lang} (fused confidence: {fused_conf:.2f})")
+            self.current_language = fused_lang
+        return transcription or None
+    
+    def _process_speculative(self, audio_bytes: bytes, audio_tensor: torch.Tensor, features=None) -> Optional[str]:
+        """Transcribe in the current language now; LID runs on a worker and may roll back"""
+        # Language switches confirmed by the LID worker are applied here, on the capture thread
+        while self._confirmations and self._confirmations[0].done():
+            detected = self._confirmations.popleft().result()
+            if detected is not None and detected[0] != self.current_language:
+                print(f"Language switched: {self.current_language} → {detected[0]} (confidence: {detected[1]:.2f})")
+                self.current_language = detected[0]
+        
+        span = self.speculative.transcribe(audio_bytes)
+        self._confirmations.append(self.lid_executor.submit(self._confirm_span, span.span_id, audio_tensor, features))
+        return span.text
+    
+    def _confirm_span(self, span_id: int, audio_tensor: torch.Tensor, features=None) -> Optional[Tuple[str, float]]:
+        """
+        LID worker: confirm the speculated language or re-decode with the detected one
+        Returns: (language, confidence) for the capture thread, or None if LID was not confident
+        """
+        try:
+            detected_lang, confidence = self.language_detector.detect_language(audio_tensor, features=features)
+            if not self.language_detector.is_confidence_high(confidence):
+                return None
+            
+            for span in self.speculative.confirm_language(span_id, detected_lang):
+                print(f"↩️ [{span.language.upper()}] {span.text}")
+            return detected_lang, confidence
+        except Exception as e:
+            print(f"Language confirmation error: {e}")
+            return None
+    
     def run_realtime(self):
         """Run real-time language switching"""
         print("🎤 Starting real-time language switch system...")
@@ -89,6 +215,25 @@ class LanguageSwitchSystem:
             print("✗ Failed to start audio recording")
             return
         
+        # Language ID reads fbanks from the handler's shared ring instead of recomputing them,
+        # but only once they are shown to match the model's own front-end
+        if self.config['audio'].get('shared_features', False):
+            if self.language_detector.features_compatible():
+                self.audio_handler.acquire_features(fbank_mels=self.language_detector.feature_bins)
+            else:
+                print("⚠️ Shared features disabled; language ID computes its own fbanks")
+        
+        # "I heard:" prefixes are pre-rendered per language; only the transcription is synthesized
+        if self.config.get('processing', {}).get('speak_responses', False):
+            tts_config = self.config['models']['text_to_speech']
+            self.responder = ResponseSpeaker(
+                self.text_to_speech, tts_config.get('languages'),
+                player=AudioPlayer(self.audio_handler.audio),
+                templates=tts_config.get('templates'),
+                crossfade_ms=tts_config.get('crossfade_ms', 15.0)
+            )
+            self.echo_gate.playback = self.responder
+        
         self.is_running = True
         audio_buffer = b""
         
@@ -96,7 +241,7 @@ class LanguageSwitchSystem:
             while self.is_running:
                 # Read audio chunk
                 chunk = self.audio_handler.read_audio_chunk()
-                if chunk is None:
+                if chunk is None or self.echo_gate.process(chunk) is None:
                     continue
                 
                 audio_buffer += chunk
@@ -108,12 +253,9 @@ class LanguageSwitchSystem:
                     if transcription and transcription.strip():
                         print(f"[{self.current_language.upper()}] {transcription}")
                         
-                        # Synthesize response (optional)
-                        # self.text_to_speech.synthesize_speech(
-                        #     f"I heard: {transcription}",
-                        #     self.current_language,
-                        #     f"response_{int(time.time())}.wav"
-                        # )
+                        # Speak response (optional) without blocking capture
+                        if self.responder is not None:
+                            self.responder.speak(transcription, self.current_language)
                     
                     audio_buffer = b""  # Reset buffer
                 
@@ -124,28 +266,46 @@ class LanguageSwitchSystem:
         finally:
             self.cleanup()
     
+    def _file_blocks(self, input_file: str, block_seconds: float = 10.0):
+        """Stream a file as float32 mono 16 kHz blocks without decoding it whole"""
+        sample_rate = sf.info(input_file).samplerate
+        for block in sf.blocks(input_file, blocksize=int(block_seconds * sample_rate),
+                               dtype='float32', always_2d=True):
+            yield prepare_audio(block, sample_rate)
+    
     def process_file(self, input_file: str, output_file: str = None):
         """Process an audio file"""
         print(f"📁 Processing file: {input_file}")
         
         try:
-            # Load audio file
-            audio_data, sample_rate = sf.read(input_file)
-            audio_tensor = torch.tensor(audio_data, dtype=torch.float32)
-            
-            # Detect language
-            detected_lang, confidence = self.language_detector.detect_language(audio_tensor)
-            print(f"Detected language: {detected_lang} (confidence: {confidence:.2f})")
+            # Windowed LID: memory bounded by window and batch size, not file length
+            lid_config = self.config['models']['language_detection']
+            lid = self.language_detector.detect_language_windows(
+                self._file_blocks(input_file),
+                window_seconds=lid_config.get('window_seconds', 3.0),
+                stride_seconds=lid_config.get('stride_seconds', 1.5),
+                batch_size=lid_config.get('batch_size', 16)
+            )
+            detected_lang, confidence = lid['language'], lid['confidence']
+            print(f"Detected language: {detected_lang} (confidence: {confidence:.2f}, "
+                  f"won {lid['vote_share']:.0%} of {lid['windows']} windows)")
+            print("📊 Distribution: " + ", ".join(f"{lang} {p:.2f}" for lang, p in lid['distribution'].items()))
+            for start, end, language, window_conf in lid['timeline']:
+                print(f"  [{start:7.1f}s - {end:7.1f}s] {language} ({window_conf:.2f})")
             
             if not self.language_detector.is_confidence_high(confidence):
                 print("⚠️ Low confidence in language detection")
                 return
             
-            # Convert to bytes for Vosk
-            audio_bytes = (audio_tensor * 32768.0).numpy().astype(np.int16).tobytes()
-            
-            # Transcribe
-            transcription = self.speech_recognizer.transcribe_audio(audio_bytes, detected_lang)
+            # Transcribe block by block through a streaming recognizer
+            stream = self.get_recognizer(detected_lang).create_stream()
+            if stream is None:
+                return
+            chunks = (
+                (np.clip(block, -1.0, 1.0) * 32767).astype(np.int16).tobytes()
+                for block in self._file_blocks(input_file)
+            )
+            transcription = " ".join(event.text for event in stream.stream(chunks) if event.is_final)
             print(f"Transcription: {transcription}")
             
             # Synthesize
@@ -161,9 +321,51 @@ class LanguageSwitchSystem:
         except Exception as e:
             print(f"File processing error: {e}")
     
+    def process_file_segments(self, input_file: str) -> list:
+        """
+        Process a code-switched file: segment-level LID, then route each span
+        to the recognizer for its language
+        Returns: list of (start, end, language, transcription)
+        """
+        print(f"📁 Processing file by language segments: {input_file}")
+        
+        try:
+            audio_data, sample_rate = sf.read(input_file)
+            audio = prepare_audio(audio_data, sample_rate)
+            audio_tensor = torch.from_numpy(audio)
+            
+            results = []
+            for start, end, language, confidence in self.language_detector.detect_segments(audio_tensor):
+                span = audio[int(start * 16000):int(end * 16000)]
+                span_bytes = (span * 32767).astype(np.int16).tobytes()
+                transcription = self.get_recognizer(language).transcribe_segment(span_bytes)
+                print(f"[{start:6.2f}-{end:6.2f}] [{language.upper()}] ({confidence:.2f}) {transcription}")
+                results.append((start, end, language, transcription))
+            return results
+        
+        except Exception as e:
+            print(f"File processing error: {e}")
+            return []
+    
     def cleanup(self):
         """Clean up resources"""
         self.is_running = False
+        if self.lid_executor:
+            self.lid_executor.shutdown(wait=False)
+        if self.audio_handler.features is not None:
+            self.audio_handler.release_features()
+        if self.echo_gate.stats["discarded_frames"]:
+            print(f"📊 Echo frames discarded: {self.echo_gate.stats['discarded_frames']}")
+        if self.responder:
+            stats = self.responder.get_stats()
+            if stats["responses"]:
+                print(f"📊 Response audio after {stats['mean_time_to_first_audio'] * 1000:.0f} ms on average")
+            self.responder.stop()
+        if self.fusion:
+            stats = self.fusion.get_stats()
+            print(f"📊 ECAPA calls: {stats['ecapa_calls']}, skipped: {stats['ecapa_skipped']} "
+                  f"({stats['skip_rate']:.1%} of windows)")
+        self.text_to_speech.close()
         self.audio_handler.cleanup()
         print("✓ System cleaned up")
 
@@ -177,6 +379,8 @@ def main():
                        help="Run mode: realtime or file processing")
     parser.add_argument("--input", type=str, help="Input audio file (for file mode)")
     parser.add_argument("--output", type=str, help="Output audio file (for file mode)")
+    parser.add_argument("--segments", action="store_true",
+                       help="File mode: per-span language ID for code-switched speech")
     
     args = parser.parse_args()
     
@@ -185,6 +389,8 @@ def main():
     
     if args.mode == "realtime":
         system.run_realtime()
+    elif args.mode == "file" and args.input and args.segments:
+        system.process_file_segments(args.input)
     elif args.mode == "file" and args.input:
         system.process_file(args.input, args.output)
     else:
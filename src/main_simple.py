@@ -12,7 +12,10 @@ from typing import Optional
 from language_detector_simple import SimpleLanguageDetector
 from speech_recognizer_simple import SimpleSpeechRecognizer
 from text_to_speech_simple import SimpleTextToSpeech
+from echo_gate import EchoGate
 from audio_handler import AudioHandler
+from response_templates import ResponseSpeaker
+from pcm_io import AudioPlayer
 
 
 class SimpleLanguageSwitchSystem:
@@ -22,15 +25,26 @@ class SimpleLanguageSwitchSystem:
             confidence_threshold=self.config['models']['language_detection']['confidence_threshold']
         )
         self.speech_recognizer = SimpleSpeechRecognizer(
-            model_path=self.config['models']['speech_recognition']['model_path']
+            model_path=self.config['models']['speech_recognition']['model_path'],
+            partial_interval=self.config['models']['speech_recognition'].get('partial_interval', 0.25)
         )
+        tts_config = self.config['models']['text_to_speech']
         self.text_to_speech = SimpleTextToSpeech(
-            model_name=self.config['models']['text_to_speech']['model_name']
+            model_name=tts_config['model_name'],
+            cache_dir=tts_config.get('cache_dir', 'models/tts-cache'),
+            cache_max_mb=tts_config.get('cache_max_mb', 200),
+            languages=tts_config.get('languages')
         )
         self.audio_handler = AudioHandler(
             sample_rate=self.config['audio']['sample_rate'],
             chunk_size=self.config['audio']['chunk_size']
         )
+        self.echo_gate = EchoGate(
+            self.text_to_speech,
+            tail_seconds=self.config.get('processing', {}).get('echo_tail_seconds', 0.5),
+            sample_rate=self.config['audio']['sample_rate']
+        )
+        self.responder = None
         self.current_language = "en"
         self.is_running = False
     
@@ -103,6 +117,14 @@ class SimpleLanguageSwitchSystem:
             print("💡 Check microphone permissions and try again")
             return
         
+        # "I heard:" prefixes are pre-rendered; only the transcription is synthesized per response
+        tts_config = self.config['models']['text_to_speech']
+        self.responder = ResponseSpeaker(
+            self.text_to_speech, player=AudioPlayer(self.audio_handler.audio),
+            templates=tts_config.get('templates'), crossfade_ms=tts_config.get('crossfade_ms', 15.0)
+        )
+        self.echo_gate.playback = self.responder
+        
         self.is_running = True
         audio_buffer = b""
         
@@ -110,7 +132,7 @@ class SimpleLanguageSwitchSystem:
             while self.is_running:
                 # Read audio chunk
                 chunk = self.audio_handler.read_audio_chunk()
-                if chunk is None:
+                if chunk is None or self.echo_gate.process(chunk) is None:
                     continue
                 
                 audio_buffer += chunk
@@ -122,11 +144,8 @@ class SimpleLanguageSwitchSystem:
                     if transcription and transcription.strip():
                         print(f"[{self.current_language.upper()}] {transcription}")
                         
-                        # Speak response (if TTS is available)
-                        self.text_to_speech.speak_text(
-                            f"I heard: {transcription}",
-                            self.current_language
-                        )
+                        # Speak response (if TTS is available) without blocking capture
+                        self.responder.speak(transcription, self.current_language)
                     
                     audio_buffer = b""  # Reset buffer
                 
@@ -214,6 +233,11 @@ class SimpleLanguageSwitchSystem:
     def cleanup(self):
         """Clean up resources"""
         self.is_running = False
+        if self.echo_gate.stats["discarded_frames"]:
+            print(f"📊 Echo frames discarded: {self.echo_gate.stats['discarded_frames']}")
+        if self.responder:
+            self.responder.stop()
+        self.text_to_speech.stop_worker()
         self.audio_handler.cleanup()
         print("✓ System cleaned up")
 
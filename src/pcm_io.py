@@ -0,0 +1,142 @@
+"""
+In-memory PCM Helpers
+Convert synthesized audio between float32/int16 and WAV bytes, and write it
+to caller-provided buffers or sockets without touching the filesystem,
+or play it on the default output device
+"""
+import io
+import shutil
+import subprocess
+import threading
+import wave
+import numpy as np
+from typing import Optional, Tuple
+
+
+def to_dtype(pcm, dtype: str = "float32") -> np.ndarray:
+    """Mono PCM as float32 in [-1, 1] or int16"""
+    pcm = np.asarray(pcm)
+    if pcm.dtype == np.int16:
+        pcm = pcm.astype(np.float32) / 32768.0
+    pcm = pcm.astype(np.float32, copy=False).ravel()
+    if np.dtype(dtype) == np.int16:
+        return (np.clip(pcm, -1.0, 1.0) * 32767).astype(np.int16)
+    return pcm
+
+
+def wav_bytes(pcm, sample_rate: int) -> bytes:
+    """16-bit mono WAV file contents"""
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(to_dtype(pcm, "int16").tobytes())
+    return buffer.getvalue()
+
+
+def read_wav_bytes(data: bytes, dtype: str = "float32") -> Tuple[np.ndarray, int]:
+    """Decode 8/16/32-bit PCM WAV contents to mono (pcm, sample_rate)"""
+    with wave.open(io.BytesIO(data), "rb") as wav:
+        sample_rate = wav.getframerate()
+        channels = wav.getnchannels()
+        width = wav.getsampwidth()
+        frames = wav.readframes(wav.getnframes())
+
+    if width == 1:
+        pcm = (np.frombuffer(frames, dtype=np.uint8).astype(np.float32) - 128) / 128.0
+    elif width == 2:
+        pcm = np.frombuffer(frames, dtype=np.int16).astype(np.float32) / 32768.0
+    elif width == 4:
+        pcm = np.frombuffer(frames, dtype=np.int32).astype(np.float32) / 2147483648.0
+    else:
+        raise ValueError(f"Unsupported WAV sample width: {width}")
+
+    if channels > 1:
+        pcm = pcm.reshape(-1, channels).mean(axis=1)
+    return to_dtype(pcm, dtype), sample_rate
+
+
+def write_pcm(target, pcm, sample_rate: int, fmt: str = "wav") -> int:
+    """
+    Write audio to a file-like object (write) or socket (sendall)
+    Args:
+        fmt: "wav" for a complete WAV file, "pcm" for raw 16-bit little-endian samples
+    Returns:
+        int - bytes written
+    """
+    data = wav_bytes(pcm, sample_rate) if fmt == "wav" else to_dtype(pcm, "int16").tobytes()
+    if hasattr(target, "sendall"):
+        target.sendall(data)
+    else:
+        target.write(data)
+    return len(data)
+
+
+def espeak_to_array(text: str, language: str = "en", dtype: str = "float32") -> Optional[Tuple[np.ndarray, int]]:
+    """Render with `espeak --stdout` straight into memory; None if espeak is unavailable"""
+    if shutil.which("espeak") is None:
+        return None
+    result = subprocess.run(["espeak", "-v", language, "--stdout", text], capture_output=True, check=True)
+    return read_wav_bytes(result.stdout, dtype)
+
+
+class AudioPlayer:
+    """
+    Blocking float32 playback on a lazily opened PyAudio output stream
+    The stream is reopened when the sample rate changes; interrupt() makes the
+    current and later play() calls return early until resume()
+    Args:
+        pyaudio_instance: existing pyaudio.PyAudio to open streams on (one is created otherwise)
+        block_seconds: float - write granularity, i.e. how quickly interrupt() takes effect
+    """
+
+    def __init__(self, pyaudio_instance=None, block_seconds: float = 0.05):
+        self.block_seconds = block_seconds
+        self._pyaudio = pyaudio_instance
+        self._owns_pyaudio = pyaudio_instance is None
+        self._stream = None
+        self._rate = None
+        self.interrupted = threading.Event()
+
+    def play(self, pcm, sample_rate: int):
+        if self.interrupted.is_set():
+            return
+        if self._stream is not None and self._rate != sample_rate:
+            self._close_stream()
+        if self._stream is None:
+            import pyaudio
+            if self._pyaudio is None:
+                self._pyaudio = pyaudio.PyAudio()
+            self._stream = self._pyaudio.open(format=pyaudio.paFloat32, channels=1, rate=sample_rate, output=True)
+            self._rate = sample_rate
+
+        data = np.clip(to_dtype(pcm), -1.0, 1.0)
+        block = max(int(self.block_seconds * sample_rate), 1)
+        for start in range(0, len(data), block):
+            if self.interrupted.is_set():
+                return
+            self._stream.write(data[start:start + block].tobytes())
+
+    def interrupt(self):
+        self.interrupted.set()
+
+    def resume(self):
+        self.interrupted.clear()
+
+    def _close_stream(self):
+        if self._stream is not None:
+            try:
+                self._stream.stop_stream()
+                self._stream.close()
+            except Exception as e:
+                print(f"Audio output close error: {e}")
+            self._stream = None
+            self._rate = None
+
+    def close(self):
+        """Release the output stream, and the PyAudio instance if this player created it"""
+        self._close_stream()
+        if self._owns_pyaudio and self._pyaudio is not None:
+            self._pyaudio.terminate()
+            self._pyaudio = None
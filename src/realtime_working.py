@@ -11,6 +11,11 @@ import queue
 import json
 from typing import Optional
 
+from text_to_speech_simple import SimpleTextToSpeech
+from response_templates import ResponseSpeaker, load_response_settings
+from pcm_io import AudioPlayer
+from echo_gate import EchoGate, load_echo_tail
+
 class WorkingRealTimeSystem:
     def __init__(self):
         self.audio_queue = queue.Queue()
@@ -45,9 +50,12 @@ class WorkingRealTimeSystem:
         self.vosk_recognizer = None
         self._init_vosk()
         
-        # Initialize TTS
-        self.tts_engine = None
+        # Initialize TTS (responses play on their own worker thread)
+        self.responder = None
         self._init_tts()
+        
+        # Drop mic frames while our own response is playing
+        self.echo_gate = EchoGate(self.responder, tail_seconds=load_echo_tail(), sample_rate=self.sample_rate)
     
     def _init_vosk(self):
         """Initialize Vosk speech recognition"""
@@ -66,17 +74,13 @@ class WorkingRealTimeSystem:
             self.vosk_recognizer = None
     
     def _init_tts(self):
-        """Initialize text-to-speech"""
-        try:
-            import pyttsx3
-            self.tts_engine = pyttsx3.init()
-            print("✓ TTS engine loaded")
-        except Exception as e:
-            print(f"⚠️ TTS initialization failed: {e}")
+        """Initialize text-to-speech: "I heard:" prefixes are pre-rendered, only the transcription is synthesized"""
+        self.responder = ResponseSpeaker(SimpleTextToSpeech(cache_dir=None), player=AudioPlayer(self.audio),
+                                         **load_response_settings())
     
     def _audio_callback(self, in_data, frame_count, time_info, status):
         """Audio callback function"""
-        if self.is_recording:
+        if self.is_recording and self.echo_gate.process(in_data) is not None:
             self.audio_queue.put(in_data)
         return (in_data, pyaudio.paContinue)
     
@@ -130,16 +134,12 @@ class WorkingRealTimeSystem:
             print(f"Speech recognition error: {e}")
             return ""
     
-    def speak_text(self, text: str):
-        """Speak text using TTS"""
-        if self.tts_engine is None or not text.strip():
+    def respond(self, text: str):
+        """Queue an "I heard: <text>" response; a new response interrupts a stale one"""
+        if self.responder is None or not text.strip():
             return
         
-        try:
-            self.tts_engine.say(text)
-            self.tts_engine.runAndWait()
-        except Exception as e:
-            print(f"TTS error: {e}")
+        self.responder.speak(text, self.current_language)
     
     def run_realtime(self):
         """Run real-time language switching"""
@@ -227,8 +227,7 @@ class WorkingRealTimeSystem:
                         print(f"\n🎯 [{self.current_language.upper()}] {transcription}")
                         
                         # Speak response
-                        response = f"I heard: {transcription}"
-                        self.speak_text(response)
+                        self.respond(transcription)
                         
                         last_transcription = transcription
                     else:
@@ -245,6 +244,10 @@ class WorkingRealTimeSystem:
     def cleanup(self):
         """Clean up resources"""
         self.is_recording = False
+        if self.echo_gate.stats["discarded_frames"]:
+            print(f"📊 Echo frames discarded: {self.echo_gate.stats['discarded_frames']}")
+        if self.responder:
+            self.responder.stop()
         if self.audio:
             self.audio.terminate()
 
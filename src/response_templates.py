@@ -0,0 +1,304 @@
+"""
+Response Templates with Phrase Splicing
+Static parts of a response ("I heard: ") are rendered once per language and
+voice at startup; only the dynamic slot is synthesized per response and
+spliced onto them with a short crossfade
+"""
+import string
+import threading
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pcm_io import AudioPlayer, espeak_to_array
+from tts_worker import TTSWorker
+
+DEFAULT_TEMPLATES = {
+    "heard": {
+        "en": "I heard: {text}",
+        "es": "Escuché: {text}",
+        "fr": "J'ai entendu : {text}",
+        "de": "Ich habe gehört: {text}",
+        "hi": "मैंने सुना: {text}",
+    }
+}
+
+
+def load_response_settings(config_path: str = "config.yaml") -> dict:
+    """ResponseSpeaker keyword arguments from models.text_to_speech (templates, crossfade_ms), empty when unreadable"""
+    try:
+        import yaml
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file)
+        tts_config = config['models']['text_to_speech']
+    except Exception:
+        return {}
+    return {key: tts_config[key] for key in ("templates", "crossfade_ms") if tts_config.get(key) is not None}
+
+
+def trim_silence(pcm: np.ndarray, threshold: float = 0.01, pad: int = 160) -> np.ndarray:
+    """Strip leading/trailing samples below threshold, keeping a few ms of padding"""
+    loud = np.flatnonzero(np.abs(pcm) > threshold)
+    if len(loud) == 0:
+        return pcm[:0]
+    return pcm[max(loud[0] - pad, 0):loud[-1] + pad + 1]
+
+
+def crossfade(head: np.ndarray, tail: np.ndarray, fade: int) -> np.ndarray:
+    """Join two clips, overlapping the last/first `fade` samples with a linear ramp"""
+    fade = min(fade, len(head), len(tail))
+    if fade == 0:
+        return np.concatenate([head, tail])
+    ramp = np.linspace(0.0, 1.0, fade, dtype=np.float32)
+    mixed = head[-fade:] * (1.0 - ramp) + tail[:fade] * ramp
+    return np.concatenate([head[:-fade], mixed, tail[fade:]])
+
+
+class ResponseRenderer:
+    """
+    Args:
+        tts: engine with synthesize_to_array(text, language) -> (pcm, sample_rate);
+            an optional `voice` attribute is part of the pre-render key
+        templates: {name: {language: "static {slot} static"}}; "en" is the fallback language
+        crossfade_ms: float - overlap between static and dynamic segments
+    """
+
+    def __init__(self, tts, templates: Optional[Dict[str, Dict[str, str]]] = None, crossfade_ms: float = 15.0):
+        self.tts = tts
+        self.templates = templates or DEFAULT_TEMPLATES
+        self.crossfade_ms = crossfade_ms
+        self.segments = {}  # (template, language, voice, index) -> pcm
+        self.sample_rates = {}
+        self.stats = {"responses": 0, "time_to_first_audio": 0.0, "prerender_seconds": 0.0}
+
+    def _template(self, name: str, language: str) -> str:
+        variants = self.templates[name]
+        return variants.get(language, variants.get("en", next(iter(variants.values()))))
+
+    @staticmethod
+    def _parts(template: str):
+        """Split a template into (literal, slot) pairs"""
+        return [(literal, slot) for literal, slot, _, _ in string.Formatter().parse(template)]
+
+    def _voice(self):
+        return getattr(self.tts, "voice", None)
+
+    def prerender(self, languages) -> int:
+        """Render every static segment for the given languages; returns segments rendered"""
+        start = time.perf_counter()
+        rendered = 0
+        for name in self.templates:
+            for language in languages:
+                for index, (literal, _) in enumerate(self._parts(self._template(name, language))):
+                    key = (name, language, self._voice(), index)
+                    if not literal.strip() or key in self.segments:
+                        continue
+                    pcm, sample_rate = self.tts.synthesize_to_array(literal.strip(), language)
+                    if pcm is None:
+                        continue
+                    self.segments[key] = trim_silence(pcm)
+                    self.sample_rates[language] = sample_rate
+                    rendered += 1
+        self.stats["prerender_seconds"] += time.perf_counter() - start
+        print(f"✓ Pre-rendered {rendered} response segments in {self.stats['prerender_seconds']:.2f}s")
+        return rendered
+
+    def _static(self, name: str, language: str, index: int, literal: str) -> Tuple[Optional[np.ndarray], int]:
+        key = (name, language, self._voice(), index)
+        if key not in self.segments:
+            pcm, sample_rate = self.tts.synthesize_to_array(literal.strip(), language)
+            if pcm is None:
+                return None, 0
+            self.segments[key] = trim_silence(pcm)
+            self.sample_rates[language] = sample_rate
+        return self.segments[key], self.sample_rates[language]
+
+    def stream(self, name: str, language: str, play: Callable[[np.ndarray, int], None], **slots) -> dict:
+        """
+        Play a response: each static segment starts playing immediately while the
+        following dynamic slot is synthesized on a worker thread
+        Returns: dict with time_to_first_audio and total_time
+        """
+        start = time.perf_counter()
+        first_audio = None
+        pending = None  # held-back tail of the previous piece, crossfaded into the next one
+        sample_rate = 0
+
+        for index, (literal, slot) in enumerate(self._parts(self._template(name, language))):
+            result = {}
+            worker = None
+            if slot is not None and str(slots.get(slot, "")).strip():
+                def synthesize(text=str(slots[slot])):
+                    result["audio"] = self.tts.synthesize_to_array(text, language)
+                worker = threading.Thread(target=synthesize, daemon=True)
+                worker.start()
+
+            pieces = []
+            if literal.strip():
+                pcm, sample_rate = self._static(name, language, index, literal)
+                if pcm is not None:
+                    pieces.append(pcm)
+            if worker is not None:
+                # Start the static part before waiting on the slot
+                if pieces:
+                    pending, first_audio = self._emit(pending, pieces.pop(), sample_rate, play, first_audio, start)
+                worker.join()
+                pcm, sample_rate = result.get("audio", (None, 0))
+                if pcm is not None:
+                    pieces.append(trim_silence(pcm))
+
+            for pcm in pieces:
+                pending, first_audio = self._emit(pending, pcm, sample_rate, play, first_audio, start)
+
+        if pending is not None and len(pending):
+            play(pending, sample_rate)
+
+        stats = {"time_to_first_audio": first_audio, "total_time": time.perf_counter() - start}
+        self.stats["responses"] += 1
+        self.stats["time_to_first_audio"] += first_audio or 0.0
+        return stats
+
+    def _emit(self, pending, pcm, sample_rate, play, first_audio, start):
+        """Play pcm joined to the held-back tail, holding back its own last crossfade window"""
+        fade = int(self.crossfade_ms / 1000 * sample_rate)
+        joined = pcm if pending is None else crossfade(pending, pcm, fade)
+        if len(joined) > fade:
+            if first_audio is None:
+                first_audio = time.perf_counter() - start
+            play(joined[:-fade] if fade else joined, sample_rate)
+            return (joined[-fade:] if fade else joined[:0]), first_audio
+        return joined, first_audio
+
+    def render(self, name: str, language: str, **slots) -> Tuple[Optional[np.ndarray], int]:
+        """Full spliced response as one array"""
+        chunks = []
+        sample_rate = 0
+
+        def collect(pcm, sr):
+            nonlocal sample_rate
+            chunks.append(pcm)
+            sample_rate = sr
+
+        self.stream(name, language, collect, **slots)
+        if not chunks:
+            return None, 0
+        return np.concatenate(chunks), sample_rate
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["mean_time_to_first_audio"] = (
+            stats["time_to_first_audio"] / stats["responses"] if stats["responses"] else 0.0
+        )
+        return stats
+
+
+class ResponseSpeaker:
+    """
+    Non-blocking templated responses for the real-time loops
+    A TTSWorker thread streams each response through ResponseRenderer and an
+    AudioPlayer; is_speaking / last_spoken_end come from that worker, so the
+    speaker can drive an EchoGate
+    Args:
+        tts: engine with synthesize_to_array (see ResponseRenderer)
+        languages: languages to pre-render static segments for (default: every template language)
+        name: template to speak
+        player: object with play(pcm, sample_rate), interrupt(), resume() and close()
+        templates: {name: {language: template}} passed to ResponseRenderer (default: DEFAULT_TEMPLATES)
+        crossfade_ms: float - overlap between static and dynamic segments
+    """
+
+    def __init__(self, tts, languages: Optional[List[str]] = None, name: str = "heard", player=None,
+                 templates: Optional[Dict[str, Dict[str, str]]] = None, crossfade_ms: float = 15.0):
+        self.name = name
+        self.renderer = ResponseRenderer(tts, templates=templates, crossfade_ms=crossfade_ms)
+        self.renderer.prerender(languages or list(self.renderer.templates[name]))
+        self.player = player or AudioPlayer()
+        self.worker = TTSWorker(engine_factory=None, speak_fn=self._speak,
+                                stop_fn=lambda _engine: self.player.interrupt())
+        self.worker.start()
+
+    def _speak(self, _engine, text: str, language: str):
+        self.player.resume()
+        self.renderer.stream(self.name, language, self.player.play, text=text)
+
+    def speak(self, text: str, language: str = "en", barge_in: bool = True) -> Optional[int]:
+        """Queue a response with text in its slot; returns the utterance id, or None for empty text"""
+        if not text.strip():
+            return None
+        return self.worker.speak(text, language, barge_in=barge_in)
+
+    @property
+    def is_speaking(self) -> bool:
+        return self.worker.is_speaking
+
+    @property
+    def last_spoken_end(self) -> float:
+        return self.worker.last_spoken_end
+
+    def stop(self):
+        """Drop queued responses, stop the worker and release the output device"""
+        self.worker.stop()
+        self.player.close()
+
+    def get_stats(self) -> dict:
+        return self.renderer.get_stats()
+
+
+class EspeakTTS:
+    """synthesize_to_array over `espeak --stdout`, for timing one engine on its own"""
+
+    def synthesize_to_array(self, text: str, language: str = "en", dtype: str = "float32"):
+        result = espeak_to_array(text, language, dtype)
+        return result if result is not None else (None, 0)
+
+
+def benchmark_templates(tts, texts, language: str = "en", name: str = "heard", repeats: int = 5) -> dict:
+    """
+    Time-to-first-audio for full-sentence synthesis vs the spliced template
+    Full synthesis has no audio until the whole sentence is rendered; the template
+    starts on its pre-rendered prefix. Each text is timed `repeats` times after a
+    warm-up call and the medians are reported
+    """
+    renderer = ResponseRenderer(tts)
+    renderer.prerender([language])
+    tts.synthesize_to_array(texts[0], language)
+
+    full, templated = [], []
+    for text in texts:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            tts.synthesize_to_array(renderer._template(name, language).format(text=text), language)
+            full.append(time.perf_counter() - start)
+            stats = renderer.stream(name, language, lambda pcm, sr: None, text=text)
+            templated.append(stats["time_to_first_audio"] or 0.0)
+
+    return {
+        "full_time_to_first_audio": float(np.median(full)),
+        "templated_time_to_first_audio": float(np.median(templated)),
+        "speedup": float(np.median(full) / max(np.median(templated), 1e-6))
+    }
+
+
+def main():
+    """Benchmark template splicing against full-sentence synthesis"""
+    import argparse
+    from text_to_speech_simple import SimpleTextToSpeech
+
+    parser = argparse.ArgumentParser(description="Response template benchmark")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--engine", choices=["espeak", "simple"], default="espeak",
+                        help="espeak --stdout only, or SimpleTextToSpeech's engine chain")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("texts", nargs="*", default=["hello there", "what time is it", "switch to spanish"])
+
+    args = parser.parse_args()
+
+    tts = EspeakTTS() if args.engine == "espeak" else SimpleTextToSpeech(cache_dir=None)
+    result = benchmark_templates(tts, args.texts, args.language, repeats=args.repeats)
+    print(f"📊 Full sentence: {result['full_time_to_first_audio'] * 1000:.0f} ms to first audio")
+    print(f"📊 Template:      {result['templated_time_to_first_audio'] * 1000:.0f} ms to first audio "
+          f"({result['speedup']:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
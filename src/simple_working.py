@@ -5,10 +5,14 @@ This version focuses on getting basic speech detection working
 import time
 import os
 import pyaudio
-import json
 import threading
 import queue
 
+from text_to_speech_simple import SimpleTextToSpeech
+from response_templates import ResponseSpeaker, load_response_settings
+from pcm_io import AudioPlayer
+from echo_gate import EchoGate, load_echo_tail
+
 class SimpleWorkingSystem:
     def __init__(self):
         self.audio = None
@@ -16,13 +20,16 @@ class SimpleWorkingSystem:
         self.is_recording = False
         self.vosk_model = None
         self.vosk_recognizer = None
-        self.tts_engine = None
+        self.vosk_stream = None
+        self.responder = None
+        self.echo_gate = None
         
         # Audio parameters
         self.sample_rate = 16000
         self.chunk_size = 4000
         self.channels = 1
         self.format = pyaudio.paInt16
+        self.partial_interval = 0.25  # seconds of audio between partial polls
         
         self._init_components()
     
@@ -45,44 +52,43 @@ class SimpleWorkingSystem:
                 print("🔄 Loading Vosk model...")
                 self.vosk_model = Model("models/vosk")
                 self.vosk_recognizer = KaldiRecognizer(self.vosk_model, self.sample_rate)
+                from streaming_recognizer import StreamingRecognizer
+                self.vosk_stream = StreamingRecognizer(
+                    self.vosk_model, self.sample_rate,
+                    partial_interval=self.partial_interval
+                )
                 print("✓ Vosk model loaded")
             else:
                 print("⚠️ Vosk model not found")
         except Exception as e:
             print(f"⚠️ Vosk initialization failed: {e}")
         
-        # Initialize TTS
-        try:
-            import pyttsx3
-            self.tts_engine = pyttsx3.init()
-            print("✓ TTS engine loaded")
-        except Exception as e:
-            print(f"⚠️ TTS initialization failed: {e}")
+        # Responses play on a worker thread so the mic is read while speaking;
+        # the "I heard:" prefix is pre-rendered and only the transcription is synthesized
+        self.responder = ResponseSpeaker(SimpleTextToSpeech(cache_dir=None), ["en"],
+                                         player=AudioPlayer(self.audio), **load_response_settings())
+        
+        # Drop mic frames while our own response is playing
+        self.echo_gate = EchoGate(self.responder, tail_seconds=load_echo_tail(), sample_rate=self.sample_rate)
     
-    def speak(self, text):
-        """Speak text"""
-        if self.tts_engine and text:
-            try:
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-            except Exception as e:
-                print(f"TTS error: {e}")
+    def respond(self, text):
+        """Queue an "I heard: <text>" response without blocking capture"""
+        if self.responder and text:
+            self.responder.speak(text, "en")
     
     def process_audio_chunk(self, audio_data):
-        """Process a chunk of audio data"""
-        if not self.vosk_recognizer:
-            return ""
+        """
+        Process a chunk of audio data
+        Returns: list of RecognitionEvent (partials carry only the changed suffix)
+        """
+        if not self.vosk_stream:
+            return []
         
         try:
-            if self.vosk_recognizer.AcceptWaveform(audio_data):
-                result = json.loads(self.vosk_recognizer.Result())
-                return result.get('text', '').strip()
-            else:
-                result = json.loads(self.vosk_recognizer.PartialResult())
-                return result.get('partial', '').strip()
+            return self.vosk_stream.feed(audio_data)
         except Exception as e:
             print(f"Processing error: {e}")
-            return ""
+            return []
     
     def run(self):
         """Run the real-time system"""
@@ -115,20 +121,21 @@ class SimpleWorkingSystem:
                 try:
                     # Read audio data
                     audio_data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+                    if self.echo_gate.process(audio_data) is None:
+                        continue
                     
                     # Process the audio
-                    transcription = self.process_audio_chunk(audio_data)
-                    
-                    if transcription and len(transcription) > 2:
-                        print(f"🎯 Speech detected: {transcription}")
-                        
-                        # Speak response
-                        response = f"I heard: {transcription}"
-                        self.speak(response)
+                    for event in self.process_audio_chunk(audio_data):
+                        if not event.is_final:
+                            if event.delta:
+                                print(f"🔄 ...{event.delta}")
+                            continue
                         
-                        # Reset recognizer for next phrase
-                        from vosk import KaldiRecognizer
-                        self.vosk_recognizer = KaldiRecognizer(self.vosk_model, self.sample_rate)
+                        if len(event.text) > 2:
+                            print(f"🎯 Speech detected: {event.text}")
+                            
+                            # Speak response
+                            self.respond(event.text)
                 
                 except Exception as e:
                     print(f"Audio processing error: {e}")
@@ -142,6 +149,10 @@ class SimpleWorkingSystem:
     def cleanup(self):
         """Clean up resources"""
         self.is_recording = False
+        if self.echo_gate and self.echo_gate.stats["discarded_frames"]:
+            print(f"📊 Echo frames discarded: {self.echo_gate.stats['discarded_frames']}")
+        if self.responder:
+            self.responder.stop()
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
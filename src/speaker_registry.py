@@ -0,0 +1,142 @@
+"""
+XTTS Speaker Registry
+Computes GPT conditioning latents and the speaker embedding once per
+reference clip and persists them as .npy files for reuse across calls and runs
+"""
+import hashlib
+import os
+import time
+import numpy as np
+from typing import Tuple
+
+
+def _file_digest(path: str) -> str:
+    digest = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()[:16]
+
+
+def _save_npy(path: str, array: np.ndarray):
+    """np.save via a temp file so readers never see a partial array"""
+    tmp_path = f"{path}.tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+class SpeakerRegistry:
+    """
+    Args:
+        tts_model: XTTS model exposing get_conditioning_latents(audio_path=[...])
+        registry_dir: str - where <name>-<digest>.gpt.npy / .spk.npy are stored
+    """
+
+    def __init__(self, tts_model, registry_dir: str = "models/speakers"):
+        self.tts_model = tts_model
+        self.registry_dir = registry_dir
+        self.latents = {}
+        self._keys = {}  # (path, mtime) -> key, so the clip is only hashed once
+        self.stats = {"computed": 0, "loaded": 0, "memory_hits": 0, "compute_seconds": 0.0}
+        os.makedirs(registry_dir, exist_ok=True)
+
+    def speaker_key(self, wav_path: str) -> str:
+        """Stable id for a reference clip: file stem plus content digest"""
+        stamp = (os.path.abspath(wav_path), os.path.getmtime(wav_path))
+        if stamp not in self._keys:
+            stem = os.path.splitext(os.path.basename(wav_path))[0]
+            self._keys[stamp] = f"{stem}-{_file_digest(wav_path)}"
+        return self._keys[stamp]
+
+    def _paths(self, key: str) -> Tuple[str, str]:
+        base = os.path.join(self.registry_dir, key)
+        return f"{base}.gpt.npy", f"{base}.spk.npy"
+
+    def get_latents(self, wav_path: str):
+        """
+        (gpt_cond_latent, speaker_embedding) tensors for a reference clip
+        Memory first, then the .npy files, computing and saving them on first use
+        """
+        import torch
+
+        key = self.speaker_key(wav_path)
+        if key in self.latents:
+            self.stats["memory_hits"] += 1
+            return self.latents[key]
+
+        gpt_path, spk_path = self._paths(key)
+        if os.path.exists(gpt_path) and os.path.exists(spk_path):
+            latents = (torch.from_numpy(np.load(gpt_path)), torch.from_numpy(np.load(spk_path)))
+            self.stats["loaded"] += 1
+        else:
+            start = time.perf_counter()
+            latents = self.tts_model.get_conditioning_latents(audio_path=[wav_path])
+            self.stats["compute_seconds"] += time.perf_counter() - start
+            self.stats["computed"] += 1
+            _save_npy(gpt_path, latents[0].cpu().numpy())
+            _save_npy(spk_path, latents[1].cpu().numpy())
+            print(f"✓ Speaker latents saved: {key}")
+
+        self.latents[key] = latents
+        return latents
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
+
+
+def benchmark_speaker(tts_model, wav_path: str, text: str = "This is a short benchmark sentence.",
+                      language: str = "en", runs: int = 3, registry_dir: str = "models/speakers") -> dict:
+    """
+    Per-call cost with and without cached latents
+    Returns: dict with mean conditioning, cached lookup and full-synthesis times
+    """
+    registry = SpeakerRegistry(tts_model, registry_dir)
+
+    conditioning, lookup, uncached, cached = [], [], [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        gpt_cond_latent, speaker_embedding = tts_model.get_conditioning_latents(audio_path=[wav_path])
+        conditioning.append(time.perf_counter() - start)
+        tts_model.inference(text, language, gpt_cond_latent, speaker_embedding)
+        uncached.append(time.perf_counter() - start)
+
+    registry.get_latents(wav_path)  # warm the registry
+    for _ in range(runs):
+        start = time.perf_counter()
+        gpt_cond_latent, speaker_embedding = registry.get_latents(wav_path)
+        lookup.append(time.perf_counter() - start)
+        tts_model.inference(text, language, gpt_cond_latent, speaker_embedding)
+        cached.append(time.perf_counter() - start)
+
+    return {
+        "conditioning_seconds": float(np.mean(conditioning)),
+        "cached_lookup_seconds": float(np.mean(lookup)),
+        "uncached_call_seconds": float(np.mean(uncached)),
+        "cached_call_seconds": float(np.mean(cached)),
+        "saved_per_call": float(np.mean(uncached) - np.mean(cached))
+    }
+
+
+def main():
+    """Benchmark cached vs recomputed speaker conditioning"""
+    import argparse
+    from TTS.api import TTS
+
+    parser = argparse.ArgumentParser(description="XTTS speaker latent benchmark")
+    parser.add_argument("speaker_wav", help="Reference speaker clip")
+    parser.add_argument("--model", default="tts_models/multilingual/multi-dataset/xtts_v2")
+    parser.add_argument("--language", default="en")
+    parser.add_argument("--runs", type=int, default=3)
+
+    args = parser.parse_args()
+
+    tts_model = TTS(model_name=args.model, progress_bar=False, gpu=False).synthesizer.tts_model
+    result = benchmark_speaker(tts_model, args.speaker_wav, language=args.language, runs=args.runs)
+    print(f"📊 Conditioning latents: {result['conditioning_seconds']:.3f}s per call, "
+          f"cached lookup {result['cached_lookup_seconds'] * 1000:.2f} ms")
+    print(f"📊 Full call: {result['uncached_call_seconds']:.2f}s → {result['cached_call_seconds']:.2f}s "
+          f"({result['saved_per_call']:.2f}s saved per call)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Speculative ASR with Rollback
+Transcribes immediately on the current language's streaming recognizer and
+re-decodes the affected audio only when language ID later confirms a switch
+to a language served by a different model
+"""
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Callable, List
+
+
+@dataclass
+class Span:
+    """One speculatively decoded stretch of audio"""
+    span_id: int
+    start: float
+    end: float
+    audio: bytes
+    language: str
+    text: str
+    confirmed: bool = False
+
+
+class SpeculativeTranscriber:
+    """
+    Args:
+        get_recognizer: callable mapping a language code to a recognizer with create_stream();
+            one StreamingRecognizer is kept per recognizer (i.e. per model)
+        language: str - language to speculate in until LID says otherwise
+        ring_seconds: float - how much recent audio is retained for re-decoding
+        sample_rate: int - sample rate of the 16-bit PCM spans
+    """
+
+    def __init__(self, get_recognizer: Callable, language: str = "en", ring_seconds: float = 10.0,
+                 sample_rate: int = 16000):
+        self.get_recognizer = get_recognizer
+        self.current_language = language
+        self.ring_seconds = ring_seconds
+        self.sample_rate = sample_rate
+        self.spans = deque()
+        self.stream_time = 0.0
+        self._next_id = 0
+        # id(recognizer) -> [stream, words of the open utterance already given to spans]
+        self._streams = {}
+        # Streams keep state, so decoding and rollback never interleave
+        self._lock = threading.RLock()
+        self.stats = {"spans": 0, "switches": 0, "redecoded_spans": 0, "redecoded_seconds": 0.0,
+                      "relabelled_spans": 0}
+
+    def transcribe(self, audio_bytes: bytes) -> Span:
+        """Decode a span right away on the current language's stream and keep it in the ring"""
+        with self._lock:
+            language = self.current_language
+            start = self.stream_time
+            self.stream_time += len(audio_bytes) / (2.0 * self.sample_rate)
+            span = Span(self._next_id, start, self.stream_time, audio_bytes, language, "")
+            self._next_id += 1
+
+            span.text = self._decode(self.get_recognizer(language), audio_bytes)
+
+            self.spans.append(span)
+            self.stats["spans"] += 1
+            while self.spans and self.stream_time - self.spans[0].end > self.ring_seconds:
+                self.spans.popleft()
+        return span
+
+    def confirm_language(self, span_id: int, language: str) -> List[Span]:
+        """
+        Apply an LID decision for a span
+        If it differs from the speculated language, switch; the span and every later
+        span decoded in the old language are replayed from the ring through a fresh
+        stream of the new language's recognizer. When both languages share one
+        model, the text cannot change and the spans are only relabelled.
+        Runs on the LID thread; the caller reads current_language for the switch
+        Returns: spans whose text changed
+        """
+        with self._lock:
+            affected = [s for s in self.spans if s.span_id >= span_id and s.language != language]
+            for span in self.spans:
+                if span.span_id == span_id:
+                    span.confirmed = True
+            if language != self.current_language:
+                self.current_language = language
+                self.stats["switches"] += 1
+            if not affected:
+                return []
+
+            recognizer = self.get_recognizer(language)
+            old_recognizers = {id(r): r for r in (self.get_recognizer(s.language) for s in affected)}
+            if all(r is recognizer for r in old_recognizers.values()):
+                for span in affected:
+                    span.language = language
+                    span.confirmed = True
+                self.stats["relabelled_spans"] += len(affected)
+                return []
+
+            # The old streams consumed audio in the wrong language; the new one restarts at the switch
+            for old in old_recognizers.values():
+                if old is not recognizer:
+                    self._reset_stream(old)
+            self._reset_stream(recognizer)
+
+            corrected = []
+            for span in affected:
+                span.text = self._decode(recognizer, span.audio)
+                span.language = language
+                span.confirmed = True
+                corrected.append(span)
+
+            self.stats["redecoded_spans"] += len(corrected)
+            self.stats["redecoded_seconds"] += sum(s.end - s.start for s in corrected)
+        return corrected
+
+    def _stream(self, recognizer) -> list:
+        key = id(recognizer)
+        if key not in self._streams:
+            self._streams[key] = [recognizer.create_stream(), 0]
+        return self._streams[key]
+
+    def _reset_stream(self, recognizer):
+        entry = self._stream(recognizer)
+        if entry[0] is not None:
+            entry[0].reset()
+        entry[1] = 0
+
+    def _decode(self, recognizer, audio_bytes: bytes) -> str:
+        """
+        Feed a span and return only the words it added
+        Partials and finals repeat the whole utterance so far; words already
+        given to earlier spans are dropped, and a final closes the utterance
+        """
+        entry = self._stream(recognizer)
+        stream = entry[0]
+        if stream is None:
+            return ""
+        own = []
+        for event in stream.feed(audio_bytes):
+            words = event.text.split()
+            own.extend(words[entry[1]:])
+            entry[1] = 0 if event.is_final else max(entry[1], len(words))
+        return " ".join(own)
+
+    def get_stats(self) -> dict:
+        return dict(self.stats)
@@ -5,12 +5,15 @@ import json
 import os
 from vosk import Model, KaldiRecognizer
 
+from streaming_recognizer import StreamingRecognizer
+
 
 class SpeechRecognizer:
-    def __init__(self, model_path="models/vosk"):
+    def __init__(self, model_path="models/vosk", partial_interval=0.25):
         self.model_path = model_path
+        self.partial_interval = partial_interval
         self.model = None
-        self.recognizer = None
+        self.stream = None
         self.current_language = None
         self._load_model()
     
@@ -19,7 +22,7 @@ class SpeechRecognizer:
         try:
             if os.path.exists(self.model_path):
                 self.model = Model(self.model_path)
-                self.recognizer = KaldiRecognizer(self.model, 16000)
+                self.stream = StreamingRecognizer(self.model, 16000, self.partial_interval, word_timings=False)
                 print("✓ Speech recognition model loaded")
             else:
                 print(f"✗ Vosk model not found at {self.model_path}")
@@ -28,6 +31,11 @@ class SpeechRecognizer:
             print(f"✗ Failed to load Vosk model: {e}")
             self.model = None
     
+    @property
+    def recognizer(self):
+        """Underlying KaldiRecognizer of the transcribe_audio stream (None without a model)"""
+        return self.stream.recognizer if self.stream is not None else None
+    
     def transcribe_audio(self, audio_data, language="en"):
         """
         Transcribe audio data to text
@@ -37,35 +45,65 @@ class SpeechRecognizer:
         Returns:
             str - transcribed text
         """
-        if self.recognizer is None:
+        if self.stream is None:
             return ""
         
         try:
-            # Process audio in chunks
-            if self.recognizer.AcceptWaveform(audio_data):
-                result = json.loads(self.recognizer.Result())
-                return result.get('text', '').strip()
-            else:
-                # Get partial result
-                result = json.loads(self.recognizer.PartialResult())
-                return result.get('partial', '').strip()
+            # Finals come back as soon as Vosk closes an utterance; partials are
+            # only re-polled every partial_interval seconds of audio
+            events = self.stream.feed(audio_data)
+            return events[-1].text if events else self.stream.hypothesis
         except Exception as e:
             print(f"Speech recognition error: {e}")
             return ""
     
+    def transcribe_segment(self, audio_data):
+        """
+        Transcribe a complete segment with a fresh recognizer
+        Unlike transcribe_audio this keeps no state between calls, so the
+        same audio can be re-decoded (e.g. by another language's model)
+        """
+        if self.model is None:
+            return ""
+        
+        try:
+            recognizer = KaldiRecognizer(self.model, 16000)
+            recognizer.AcceptWaveform(audio_data)
+            result = json.loads(recognizer.FinalResult())
+            return result.get('text', '').strip()
+        except Exception as e:
+            print(f"Speech recognition error: {e}")
+            return ""
+    
+    def create_stream(self, on_event=None):
+        """
+        Create an event-based stream over this model
+        Args:
+            on_event: optional callback called with each RecognitionEvent
+        Returns:
+            StreamingRecognizer or None if no model is loaded
+        """
+        if self.model is None:
+            return None
+        return StreamingRecognizer(
+            self.model, 16000,
+            partial_interval=self.partial_interval,
+            on_event=on_event
+        )
+    
     def finalize_transcription(self):
         """Get final transcription result"""
-        if self.recognizer is None:
+        if self.stream is None:
             return ""
         
         try:
-            result = json.loads(self.recognizer.FinalResult())
-            return result.get('text', '').strip()
+            event = self.stream.finish()
+            return event.text if event else ""
         except Exception as e:
             print(f"Final transcription error: {e}")
             return ""
     
     def reset(self):
         """Reset recognizer for new audio"""
-        if self.recognizer:
-            self.recognizer = KaldiRecognizer(self.model, 16000)
+        if self.stream:
+            self.stream.reset()
@@ -2,24 +2,25 @@
 Simple Speech Recognition Module - Lightweight alternative
 """
 import os
-import json
 from typing import Optional
 
 class SimpleSpeechRecognizer:
-    def __init__(self, model_path="models/vosk"):
+    def __init__(self, model_path="models/vosk", partial_interval=0.25):
         self.model_path = model_path
+        self.partial_interval = partial_interval
         self.model = None
-        self.recognizer = None
+        self.stream = None
         self.current_language = "en"
         self._try_load_vosk()
     
     def _try_load_vosk(self):
         """Try to load Vosk model, fallback to simple mode if not available"""
         try:
-            from vosk import Model, KaldiRecognizer
+            from vosk import Model
+            from streaming_recognizer import StreamingRecognizer
             if os.path.exists(self.model_path):
                 self.model = Model(self.model_path)
-                self.recognizer = KaldiRecognizer(self.model, 16000)
+                self.stream = StreamingRecognizer(self.model, 16000, self.partial_interval, word_timings=False)
                 print("✓ Vosk model loaded successfully")
             else:
                 print(f"⚠️ Vosk model not found at {self.model_path}")
@@ -35,6 +36,11 @@ class SimpleSpeechRecognizer:
         except Exception as e:
             print(f"⚠️ Vosk loading failed: {e}, running in simple mode")
     
+    @property
+    def recognizer(self):
+        """Underlying KaldiRecognizer of the transcribe_audio stream (None in simple mode)"""
+        return self.stream.recognizer if self.stream is not None else None
+    
     def transcribe_audio(self, audio_data: bytes, language: str = "en") -> str:
         """
         Transcribe audio data to text
@@ -44,21 +50,32 @@ class SimpleSpeechRecognizer:
         Returns:
             str - transcribed text
         """
-        if self.recognizer is None:
+        if self.stream is None:
             # Fallback: return placeholder text
             return "[Audio transcription not available - Vosk model needed]"
         
         try:
-            if self.recognizer.AcceptWaveform(audio_data):
-                result = json.loads(self.recognizer.Result())
-                return result.get('text', '').strip()
-            else:
-                result = json.loads(self.recognizer.PartialResult())
-                return result.get('partial', '').strip()
+            # Partials are only re-polled every partial_interval seconds of audio
+            events = self.stream.feed(audio_data)
+            return events[-1].text if events else self.stream.hypothesis
         except Exception as e:
             print(f"Speech recognition error: {e}")
             return ""
     
+    def create_stream(self, on_event=None):
+        """
+        Create an event-based stream over the Vosk model
+        Returns None in simple mode (no model loaded)
+        """
+        if self.model is None:
+            return None
+        from streaming_recognizer import StreamingRecognizer
+        return StreamingRecognizer(
+            self.model, 16000,
+            partial_interval=self.partial_interval,
+            on_event=on_event
+        )
+    
     def transcribe_text_input(self, text: str) -> str:
         """
         For testing purposes - transcribe text input directly
@@ -67,18 +84,17 @@ class SimpleSpeechRecognizer:
     
     def finalize_transcription(self) -> str:
         """Get final transcription result"""
-        if self.recognizer is None:
+        if self.stream is None:
             return ""
         
         try:
-            result = json.loads(self.recognizer.FinalResult())
-            return result.get('text', '').strip()
+            event = self.stream.finish()
+            return event.text if event else ""
         except Exception as e:
             print(f"Final transcription error: {e}")
             return ""
     
     def reset(self):
         """Reset recognizer for new audio"""
-        if self.recognizer and self.model:
-            from vosk import KaldiRecognizer
-            self.recognizer = KaldiRecognizer(self.model, 16000)
+        if self.stream is not None:
+            self.stream.reset()
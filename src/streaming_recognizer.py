@@ -0,0 +1,160 @@
+"""
+Streaming Recognition Events for Vosk
+Turns raw Vosk results into typed partial/final events with word timings
+"""
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator, List, Optional
+
+
+@dataclass
+class WordTiming:
+    """Single recognized word with its position in the audio stream"""
+    word: str
+    start: float
+    end: float
+    conf: float = 1.0
+
+
+@dataclass
+class RecognitionEvent:
+    """
+    Partial or final recognition result
+    Partials only carry what changed: keep the first `stable_words` words of
+    the previous hypothesis and append `delta`. Finals carry the whole utterance.
+    """
+    kind: str  # "partial" or "final"
+    text: str
+    delta: str
+    stable_words: int
+    words: List[WordTiming] = field(default_factory=list)
+    audio_time: float = 0.0
+
+    @property
+    def is_final(self) -> bool:
+        return self.kind == "final"
+
+
+class StreamingRecognizer:
+    """
+    Wraps a Vosk KaldiRecognizer and emits RecognitionEvent objects
+    PartialResult() is polled at most once per `partial_interval` seconds of audio
+    """
+
+    def __init__(self, model, sample_rate: int = 16000, partial_interval: float = 0.25,
+                 word_timings: bool = True,
+                 on_event: Optional[Callable[[RecognitionEvent], None]] = None):
+        self.model = model
+        self.sample_rate = sample_rate
+        self.partial_interval = partial_interval
+        self.word_timings = word_timings
+        self.on_event = on_event
+        self.recognizer = None
+        self.audio_time = 0.0
+        self._last_poll = 0.0
+        self._partial_words: List[str] = []
+        self.reset()
+
+    def reset(self):
+        """Start a fresh recognizer and forget the current hypothesis"""
+        from vosk import KaldiRecognizer
+        self.recognizer = KaldiRecognizer(self.model, self.sample_rate)
+        if self.word_timings:
+            self.recognizer.SetWords(True)
+            if hasattr(self.recognizer, "SetPartialWords"):
+                self.recognizer.SetPartialWords(True)
+        self.audio_time = 0.0
+        self._last_poll = 0.0
+        self._partial_words = []
+
+    def feed(self, audio_bytes: bytes) -> List[RecognitionEvent]:
+        """
+        Feed 16-bit mono PCM and return the events it produced
+        Args:
+            audio_bytes: bytes - raw audio data
+        Returns:
+            list of RecognitionEvent (usually zero or one)
+        """
+        self.audio_time += len(audio_bytes) / (2.0 * self.sample_rate)
+
+        if self.recognizer.AcceptWaveform(audio_bytes):
+            event = self._final_event(self.recognizer.Result())
+            return [event] if event else []
+
+        if self.audio_time - self._last_poll < self.partial_interval:
+            return []
+        self._last_poll = self.audio_time
+
+        event = self._partial_event(self.recognizer.PartialResult())
+        return [event] if event else []
+
+    @property
+    def hypothesis(self) -> str:
+        """Current partial text as of the last poll"""
+        return " ".join(self._partial_words)
+
+    def finish(self) -> Optional[RecognitionEvent]:
+        """Flush the recognizer at end of stream"""
+        return self._final_event(self.recognizer.FinalResult())
+
+    def stream(self, chunks: Iterable[bytes]) -> Iterator[RecognitionEvent]:
+        """Iterate over events for a sequence of audio chunks, flushing at the end"""
+        for chunk in chunks:
+            yield from self.feed(chunk)
+        event = self.finish()
+        if event:
+            yield event
+
+    def _partial_event(self, raw: str) -> Optional[RecognitionEvent]:
+        """Build a partial event carrying only the changed suffix"""
+        result = json.loads(raw)
+        words = result.get("partial", "").split()
+        if words == self._partial_words:
+            return None
+
+        stable = 0
+        for old, new in zip(self._partial_words, words):
+            if old != new:
+                break
+            stable += 1
+        self._partial_words = words
+
+        event = RecognitionEvent(
+            kind="partial",
+            text=" ".join(words),
+            delta=" ".join(words[stable:]),
+            stable_words=stable,
+            words=self._word_timings(result.get("partial_result", [])),
+            audio_time=self.audio_time
+        )
+        return self._emit(event)
+
+    def _final_event(self, raw: str) -> Optional[RecognitionEvent]:
+        """Build a final event for a completed utterance"""
+        result = json.loads(raw)
+        self._partial_words = []
+        text = result.get("text", "").strip()
+        if not text:
+            return None
+
+        event = RecognitionEvent(
+            kind="final",
+            text=text,
+            delta=text,
+            stable_words=0,
+            words=self._word_timings(result.get("result", [])),
+            audio_time=self.audio_time
+        )
+        return self._emit(event)
+
+    def _word_timings(self, entries: list) -> List[WordTiming]:
+        """Convert Vosk word entries to WordTiming objects"""
+        return [
+            WordTiming(e["word"], e.get("start", 0.0), e.get("end", 0.0), e.get("conf", 1.0))
+            for e in entries
+        ]
+
+    def _emit(self, event: RecognitionEvent) -> RecognitionEvent:
+        if self.on_event:
+            self.on_event(event)
+        return event
@@ -2,14 +2,66 @@
 Minimalistic Text-to-Speech Module using Coqui TTS
 """
 import os
+import re
+import queue
+import threading
+import time
+import numpy as np
+from typing import Callable, Iterator, List, Optional
 from TTS.api import TTS
 
+from tts_cache import SynthesisCache
+from speaker_registry import SpeakerRegistry
+from pcm_io import to_dtype, wav_bytes, read_wav_bytes, write_pcm, AudioPlayer
+
+SENTENCE_END = re.compile(r'(?<=[.!?।。！？])\s+')
+CLAUSE_END = re.compile(r'(?<=[,;:，、])\s+')
+
+
+def split_text(text: str, max_chars: int = 150, first_chars: int = 60) -> List[str]:
+    """
+    Split text into sentences, breaking long ones at clause boundaries
+    The first chunk is kept short so playback can start as early as possible
+    """
+    chunks = []
+    for sentence in SENTENCE_END.split(text.strip()):
+        limit = first_chars if not chunks else max_chars
+        if len(sentence) <= limit:
+            if sentence:
+                chunks.append(sentence)
+            continue
+        
+        current = ""
+        for clause in CLAUSE_END.split(sentence):
+            limit = first_chars if not chunks else max_chars
+            if current and len(current) + len(clause) + 1 > limit:
+                chunks.append(current)
+                current = clause
+            else:
+                current = f"{current} {clause}".strip()
+        if current:
+            chunks.append(current)
+    return chunks
+
 
 class TextToSpeech:
-    def __init__(self, model_name="tts_models/multilingual/multi-dataset/xtts_v2"):
+    def __init__(self, model_name="tts_models/multilingual/multi-dataset/xtts_v2",
+                 cache_dir="models/tts-cache", cache_max_mb=200, speaker_wav=None, speaker_dir="models/speakers"):
         self.model_name = model_name
         self.model = None
+        self.voice = None
+        self.speaker_wav = None
+        self.speaker_registry = None
+        self._latents = None
+        self.player = AudioPlayer()
+        self.cache = SynthesisCache(cache_dir, max_bytes=int(cache_max_mb * 1024 * 1024)) if cache_dir else None
         self._load_model()
+        
+        xtts_model = self._xtts_model()
+        if xtts_model is not None:
+            self.speaker_registry = SpeakerRegistry(xtts_model, speaker_dir)
+        if speaker_wav:
+            self.set_speaker(speaker_wav)
     
     def _load_model(self):
         """Load TTS model"""
@@ -33,19 +85,207 @@ class TextToSpeech:
         if self.model is None or not text.strip():
             return False
         
+        if self.cache is not None:
+            return self.cache.synthesize(
+                text, language, output_path,
+                lambda path: self._render(text, language, path),
+                voice=self.voice, model_id=self.model_name
+            )
+        return self._render(text, language, output_path)
+    
+    def set_speaker(self, speaker_wav):
+        """Use a reference clip as the voice; XTTS latents are computed once and persisted"""
+        self.speaker_wav = speaker_wav
+        self._latents = None
+        try:
+            if self.speaker_registry is not None:
+                self.voice = self.speaker_registry.speaker_key(speaker_wav)
+                self._latents = self.speaker_registry.get_latents(speaker_wav)
+            else:
+                self.voice = os.path.basename(speaker_wav)
+        except Exception as e:
+            print(f"⚠️ Speaker conditioning failed: {e}")
+    
+    def _xtts_model(self):
+        """The underlying XTTS model when it accepts precomputed conditioning, else None"""
+        tts_model = getattr(getattr(self.model, 'synthesizer', None), 'tts_model', None)
+        if hasattr(tts_model, 'inference') and hasattr(tts_model, 'get_conditioning_latents'):
+            return tts_model
+        return None
+    
+    def _render(self, text, language, output_path):
+        """Run the model and write output_path"""
         try:
-            # For xtts-v2, we need a reference speaker audio
-            # Using a simple approach - generating without reference
+            # XTTS: cached latents of the reference clip, or a built-in speaker without one
+            xtts_model = self._xtts_model()
+            if xtts_model is not None:
+                gpt_cond_latent, speaker_embedding = self._xtts_latents(xtts_model)
+                out = xtts_model.inference(text, language, gpt_cond_latent, speaker_embedding)
+                self.model.synthesizer.save_wav(wav=out["wav"], path=output_path)
+                return True
+            
+            kwargs = {"speaker_wav": self.speaker_wav} if self.speaker_wav else {}
             self.model.tts_to_file(
                 text=text,
                 file_path=output_path,
-                language=language
+                language=language,
+                **kwargs
             )
             return True
         except Exception as e:
             print(f"TTS synthesis error: {e}")
             return False
     
+    def synthesize_to_array(self, text, language="en", dtype="float32"):
+        """
+        Synthesize into memory
+        Returns:
+            tuple: (pcm np.ndarray of float32 or int16, sample_rate), or (None, 0) on failure
+        """
+        if self.model is None or not text.strip():
+            return None, 0
+        
+        key = self.cache.make_key(text, language, self.voice, self.model_name) if self.cache is not None else None
+        cached = self.cache.get(key) if key is not None else None
+        if cached is not None:
+            return read_wav_bytes(cached, dtype)
+        
+        try:
+            start = time.perf_counter()
+            xtts_model = self._xtts_model()
+            if xtts_model is not None:
+                gpt_cond_latent, speaker_embedding = self._xtts_latents(xtts_model)
+                wav = xtts_model.inference(text, language, gpt_cond_latent, speaker_embedding)["wav"]
+            else:
+                kwargs = {"speaker_wav": self.speaker_wav} if self.speaker_wav else {}
+                wav = self.model.tts(text=text, language=language, **kwargs)
+            
+            pcm = to_dtype(wav.cpu().numpy() if hasattr(wav, "cpu") else wav)
+            if key is not None:
+                self.cache.put(key, wav_bytes(pcm, self.sample_rate), time.perf_counter() - start)
+            return to_dtype(pcm, dtype), self.sample_rate
+        except Exception as e:
+            print(f"TTS synthesis error: {e}")
+            return None, 0
+    
+    def synthesize_to_stream(self, text, target, language="en", fmt="wav"):
+        """
+        Synthesize and write into a caller-provided buffer (write) or socket (sendall)
+        Args:
+            fmt: "wav" or "pcm" (raw 16-bit little-endian)
+        Returns:
+            int - bytes written (0 on failure)
+        """
+        pcm, sample_rate = self.synthesize_to_array(text, language)
+        if pcm is None:
+            return 0
+        return write_pcm(target, pcm, sample_rate, fmt)
+    
+    @property
+    def sample_rate(self) -> int:
+        try:
+            return int(self.model.synthesizer.output_sample_rate)
+        except Exception:
+            return 24000  # XTTS output rate
+    
+    def _streaming_model(self):
+        """The underlying XTTS model when it supports inference_stream, else None"""
+        tts_model = getattr(getattr(self.model, 'synthesizer', None), 'tts_model', None)
+        return tts_model if hasattr(tts_model, 'inference_stream') else None
+    
+    def _conditioning_latents(self, tts_model):
+        """Speaker conditioning for XTTS: from speaker_wav, or the first built-in speaker"""
+        if self._latents is None:
+            if self.speaker_wav:
+                self._latents = self.speaker_registry.get_latents(self.speaker_wav)
+            else:
+                speakers = getattr(getattr(tts_model, 'speaker_manager', None), 'speakers', None) or {}
+                if speakers:
+                    name = self.voice if self.voice in speakers else next(iter(speakers))
+                    speaker = speakers[name]
+                    self._latents = (speaker["gpt_cond_latent"], speaker["speaker_embedding"])
+        return self._latents
+    
+    def _xtts_latents(self, tts_model):
+        """Conditioning for XTTS, which cannot synthesize without a speaker"""
+        latents = self._conditioning_latents(tts_model)
+        if latents is None:
+            raise RuntimeError("XTTS needs a speaker: pass speaker_wav (the model has no built-in speakers)")
+        return latents
+    
+    def synthesize_stream(self, text: str, language: str = "en") -> Iterator[np.ndarray]:
+        """
+        Yield float32 audio chunks as soon as they are synthesized
+        Uses XTTS inference_stream when available, otherwise one chunk per sentence
+        """
+        if self.model is None or not text.strip():
+            return
+        
+        tts_model = self._streaming_model()
+        latents = self._conditioning_latents(tts_model) if tts_model is not None else None
+        
+        for chunk_text in split_text(text):
+            if latents is not None:
+                gpt_cond_latent, speaker_embedding = latents
+                for wav in tts_model.inference_stream(chunk_text, language, gpt_cond_latent, speaker_embedding):
+                    yield wav.cpu().numpy().astype(np.float32).ravel()
+            else:
+                kwargs = {"language": language}
+                if self.speaker_wav:
+                    kwargs["speaker_wav"] = self.speaker_wav
+                yield np.asarray(self.model.tts(text=chunk_text, **kwargs), dtype=np.float32)
+    
+    def speak_streaming(self, text: str, language: str = "en",
+                        play: Optional[Callable[[np.ndarray, int], None]] = None) -> dict:
+        """
+        Play text while later chunks are still being synthesized
+        Synthesis runs on a worker thread; playback consumes chunks on this thread
+        Args:
+            play: callable(chunk, sample_rate) - defaults to a PyAudio output stream
+        Returns:
+            dict with time_to_first_audio, total_time, chunks, audio_seconds
+        """
+        play = play or self.play_audio
+        chunks = queue.Queue(maxsize=32)
+        done = object()
+        start = time.perf_counter()
+        stats = {"time_to_first_audio": None, "total_time": 0.0, "chunks": 0, "audio_seconds": 0.0}
+        
+        def produce():
+            try:
+                for chunk in self.synthesize_stream(text, language):
+                    chunks.put(chunk)
+            except Exception as e:
+                print(f"TTS streaming error: {e}")
+            finally:
+                chunks.put(done)
+        
+        threading.Thread(target=produce, daemon=True).start()
+        
+        while True:
+            chunk = chunks.get()
+            if chunk is done:
+                break
+            if stats["time_to_first_audio"] is None:
+                stats["time_to_first_audio"] = time.perf_counter() - start
+            play(chunk, self.sample_rate)
+            stats["chunks"] += 1
+            stats["audio_seconds"] += len(chunk) / self.sample_rate
+        
+        stats["total_time"] = time.perf_counter() - start
+        if stats["time_to_first_audio"] is not None:
+            print(f"📊 Time to first audio: {stats['time_to_first_audio']:.2f}s "
+                  f"({stats['audio_seconds']:.1f}s of speech in {stats['total_time']:.2f}s)")
+        return stats
+    
+    def play_audio(self, chunk: np.ndarray, sample_rate: int):
+        """Blocking write to a lazily opened PyAudio output stream, reopened when the rate changes"""
+        self.player.play(chunk, sample_rate)
+    
+    def close(self):
+        """Release the playback stream and PyAudio instance"""
+        self.player.close()
+    
     def get_supported_languages(self):
         """Get list of supported languages"""
         return ["en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh", "hi"]
@@ -2,12 +2,23 @@
 Simple Text-to-Speech Module - Lightweight alternative
 """
 import os
+import tempfile
 from typing import Optional
 
+from tts_cache import SynthesisCache
+from tts_worker import TTSWorker, PRIORITY_NORMAL
+from pcm_io import to_dtype, read_wav_bytes, write_pcm, espeak_to_array
+from voice_pool import VoicePool
+
 class SimpleTextToSpeech:
-    def __init__(self, model_name="simple"):
+    def __init__(self, model_name="simple", cache_dir="models/tts-cache", cache_max_mb=200, languages=None):
         self.model_name = model_name
+        self.languages = languages
         self.tts_engine = None
+        self.voice_pool = None
+        self.worker = None
+        self._pyttsx3 = False
+        self.cache = SynthesisCache(cache_dir, max_bytes=int(cache_max_mb * 1024 * 1024)) if cache_dir else None
         self._try_load_tts()
     
     def _try_load_tts(self):
@@ -23,16 +34,46 @@ class SimpleTextToSpeech:
         except Exception as e:
             print(f"⚠️ Coqui TTS loading failed: {e}")
         
-        # Try pyttsx3 as fallback
+        # Try pyttsx3 as fallback; the engine lives on the worker thread (SAPI5/COM
+        # and NSSpeech objects must only be used from the thread that created them)
         try:
             import pyttsx3
-            self.tts_engine = pyttsx3.init()
-            print("✓ pyttsx3 TTS loaded successfully")
+            self._pyttsx3 = True
+            if self._engine_worker() is not None:
+                print("✓ pyttsx3 TTS loaded successfully")
         except ImportError:
             print("⚠️ pyttsx3 not available")
-        except Exception as e:
-            print(f"⚠️ pyttsx3 loading failed: {e}")
-            self.tts_engine = None
+    
+    def _engine_worker(self) -> Optional[TTSWorker]:
+        """The worker thread that owns the pyttsx3 engine, started on first use (None for Coqui)"""
+        if self.worker is None and self._pyttsx3:
+            worker = TTSWorker(engine_factory=self._create_engine, speak_fn=self._engine_speak,
+                               save_fn=self._engine_save)
+            if not worker.start():
+                print("⚠️ pyttsx3 loading failed")
+                worker.stop(wait=False)
+                self._pyttsx3 = False
+                return None
+            self.worker = worker
+            self.tts_engine = worker.engine
+        return self.worker if self._pyttsx3 else None
+    
+    def _create_engine(self):
+        """Runs on the worker thread: create the engine and pick per-language voices"""
+        import pyttsx3
+        engine = pyttsx3.init()
+        self.voice_pool = VoicePool(engine, self.languages)
+        return engine
+    
+    def _engine_speak(self, engine, text: str, language: str):
+        self._activate_voice(language)
+        engine.say(text)
+        engine.runAndWait()
+    
+    def _engine_save(self, engine, text: str, language: str, output_path: str):
+        self._activate_voice(language)
+        engine.save_to_file(text, output_path)
+        engine.runAndWait()
     
     def synthesize_speech(self, text: str, language: str = "en", output_path: str = "output.wav") -> bool:
         """
@@ -47,10 +88,35 @@ class SimpleTextToSpeech:
         if not text.strip():
             return False
         
-        if self.tts_engine is None:
+        if self.tts_engine is None and self._engine_worker() is None:
             print(f"[TTS] Would synthesize: '{text}' in {language}")
             return False
         
+        if self.cache is not None:
+            return self.cache.synthesize(
+                text, language, output_path,
+                lambda path: self._render(text, language, path),
+                voice=self._voice_id(language), model_id=self._engine_id()
+            )
+        return self._render(text, language, output_path)
+    
+    def _engine_id(self) -> str:
+        """Identifies the engine in cache keys (Coqui model name or pyttsx3)"""
+        return self.model_name if hasattr(self.tts_engine, 'tts_to_file') else "pyttsx3"
+    
+    def _voice_id(self, language: str = "en") -> Optional[str]:
+        """pyttsx3 voice used for language; Coqui voices are part of the model name"""
+        if self.voice_pool is not None:
+            return self.voice_pool.voice_for(language)
+        return None
+    
+    def _activate_voice(self, language: str):
+        """Switch pyttsx3 to the pooled voice for language (no-op if unchanged); worker thread only"""
+        if self.voice_pool is not None:
+            self.voice_pool.activate(language)
+    
+    def _render(self, text: str, language: str, output_path: str) -> bool:
+        """Run the engine and write output_path"""
         try:
             # Check if it's Coqui TTS
             if hasattr(self.tts_engine, 'tts_to_file'):
@@ -59,10 +125,10 @@ class SimpleTextToSpeech:
                     file_path=output_path,
                     language=language
                 )
-            # Check if it's pyttsx3
-            elif hasattr(self.tts_engine, 'save_to_file'):
-                self.tts_engine.save_to_file(text, output_path)
-                self.tts_engine.runAndWait()
+            # pyttsx3: rendered on the engine's own thread
+            elif self._engine_worker() is not None:
+                if self.worker.call(text, language, output_path=output_path) != "done":
+                    return False
             else:
                 print(f"[TTS] Would synthesize: '{text}' in {language}")
                 return False
@@ -73,6 +139,51 @@ class SimpleTextToSpeech:
             print(f"TTS synthesis error: {e}")
             return False
     
+    def synthesize_to_array(self, text: str, language: str = "en", dtype: str = "float32"):
+        """
+        Synthesize into memory
+        Coqui returns samples directly; otherwise espeak --stdout is used, and
+        pyttsx3 (file output only) is the last resort
+        Returns:
+            tuple: (pcm np.ndarray of float32 or int16, sample_rate), or (None, 0) on failure
+        """
+        if not text.strip():
+            return None, 0
+        
+        try:
+            if hasattr(self.tts_engine, 'tts'):
+                wav = self.tts_engine.tts(text=text, language=language)
+                sample_rate = getattr(getattr(self.tts_engine, 'synthesizer', None), 'output_sample_rate', 24000)
+                return to_dtype(wav, dtype), int(sample_rate)
+            
+            result = espeak_to_array(text, language, dtype)
+            if result is not None:
+                return result
+            
+            if self._engine_worker() is not None:
+                fd, path = tempfile.mkstemp(suffix=".wav")
+                os.close(fd)
+                try:
+                    if self.worker.call(text, language, output_path=path) != "done":
+                        return None, 0
+                    with open(path, "rb") as f:
+                        return read_wav_bytes(f.read(), dtype)
+                finally:
+                    os.remove(path)
+        except Exception as e:
+            print(f"TTS synthesis error: {e}")
+        return None, 0
+    
+    def synthesize_to_stream(self, text: str, target, language: str = "en", fmt: str = "wav") -> int:
+        """
+        Synthesize and write into a caller-provided buffer (write) or socket (sendall)
+        Returns: int - bytes written (0 on failure)
+        """
+        pcm, sample_rate = self.synthesize_to_array(text, language)
+        if pcm is None:
+            return 0
+        return write_pcm(target, pcm, sample_rate, fmt)
+    
     def speak_text(self, text: str, language: str = "en") -> bool:
         """
         Speak text directly (for real-time mode)
@@ -80,22 +191,45 @@ class SimpleTextToSpeech:
         if not text.strip():
             return False
         
-        if self.tts_engine is None:
+        # Only pyttsx3 speaks directly; it blocks here but runs on the engine's thread
+        if self._engine_worker() is None:
             print(f"[TTS] Would speak: '{text}' in {language}")
             return False
+        return self.worker.call(text, language) == "done"
+    
+    def speak_async(self, text: str, language: str = "en", priority: int = PRIORITY_NORMAL,
+                    on_done=None, barge_in: bool = False) -> Optional[int]:
+        """
+        Queue text on the engine's worker thread and return immediately,
+        so runAndWait never runs on the caller's capture or processing thread
+        Returns: utterance id, or None if nothing was queued
+        """
+        if not text.strip():
+            return None
         
-        try:
-            # Check if it's pyttsx3
-            if hasattr(self.tts_engine, 'say'):
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-                return True
-            else:
-                print(f"[TTS] Would speak: '{text}' in {language}")
-                return False
-        except Exception as e:
-            print(f"TTS speak error: {e}")
-            return False
+        if self._engine_worker() is None:
+            print(f"[TTS] Would speak: '{text}' in {language}")
+            return None
+        return self.worker.speak(text, language, priority=priority, on_done=on_done, barge_in=barge_in)
+    
+    @property
+    def is_speaking(self) -> bool:
+        """True while the background worker is playing an utterance"""
+        return self.worker is not None and self.worker.is_speaking
+    
+    @property
+    def last_spoken_end(self) -> float:
+        """perf_counter time the last background utterance finished (0 if none)"""
+        return self.worker.last_spoken_end if self.worker is not None else 0.0
+    
+    def stop_worker(self):
+        """Stop the background worker and release its engine; the next call starts a new one"""
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker = None
+            if self._pyttsx3:
+                self.tts_engine = None
+                self.voice_pool = None
     
     def get_supported_languages(self) -> list:
         """Get list of supported languages"""
@@ -0,0 +1,192 @@
+"""
+Disk-backed LRU Cache for Synthesized Speech
+Content-addressed by (normalized text, language, voice, model id); recent
+entries stay in memory, everything else lives in a size-capped directory
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Optional
+
+
+def normalize_text(text: str) -> str:
+    """Unicode NFC with collapsed whitespace, so trivially different prompts share an entry"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def atomic_write(path: str, data: bytes):
+    """Write via a temp file in the same directory and rename over the target"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class SynthesisCache:
+    """
+    Two-level LRU cache of rendered audio files
+    Args:
+        cache_dir: str - directory for cached WAVs
+        max_bytes: int - disk budget; least recently used files are evicted beyond it
+        memory_items: int - number of entries also kept in memory
+    The directory may be shared by several processes (e.g. batch_tts workers):
+    each keeps its own index, so the index is rescanned from disk on every store
+    and the budget applies to everything in the directory
+    """
+
+    def __init__(self, cache_dir: str = "models/tts-cache", max_bytes: int = 200 * 1024 * 1024,
+                 memory_items: int = 64):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.memory_items = memory_items
+        self.memory = OrderedDict()
+        self.synthesis_times = {}
+        self._lock = threading.Lock()
+        self.stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0,
+                      "synthesis_seconds": 0.0, "time_saved": 0.0}
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._scan()
+
+    def _scan(self):
+        """Rebuild the disk index from the directory, oldest → newest access by file mtime"""
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(".wav"):
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), name[:-4], os.path.getsize(path)))
+                except OSError:
+                    continue  # removed by another process since listdir
+        self.disk = OrderedDict((key, size) for _, key, size in sorted(entries))
+        self.disk_bytes = sum(self.disk.values())
+
+    @staticmethod
+    def make_key(text: str, language: str, voice: Optional[str] = None, model_id: str = "") -> str:
+        payload = json.dumps([normalize_text(text), language, voice or "", model_id], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.wav")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Cached audio bytes, or None on a miss"""
+        with self._lock:
+            if key in self.memory:
+                self.memory.move_to_end(key)
+                self.stats["memory_hits"] += 1
+                self._credit(key)
+                return self.memory[key]
+
+            if key not in self.disk:
+                self.stats["misses"] += 1
+                return None
+
+        try:
+            with open(self._path(key), "rb") as f:
+                data = f.read()
+            os.utime(self._path(key))
+        except OSError:
+            with self._lock:
+                self.disk_bytes -= self.disk.pop(key, 0)
+                self.stats["misses"] += 1
+            return None
+
+        with self._lock:
+            self.disk.move_to_end(key)
+            self.stats["disk_hits"] += 1
+            self._credit(key)
+            self._remember(key, data)
+        return data
+
+    def put(self, key: str, data: bytes, synthesis_time: Optional[float] = None):
+        """Store rendered audio, evicting least recently used files past the disk budget"""
+        atomic_write(self._path(key), data)
+        with self._lock:
+            self._scan()  # count and age entries other processes added or touched
+            for recent in self.memory:
+                if recent in self.disk:
+                    self.disk.move_to_end(recent)  # memory hits do not touch the file's mtime
+            self.disk_bytes += len(data) - self.disk.pop(key, 0)
+            self.disk[key] = len(data)
+            if synthesis_time is not None:
+                self.synthesis_times[key] = synthesis_time
+                self.stats["synthesis_seconds"] += synthesis_time
+            self._remember(key, data)
+            evicted = self._evict()
+
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def synthesize(self, text: str, language: str, output_path: str, synthesize_fn: Callable[[str], bool],
+                   voice: Optional[str] = None, model_id: str = "") -> bool:
+        """
+        Serve output_path from the cache, or render it with synthesize_fn(output_path) and cache it
+        Returns: bool - success status
+        """
+        key = self.make_key(text, language, voice, model_id)
+        data = self.get(key)
+        if data is not None:
+            atomic_write(output_path, data)
+            return True
+
+        start = time.perf_counter()
+        if not synthesize_fn(output_path):
+            return False
+        elapsed = time.perf_counter() - start
+
+        try:
+            with open(output_path, "rb") as f:
+                self.put(key, f.read(), elapsed)
+        except Exception as e:
+            print(f"⚠️ TTS cache store failed: {e}")
+        return True
+
+    def _remember(self, key: str, data: bytes):
+        self.memory[key] = data
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.memory_items:
+            self.memory.popitem(last=False)
+
+    def _evict(self) -> list:
+        evicted = []
+        while self.disk_bytes > self.max_bytes and len(self.disk) > 1:
+            key, size = self.disk.popitem(last=False)
+            self.disk_bytes -= size
+            self.memory.pop(key, None)
+            self.synthesis_times.pop(key, None)
+            self.stats["evictions"] += 1
+            evicted.append(key)
+        return evicted
+
+    def _credit(self, key: str):
+        """Count the synthesis time a hit avoided (mean miss time for entries from earlier runs)"""
+        if key in self.synthesis_times:
+            self.stats["time_saved"] += self.synthesis_times[key]
+        elif self.synthesis_times:
+            self.stats["time_saved"] += self.stats["synthesis_seconds"] / len(self.synthesis_times)
+
+    def get_stats(self) -> dict:
+        """Hit rate, time saved and disk usage"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats["disk_entries"] = len(self.disk)
+            stats["disk_bytes"] = self.disk_bytes
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+        return stats
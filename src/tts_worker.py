@@ -0,0 +1,279 @@
+"""
+Non-blocking TTS Playback Worker
+Owns the speech engine on a dedicated thread so capture and recognition
+loops only enqueue utterances and never wait on synthesis
+"""
+import itertools
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+# Lower value is spoken first
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 5
+PRIORITY_LOW = 10
+
+
+@dataclass(order=True)
+class Utterance:
+    """One queued piece of speech"""
+    priority: int
+    seq: int
+    text: str = field(compare=False, default="")
+    language: str = field(compare=False, default="en")
+    on_done: Optional[Callable] = field(compare=False, default=None)
+    output_path: Optional[str] = field(compare=False, default=None)
+    queued_at: float = field(compare=False, default_factory=time.perf_counter)
+    started_at: Optional[float] = field(compare=False, default=None)  # set by speak_fn when audio starts
+
+
+def _pyttsx3_engine():
+    import pyttsx3
+    return pyttsx3.init()
+
+
+def _pyttsx3_speak(engine, text: str, language: str):
+    engine.say(text)
+    engine.runAndWait()
+
+
+def _pyttsx3_save(engine, text: str, language: str, output_path: str):
+    engine.save_to_file(text, output_path)
+    engine.runAndWait()
+
+
+class TTSWorker:
+    """
+    Prioritized speech queue served by one thread
+    Args:
+        engine_factory: callable creating the engine; runs on the worker thread (default: pyttsx3.init)
+        speak_fn: callable(engine, text, language) that blocks until the utterance is spoken
+        stop_fn: callable(engine) that interrupts the current utterance from the caller's
+            thread, so it must be thread-safe. Without one, barge_in() only flags the
+            interrupt and the worker thread itself calls engine.stop() from the engine's
+            started-word callback (pyttsx3 engines must stay on the thread that created them)
+        save_fn: callable(engine, text, language, output_path) used by save()
+    """
+
+    def __init__(self, engine_factory: Optional[Callable] = _pyttsx3_engine,
+                 speak_fn: Callable = _pyttsx3_speak, stop_fn: Optional[Callable] = None,
+                 save_fn: Callable = _pyttsx3_save):
+        self.engine_factory = engine_factory
+        self.speak_fn = speak_fn
+        self.save_fn = save_fn
+        self.stop_fn = stop_fn
+        self.engine = None
+
+        self.queue = queue.PriorityQueue()
+        self.current: Optional[Utterance] = None
+        self.speaking = threading.Event()
+        self.ready = threading.Event()
+        self.last_spoken_end = 0.0
+        self._seq = itertools.count()
+        self._cancelled = set()
+        self._interrupted = False
+        self._lock = threading.RLock()
+        self._thread = None
+        self._running = False
+        self.stats = {"queued": 0, "spoken": 0, "cancelled": 0, "interrupted": 0, "errors": 0,
+                      "queue_wait": 0.0, "speak_time": 0.0}
+
+    def start(self) -> bool:
+        """Start the worker thread and wait until the engine is created"""
+        if self._thread is None:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="tts-worker", daemon=True)
+            self._thread.start()
+        self.ready.wait(timeout=10)
+        return self.engine is not None or self.engine_factory is None
+
+    @property
+    def running(self) -> bool:
+        """True while the worker thread is alive and accepting utterances"""
+        return self._running and self._thread is not None and self._thread.is_alive()
+
+    def stop(self, wait: bool = True):
+        """Drop pending utterances and stop the worker"""
+        self.cancel()
+        self._running = False
+        self.queue.put(Utterance(-1, -1))  # wake the worker
+        if wait and self._thread is not None:
+            self._thread.join(timeout=5)
+        self._thread = None
+
+    def speak(self, text: str, language: str = "en", priority: int = PRIORITY_NORMAL,
+              on_done: Optional[Callable] = None, barge_in: bool = False) -> int:
+        """
+        Queue text and return immediately
+        Args:
+            priority: int - lower is spoken first
+            on_done: callable(utterance, status) with status "done", "cancelled", "interrupted" or "error"
+            barge_in: bool - cancel everything queued or playing before this utterance
+        Returns:
+            int - utterance id for cancel()
+        """
+        if barge_in:
+            self.barge_in()
+        utterance = Utterance(priority, next(self._seq), text, language, on_done)
+        self.stats["queued"] += 1
+        self.queue.put(utterance)
+        return utterance.seq
+
+    def save(self, text: str, output_path: str, language: str = "en", priority: int = PRIORITY_NORMAL,
+             on_done: Optional[Callable] = None) -> int:
+        """Queue rendering text to output_path on the worker thread"""
+        utterance = Utterance(priority, next(self._seq), text, language, on_done, output_path)
+        self.stats["queued"] += 1
+        self.queue.put(utterance)
+        return utterance.seq
+
+    def call(self, text: str, language: str = "en", output_path: Optional[str] = None,
+             priority: int = PRIORITY_HIGH, timeout: Optional[float] = 60.0) -> str:
+        """
+        Speak (or save to output_path) on the worker thread and block until it finishes
+        Runs inline when already on the worker thread, e.g. from an on_done callback
+        Args:
+            timeout: float - seconds to wait before giving up (None waits indefinitely)
+        Returns: str - the utterance status ("done", "cancelled", "interrupted" or "error");
+            "error" if the worker is not running, stops while waiting, or the timeout passes
+        """
+        if threading.current_thread() is self._thread:
+            try:
+                if output_path is not None:
+                    self.save_fn(self.engine, text, language, output_path)
+                else:
+                    self.speak_fn(self.engine, text, language)
+                return "done"
+            except Exception as e:
+                print(f"TTS error: {e}")
+                return "error"
+
+        if not self.running:
+            print("⚠️ TTS worker is not running")
+            return "error"
+
+        finished = threading.Event()
+        result = {}
+
+        def on_done(_utterance, status):
+            result["status"] = status
+            finished.set()
+
+        if output_path is not None:
+            utterance_id = self.save(text, output_path, language, priority=priority, on_done=on_done)
+        else:
+            utterance_id = self.speak(text, language, priority=priority, on_done=on_done)
+
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        while not finished.wait(0.1):
+            if not self.running:
+                print("⚠️ TTS worker stopped before the utterance finished")
+                return "error"
+            if deadline is not None and time.perf_counter() > deadline:
+                self.cancel(utterance_id)
+                print(f"⚠️ TTS call timed out after {timeout:.1f}s")
+                return "error"
+        return result["status"]
+
+    def cancel(self, utterance_id: Optional[int] = None):
+        """Cancel one pending utterance, or all of them when utterance_id is None"""
+        with self._lock:
+            if utterance_id is not None:
+                # Only ids still queued are remembered; the worker discards them when dequeued
+                with self.queue.mutex:
+                    pending = any(u.seq == utterance_id for u in self.queue.queue)
+                if pending:
+                    self._cancelled.add(utterance_id)
+                return
+            while True:
+                try:
+                    utterance = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if utterance.seq >= 0:
+                    self._finish(utterance, "cancelled")
+            self._cancelled.clear()
+
+    def barge_in(self):
+        """Cancel pending utterances and interrupt the one being spoken"""
+        self.cancel()
+        if self.speaking.is_set():
+            self._interrupted = True
+            if self.stop_fn is None:
+                return  # the worker stops the engine at its next word boundary
+            try:
+                self.stop_fn(self.engine)
+            except Exception as e:
+                print(f"⚠️ TTS interrupt failed: {e}")
+
+    @property
+    def is_speaking(self) -> bool:
+        return self.speaking.is_set()
+
+    @property
+    def pending(self) -> int:
+        return self.queue.qsize()
+
+    def _run(self):
+        if self.engine_factory is not None:
+            try:
+                self.engine = self.engine_factory()
+                if self.stop_fn is None and hasattr(self.engine, "connect"):
+                    self.engine.connect("started-word", self._on_word)
+                print("✓ TTS worker ready")
+            except Exception as e:
+                print(f"⚠️ TTS initialization failed: {e}")
+        self.ready.set()
+
+        while self._running:
+            utterance = self.queue.get()
+            if utterance.seq < 0:
+                continue
+            with self._lock:
+                if utterance.seq in self._cancelled:
+                    self._cancelled.discard(utterance.seq)
+                    self._finish(utterance, "cancelled")
+                    continue
+                self.current = utterance
+                self._interrupted = False
+
+            self.stats["queue_wait"] += time.perf_counter() - utterance.queued_at
+            start = time.perf_counter()
+            self.speaking.set()
+            try:
+                if utterance.output_path is not None:
+                    self.save_fn(self.engine, utterance.text, utterance.language, utterance.output_path)
+                else:
+                    self.speak_fn(self.engine, utterance.text, utterance.language)
+                status = "interrupted" if self._interrupted else "done"
+            except Exception as e:
+                print(f"TTS error: {e}")
+                status = "error"
+            finally:
+                self.speaking.clear()
+                self.last_spoken_end = time.perf_counter()
+                self.current = None
+            self.stats["speak_time"] += self.last_spoken_end - start
+            self._finish(utterance, status)
+
+    def _on_word(self, name, location, length):
+        """Engine callback, on the worker thread inside runAndWait: honour a pending barge-in"""
+        if self._interrupted:
+            self.engine.stop()
+
+    def _finish(self, utterance: Utterance, status: str):
+        key = {"done": "spoken", "cancelled": "cancelled", "interrupted": "interrupted"}.get(status, "errors")
+        self.stats[key] += 1
+        if utterance.on_done is not None:
+            try:
+                utterance.on_done(utterance, status)
+            except Exception as e:
+                print(f"TTS callback error: {e}")
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["mean_queue_wait"] = stats["queue_wait"] / stats["spoken"] if stats["spoken"] else 0.0
+        stats["pending"] = self.pending
+        return stats
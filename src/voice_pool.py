@@ -0,0 +1,101 @@
+"""
+Per-language Voice Pool for pyttsx3
+pyttsx3.init() returns one shared engine per driver, so instead of separate
+engines the pool picks a voice id for every configured language once at startup;
+switching language is then a dict lookup plus a single setProperty, and only
+when the language actually changes
+"""
+from typing import Dict, List, Optional
+
+DEFAULT_LANGUAGES = ["en", "es", "fr", "de", "it", "pt", "ru", "ja", "ko", "zh", "hi"]
+
+
+def _voice_languages(voice) -> List[str]:
+    """Language tags a pyttsx3 voice advertises, normalized to lowercase strings"""
+    tags = []
+    for tag in getattr(voice, "languages", None) or []:
+        if isinstance(tag, bytes):
+            # espeak prefixes the tag with a priority byte, e.g. b"\x05en-us"
+            tag = bytes(b for b in tag if b >= 32).decode("utf-8", errors="ignore")
+        tags.append(str(tag).lower().replace("_", "-"))
+    return tags
+
+
+def match_voice(voices, language: str) -> Optional[str]:
+    """Best voice id for a language: advertised language tag, then id/name hints"""
+    language = language.lower()
+    for voice in voices:
+        if any(tag == language or tag.startswith(f"{language}-") for tag in _voice_languages(voice)):
+            return voice.id
+    for voice in voices:
+        hints = f"{voice.id} {getattr(voice, 'name', '')}".lower().replace("_", "-")
+        if f"/{language}" in hints or f"-{language}-" in hints or hints.endswith(f"-{language}") \
+                or f" {language} " in f" {hints} ":
+            return voice.id
+    return None
+
+
+class VoicePool:
+    """
+    Args:
+        engine: initialized pyttsx3 engine (use it only from the thread that owns it)
+        languages: language codes to preselect voices for
+    """
+
+    def __init__(self, engine, languages: Optional[List[str]] = None):
+        self.engine = engine
+        self.languages = languages or DEFAULT_LANGUAGES
+        self.voices: Dict[str, str] = {}
+        self.voice_names: List[str] = []
+        self.default_voice = None
+        self.active_language = None
+        self.stats = {"switches": 0, "activations": 0}
+        self._select_voices()
+
+    def _select_voices(self):
+        """Enumerate voices once and pre-warm each selected one"""
+        try:
+            self.default_voice = self.engine.getProperty('voice')
+            voices = self.engine.getProperty('voices')
+        except Exception as e:
+            print(f"⚠️ Voice enumeration failed: {e}")
+            return
+        self.voice_names = [getattr(voice, "name", voice.id) for voice in voices]
+
+        for language in self.languages:
+            voice_id = match_voice(voices, language)
+            if voice_id is not None:
+                self.voices[language] = voice_id
+
+        # Touch each voice once so the driver loads its data now rather than mid-conversation
+        for voice_id in set(self.voices.values()):
+            try:
+                self.engine.setProperty('voice', voice_id)
+            except Exception:
+                pass
+        if self.default_voice is not None:
+            self.engine.setProperty('voice', self.default_voice)
+
+        missing = [lang for lang in self.languages if lang not in self.voices]
+        print(f"✓ Voice pool: {len(self.voices)} languages mapped"
+              + (f" (default voice for {', '.join(missing)})" if missing else ""))
+
+    def voice_for(self, language: str) -> Optional[str]:
+        """Preselected voice id for a language (default voice if none matched)"""
+        return self.voices.get(language, self.default_voice)
+
+    def activate(self, language: str) -> Optional[str]:
+        """Make the engine speak in language; reconfigures only on an actual switch"""
+        self.stats["activations"] += 1
+        if language != self.active_language:
+            voice_id = self.voice_for(language)
+            if voice_id is not None:
+                self.engine.setProperty('voice', voice_id)
+            self.active_language = language
+            self.stats["switches"] += 1
+        return self.voice_for(language)
+
+    def get_stats(self) -> dict:
+        stats = dict(self.stats)
+        stats["mapped_languages"] = sorted(self.voices)
+        return stats
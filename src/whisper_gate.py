@@ -0,0 +1,125 @@
+"""
+No-speech Gate for Whisper
+Skips the full decode for windows that are clearly silence or noise
+"""
+from collections import deque
+import numpy as np
+from typing import Tuple
+
+from whisper_utils import encode_audio
+
+
+class NoSpeechGate:
+    """
+    Two-stage pre-decode check
+    1. Energy: windows quieter than energy_threshold_db are skipped before encoding
+    2. First decoder step: the no-speech token probability at the SOT position
+       (the same logits Whisper uses for language detection)
+    Whisper itself only treats a window as silent when no_speech_prob is above
+    no_speech_threshold and the decode's avg_logprob is below logprob_threshold.
+    The second half is unknown before decoding, so windows are only skipped
+    early above the much stricter skip_threshold; callers apply the full rule
+    to the decode result with is_silent()
+    """
+
+    def __init__(self, model, energy_threshold_db: float = -50.0, no_speech_threshold: float = 0.6,
+                 logprob_threshold: float = -1.0, skip_threshold: float = 0.95, history_size: int = 1000):
+        self.model = model
+        self.energy_threshold_db = energy_threshold_db
+        self.no_speech_threshold = no_speech_threshold
+        self.logprob_threshold = logprob_threshold
+        self.skip_threshold = skip_threshold
+        self.tokenizer = None
+        self.stats = {"windows": 0, "skipped_energy": 0, "skipped_no_speech": 0, "passed": 0,
+                      "silent_after_decode": 0}
+        self.history = deque(maxlen=history_size)
+
+    def _get_tokenizer(self):
+        if self.tokenizer is None:
+            from whisper.tokenizer import get_tokenizer
+            self.tokenizer = get_tokenizer(
+                self.model.is_multilingual,
+                num_languages=getattr(self.model, "num_languages", 99)
+            )
+        return self.tokenizer
+
+    @staticmethod
+    def energy_db(audio: np.ndarray) -> float:
+        """RMS level in dBFS"""
+        if len(audio) == 0:
+            return -120.0
+        rms = float(np.sqrt(np.mean(np.square(audio, dtype=np.float64))))
+        return 20 * np.log10(max(rms, 1e-6))
+
+    def first_step(self, audio_features) -> Tuple[float, dict]:
+        """
+        Run one decoder step on the SOT token
+        Returns: (no_speech_prob, language probabilities)
+        """
+        import torch
+
+        tokenizer = self._get_tokenizer()
+        tokens = torch.tensor([[tokenizer.sot]], device=audio_features.device)
+        with torch.no_grad():
+            logits = self.model.logits(tokens, audio_features)[0, 0].float()
+
+        probs = logits.softmax(dim=-1)
+        no_speech_prob = float(probs[tokenizer.no_speech])
+
+        language_ids = list(tokenizer.all_language_tokens)
+        language_probs = logits[language_ids].softmax(dim=-1).tolist()
+        languages = dict(zip(tokenizer.all_language_codes, language_probs))
+        return no_speech_prob, languages
+
+    def check(self, audio: np.ndarray) -> dict:
+        """
+        Decide whether a window is worth decoding
+        Args:
+            audio: np.ndarray - float32 mono 16 kHz, at most 30 s
+        Returns:
+            dict with speech (bool), reason, energy_db, no_speech_prob,
+            and for windows that pass: audio_features and language_probs for reuse
+        """
+        self.stats["windows"] += 1
+        decision = {"speech": False, "energy_db": self.energy_db(audio), "no_speech_prob": None}
+
+        if decision["energy_db"] < self.energy_threshold_db:
+            self.stats["skipped_energy"] += 1
+            decision["reason"] = "energy"
+            return self._record(decision)
+
+        features = encode_audio(self.model, audio)
+        no_speech_prob, language_probs = self.first_step(features)
+        decision["no_speech_prob"] = no_speech_prob
+
+        if no_speech_prob > self.skip_threshold:
+            self.stats["skipped_no_speech"] += 1
+            decision["reason"] = "no_speech"
+            return self._record(decision)
+
+        self.stats["passed"] += 1
+        decision.update(speech=True, reason="speech")
+        self._record(decision)
+        decision.update(audio_features=features, language_probs=language_probs)
+        return decision
+
+    def is_silent(self, no_speech_prob: float, avg_logprob: float) -> bool:
+        """
+        Whisper's silence rule, applied after decoding a window that passed check()
+        Returns: bool - True if the decoded text should be discarded
+        """
+        silent = no_speech_prob > self.no_speech_threshold and avg_logprob < self.logprob_threshold
+        if silent:
+            self.stats["silent_after_decode"] += 1
+        return silent
+
+    def _record(self, decision: dict) -> dict:
+        self.history.append(dict(decision))
+        return decision
+
+    def get_stats(self) -> dict:
+        """Skip counts plus the pre-decode skip rate over all checked windows"""
+        stats = dict(self.stats)
+        skipped = stats["skipped_energy"] + stats["skipped_no_speech"]
+        stats["skip_rate"] = skipped / stats["windows"] if stats["windows"] else 0.0
+        return stats
@@ -10,13 +10,25 @@ import numpy as np
 import threading
 import queue
 
+from whisper_streaming import WhisperStreamer
+from whisper_utils import (
+    load_decoding_profile, decode_with_profile, decode_features, load_configured_model, load_whisper_config
+)
+from whisper_gate import NoSpeechGate
+from text_to_speech_simple import SimpleTextToSpeech
+from response_templates import ResponseSpeaker, load_response_settings
+from pcm_io import AudioPlayer
+from echo_gate import EchoGate, load_echo_tail
+
 class WhisperSpeechSystem:
-    def __init__(self):
+    def __init__(self, streaming=False, hop_seconds=1.0):
         self.audio = None
         self.stream = None
         self.is_recording = False
         self.whisper_model = None
-        self.tts_engine = None
+        self.gate = None
+        self.responder = None
+        self.echo_gate = None
         
         # Audio parameters
         self.sample_rate = 16000
@@ -28,6 +40,14 @@ class WhisperSpeechSystem:
         self.audio_buffer = []
         self.buffer_size = self.sample_rate * 5  # 5 seconds
         
+        # Streaming mode: re-decode a rolling window every hop
+        self.streaming = streaming
+        self.hop_seconds = hop_seconds
+        
+        # models.whisper.decoding_profile bounds decode time (e.g. "realtime"); unset keeps Whisper's defaults
+        profile_name = load_whisper_config().get("decoding_profile")
+        self.decoding_profile = load_decoding_profile(profile_name) if profile_name else None
+        
         self._init_components()
     
     def _init_components(self):
@@ -45,28 +65,25 @@ class WhisperSpeechSystem:
         # Initialize Whisper
         try:
             print("🔄 Loading Whisper model (this may take a moment)...")
-            self.whisper_model = whisper.load_model("base")
-            print("✓ Whisper model loaded")
+            self.whisper_model, model_size = load_configured_model()
+            self.gate = NoSpeechGate(self.whisper_model)
+            print(f"✓ Whisper model loaded ({model_size})")
         except Exception as e:
             print(f"⚠️ Whisper initialization failed: {e}")
         
-        # Initialize TTS
-        try:
-            import pyttsx3
-            self.tts_engine = pyttsx3.init()
-            print("✓ TTS engine loaded")
-        except Exception as e:
-            print(f"⚠️ TTS initialization failed: {e}")
+        # Initialize TTS: responses play on a worker thread, with the "I heard:"
+        # prefix pre-rendered so only the transcription is synthesized
+        self.responder = ResponseSpeaker(SimpleTextToSpeech(cache_dir=None), player=AudioPlayer(self.audio),
+                                         **load_response_settings())
+        
+        # Drop mic frames while our own response is playing
+        self.echo_gate = EchoGate(self.responder, tail_seconds=load_echo_tail(), sample_rate=self.sample_rate)
     
-    def speak(self, text):
-        """Speak text"""
-        if self.tts_engine and text:
-            try:
-                print(f"🔊 Speaking: {text}")
-                self.tts_engine.say(text)
-                self.tts_engine.runAndWait()
-            except Exception as e:
-                print(f"TTS error: {e}")
+    def respond(self, text, language="en"):
+        """Queue an "I heard: <text>" response without blocking capture"""
+        if self.responder and text:
+            print(f"🔊 Speaking: {text}")
+            self.responder.speak(text, language)
     
     def process_audio_buffer(self):
         """Process accumulated audio buffer"""
@@ -77,15 +94,24 @@ class WhisperSpeechSystem:
             # Convert buffer to numpy array
             audio_array = np.array(self.audio_buffer, dtype=np.float32)
             
-            # Transcribe with Whisper
-            result = self.whisper_model.transcribe(
-                audio_array,
-                language=None,  # Auto-detect language
-                task="transcribe"
-            )
+            # Skip silence/noise before paying for a full decode
+            decision = self.gate.check(audio_array)
+            if not decision["speech"]:
+                return "", "en"
             
-            transcription = result.get("text", "").strip()
-            language = result.get("language", "en")
+            # Decode from the encoder output the gate already computed
+            probs = decision["language_probs"]
+            language = max(probs, key=probs.get)
+            if self.decoding_profile:
+                result = decode_with_profile(
+                    self.whisper_model, decision["audio_features"], self.decoding_profile, language=language
+                )
+            else:
+                result = decode_features(self.whisper_model, decision["audio_features"], language=language)
+            # Whisper's own silence rule needs the decode's avg_logprob as well
+            if self.gate.is_silent(decision["no_speech_prob"], result.avg_logprob):
+                return "", language
+            transcription = result.text.strip()
             
             if transcription:
                 print(f"🎯 [{language.upper()}] {transcription}")
@@ -103,6 +129,10 @@ class WhisperSpeechSystem:
             print("❌ System not properly initialized")
             return
         
+        if self.streaming:
+            self.run_streaming()
+            return
+        
         print("🎤 Starting Whisper Speech Recognition")
         print("=" * 50)
         print("Press Ctrl+C to stop")
@@ -133,6 +163,8 @@ class WhisperSpeechSystem:
                 try:
                     # Read audio data
                     audio_data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+                    if self.echo_gate.process(audio_data) is None:
+                        continue
                     chunk_count += 1
                     
                     # Convert to float and add to buffer
@@ -155,8 +187,7 @@ class WhisperSpeechSystem:
                             print(f"🎯 SPEECH DETECTED: {transcription}")
                             
                             # Speak response
-                            response = f"I heard: {transcription}"
-                            self.speak(response)
+                            self.respond(transcription, language)
                             
                             last_transcription = transcription
                         else:
@@ -174,11 +205,86 @@ class WhisperSpeechSystem:
         except KeyboardInterrupt:
             print("\n🛑 Stopping system...")
         finally:
+            stats = self.gate.get_stats()
+            print(f"📊 Windows: {stats['windows']}, skipped as silence/noise: "
+                  f"{stats['skipped_energy'] + stats['skipped_no_speech']} ({stats['skip_rate']:.0%}), "
+                  f"silent after decoding: {stats['silent_after_decode']}")
+            self.cleanup()
+    
+    def run_streaming(self):
+        """Run with local-agreement streaming instead of fixed 5 s blocks"""
+        print("🎤 Starting Streaming Whisper Speech Recognition")
+        print("=" * 50)
+        print("Press Ctrl+C to stop")
+        print(f"📊 Re-decoding every {self.hop_seconds:.1f}s, committing agreed words")
+        print()
+        
+        streamer = WhisperStreamer(
+            self.whisper_model,
+            sample_rate=self.sample_rate,
+            hop_seconds=self.hop_seconds
+        )
+        sentence = ""
+        
+        try:
+            self.stream = self.audio.open(
+                format=self.format,
+                channels=self.channels,
+                rate=self.sample_rate,
+                input=True,
+                frames_per_buffer=self.chunk_size
+            )
+            
+            self.is_recording = True
+            print("✓ Recording started")
+            print("🎯 Listening for speech...")
+            
+            while self.is_recording:
+                try:
+                    audio_data = self.stream.read(self.chunk_size, exception_on_overflow=False)
+                    if self.echo_gate.process(audio_data) is None:
+                        continue
+                    audio_array = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
+                    streamer.insert_audio(audio_array)
+                    
+                    if not streamer.ready():
+                        continue
+                    
+                    words = streamer.process_iter()
+                    if not words:
+                        continue
+                    
+                    text = "".join(w[2] for w in words)
+                    print(f"🎯 [{(streamer.language or '?').upper()}] {text.strip()}")
+                    sentence += text
+                    
+                    # Respond once a sentence is complete
+                    if sentence.rstrip().endswith((".", "?", "!")):
+                        self.respond(sentence.strip(), streamer.language or "en")
+                        sentence = ""
+                
+                except Exception as e:
+                    print(f"Audio processing error: {e}")
+                    time.sleep(0.1)
+        
+        except KeyboardInterrupt:
+            print("\n🛑 Stopping system...")
+        finally:
+            remaining = streamer.finish()
+            if remaining:
+                print(f"🎯 {''.join(w[2] for w in remaining).strip()}")
+            
+            stats = streamer.get_stats()
+            if stats["first_word_latency"] is not None:
+                print(f"📊 First-word latency: {stats['first_word_latency']:.2f}s, "
+                      f"median: {stats['median_word_latency']:.2f}s")
             self.cleanup()
     
     def cleanup(self):
         """Clean up resources"""
         self.is_recording = False
+        if self.responder:
+            self.responder.stop()
         if self.stream:
             self.stream.stop_stream()
             self.stream.close()
@@ -188,13 +294,23 @@ class WhisperSpeechSystem:
 
 def main():
     """Main function"""
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Whisper Speech Recognition")
+    parser.add_argument("--streaming", action="store_true",
+                       help="Rolling-window streaming with local-agreement commits")
+    parser.add_argument("--hop", type=float, default=1.0,
+                       help="Seconds of new audio between streaming decodes")
+    
+    args = parser.parse_args()
+    
     print("🚀 Whisper Speech Recognition System")
     print("=" * 40)
     print("This uses OpenAI Whisper for better accuracy")
     print("Speak clearly and wait for processing")
     print()
     
-    system = WhisperSpeechSystem()
+    system = WhisperSpeechSystem(streaming=args.streaming, hop_seconds=args.hop)
     system.run()
 
 if __name__ == "__main__":
@@ -0,0 +1,259 @@
+"""
+Streaming Whisper with Local Agreement
+Re-decodes a short rolling window every hop and commits words once two
+consecutive hypotheses agree on them
+"""
+import time
+import numpy as np
+from typing import List, Optional, Tuple
+
+Word = Tuple[float, float, str]  # (start seconds, end seconds, text)
+
+
+class HypothesisBuffer:
+    """Tracks the uncommitted tail and commits the prefix two hypotheses share"""
+
+    def __init__(self, max_ngram: int = 5):
+        self.committed_until = 0.0
+        self.max_ngram = max_ngram
+        self.last_committed: List[Word] = []  # tail of committed words, for overlap matching
+        self.previous: List[Word] = []
+        self.current: List[Word] = []
+
+    def insert(self, words: List[Word]):
+        """
+        Store a new hypothesis without the words already committed
+        Timestamps drift between decodes, so a short committed word can reappear
+        starting just after committed_until; it is matched by text against the
+        committed tail and dropped
+        """
+        words = [w for w in words if w[0] > self.committed_until - 0.1]
+        if words and self.last_committed and words[0][0] - self.committed_until < 1.0:
+            for n in range(min(len(words), len(self.last_committed), self.max_ngram), 0, -1):
+                tail = [_normalize(w[2]) for w in self.last_committed[-n:]]
+                if [_normalize(w[2]) for w in words[:n]] == tail:
+                    words = words[n:]
+                    break
+        self.current = words
+
+    def flush(self) -> List[Word]:
+        """Commit the longest common prefix of the last two hypotheses"""
+        committed = []
+        for new, old in zip(self.current, self.previous):
+            if _normalize(new[2]) != _normalize(old[2]):
+                break
+            committed.append(new)
+
+        if committed:
+            self.committed_until = committed[-1][1]
+            self.last_committed = (self.last_committed + committed)[-self.max_ngram:]
+        self.previous = self.current[len(committed):]
+        self.current = []
+        return committed
+
+    def pending(self) -> List[Word]:
+        """Words heard but not yet agreed on"""
+        return self.previous
+
+
+def _normalize(word: str) -> str:
+    return word.strip().lower().strip(".,!?;:")
+
+
+class WhisperStreamer:
+    """
+    Incremental Whisper transcription
+    Call insert_audio() with new samples and process_iter() once per hop
+    """
+
+    def __init__(self, model, language: Optional[str] = None, sample_rate: int = 16000,
+                 hop_seconds: float = 1.0, trim_seconds: float = 15.0, max_buffer_seconds: float = 25.0,
+                 prompt_chars: int = 200):
+        self.model = model
+        self.language = language
+        self.sample_rate = sample_rate
+        self.hop_seconds = hop_seconds
+        self.trim_seconds = trim_seconds
+        self.max_buffer_seconds = max_buffer_seconds  # hard cap, below Whisper's 30 s window
+        self.prompt_chars = prompt_chars
+
+        self.audio = np.zeros(0, dtype=np.float32)
+        self.buffer_offset = 0.0  # stream time of audio[0]
+        self.hypothesis = HypothesisBuffer()
+        self.committed: List[Word] = []
+        self._samples_since_decode = 0
+
+        # Latency tracking: (stream time, wall time the audio arrived)
+        self._arrivals: List[Tuple[float, float]] = []
+        self.word_latencies: List[float] = []
+        self.first_word_latency: Optional[float] = None
+        self.decode_times: List[float] = []
+
+    @property
+    def stream_time(self) -> float:
+        return self.buffer_offset + len(self.audio) / self.sample_rate
+
+    def insert_audio(self, audio: np.ndarray):
+        """Append float32 mono samples at the streamer's sample rate"""
+        self.audio = np.concatenate([self.audio, audio.astype(np.float32, copy=False)])
+        self._samples_since_decode += len(audio)
+        self._arrivals.append((self.stream_time, time.perf_counter()))
+
+    def ready(self) -> bool:
+        """True once a full hop of new audio is waiting"""
+        return self._samples_since_decode >= self.hop_seconds * self.sample_rate
+
+    def process_iter(self) -> List[Word]:
+        """
+        Re-decode the buffered window and commit agreed words
+        Returns: newly committed words
+        """
+        self._samples_since_decode = 0
+        if len(self.audio) == 0:
+            return []
+
+        decode_start = time.perf_counter()
+        result = self.model.transcribe(
+            self.audio,
+            language=self.language,
+            initial_prompt=self.prompt(),
+            condition_on_previous_text=False,
+            word_timestamps=True,
+            fp16=False
+        )
+        self.decode_times.append(time.perf_counter() - decode_start)
+        if self.language is None:
+            self.language = result.get("language")
+
+        words = [
+            (self.buffer_offset + w["start"], self.buffer_offset + w["end"], w["word"])
+            for seg in result.get("segments", [])
+            for w in seg.get("words", [])
+        ]
+        self.hypothesis.insert(words)
+        new_words = self.hypothesis.flush()
+        self.committed.extend(new_words)
+        self._record_latency(new_words)
+
+        segment_ends = [self.buffer_offset + seg["end"] for seg in result.get("segments", [])]
+        self._trim_buffer(segment_ends)
+        return new_words
+
+    def finish(self) -> List[Word]:
+        """Flush whatever is still pending at end of stream"""
+        remaining = self.hypothesis.pending()
+        self.committed.extend(remaining)
+        self.hypothesis = HypothesisBuffer()
+        return remaining
+
+    def prompt(self) -> str:
+        """Tail of committed text that is no longer in the audio buffer"""
+        text = "".join(w[2] for w in self.committed if w[1] <= self.buffer_offset)
+        return text[-self.prompt_chars:]
+
+    def text(self) -> str:
+        return "".join(w[2] for w in self.committed).strip()
+
+    def _trim_buffer(self, segment_ends: List[float]):
+        """
+        Cut the buffer at the last completed segment that is fully committed
+        Past max_buffer_seconds (e.g. one long segment) cut at the last committed
+        word instead, or drop the oldest audio if nothing has been committed
+        """
+        buffered = len(self.audio) / self.sample_rate
+        if buffered <= self.trim_seconds:
+            return
+
+        committed_until = self.hypothesis.committed_until
+        cut_points = [t for t in segment_ends[:-1] if t <= committed_until]
+        if cut_points:
+            cut = cut_points[-1]
+        elif buffered <= self.max_buffer_seconds:
+            return
+        elif committed_until > self.buffer_offset:
+            cut = committed_until
+        else:
+            cut = self.stream_time - self.trim_seconds
+            self.hypothesis.committed_until = cut
+            print(f"⚠️ Streaming buffer over {self.max_buffer_seconds:.0f}s with nothing committed, "
+                  f"dropping {cut - self.buffer_offset:.1f}s")
+
+        samples = int((cut - self.buffer_offset) * self.sample_rate)
+        self.audio = self.audio[samples:]
+        self.buffer_offset = cut
+        self._arrivals = [a for a in self._arrivals if a[0] > cut]
+
+    def _record_latency(self, words: List[Word]):
+        """Latency = commit time minus the moment the word's last sample arrived"""
+        now = time.perf_counter()
+        for _, end, _ in words:
+            arrival = next((wall for t, wall in self._arrivals if t >= end), now)
+            latency = now - arrival
+            self.word_latencies.append(latency)
+            if self.first_word_latency is None:
+                self.first_word_latency = latency
+
+    def get_stats(self) -> dict:
+        """Latency summary for committed words, plus decode time per hop"""
+        latencies = sorted(self.word_latencies)
+        return {
+            "committed_words": len(self.committed),
+            "first_word_latency": self.first_word_latency,
+            "median_word_latency": latencies[len(latencies) // 2] if latencies else None,
+            "mean_decode_time": float(np.mean(self.decode_times)) if self.decode_times else None
+        }
+
+
+def replay_file(model, path: str, language: Optional[str] = None, hop_seconds: float = 1.0,
+                sample_rate: int = 16000) -> dict:
+    """
+    Feed an audio file through a WhisperStreamer at real-time pace and
+    report its latency stats (a decode slower than the hop delays later audio)
+    """
+    from whisper_utils import prepare_audio
+    import soundfile as sf
+
+    audio, file_rate = sf.read(path, dtype="float32")
+    audio = prepare_audio(audio, file_rate)
+    streamer = WhisperStreamer(model, language=language, sample_rate=sample_rate, hop_seconds=hop_seconds)
+
+    hop = int(hop_seconds * sample_rate)
+    start = time.perf_counter()
+    for index in range(0, len(audio), hop):
+        due = start + (index + hop) / sample_rate
+        time.sleep(max(0.0, due - time.perf_counter()))
+        streamer.insert_audio(audio[index:index + hop])
+        streamer.process_iter()
+    streamer.finish()
+
+    stats = streamer.get_stats()
+    stats["text"] = streamer.text()
+    return stats
+
+
+def main():
+    """Measure streaming commit latency on a recorded file"""
+    import argparse
+    from whisper_utils import load_configured_model
+
+    parser = argparse.ArgumentParser(description="Streaming Whisper latency benchmark")
+    parser.add_argument("audio", help="Speech recording to replay")
+    parser.add_argument("--model", default=None, help="Whisper size (default: config.yaml)")
+    parser.add_argument("--language", default=None)
+    parser.add_argument("--hop", type=float, default=1.0)
+
+    args = parser.parse_args()
+
+    model, size = load_configured_model(model_size=args.model)
+    print(f"✓ Whisper {size} loaded")
+    stats = replay_file(model, args.audio, language=args.language, hop_seconds=args.hop)
+    print(f"🎯 {stats['text']}")
+    if stats["first_word_latency"] is not None:
+        print(f"📊 First word {stats['first_word_latency']:.2f}s, median word "
+              f"{stats['median_word_latency']:.2f}s over {stats['committed_words']} words")
+        print(f"📊 Decode {stats['mean_decode_time']:.2f}s per {args.hop:.1f}s hop"
+              f"{' (slower than real time)' if stats['mean_decode_time'] > args.hop else ''}")
+
+
+if __name__ == "__main__":
+    main()
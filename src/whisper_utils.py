@@ -0,0 +1,588 @@
+"""
+Shared Whisper helpers
+In-memory audio preparation plus encoder-level detection and decoding
+"""
+import os
+import time
+import json
+import platform
+import numpy as np
+from typing import List, Optional, Sequence
+
+WHISPER_SAMPLE_RATE = 16000
+WHISPER_WINDOW_SECONDS = 30
+
+# Mirrors models.whisper in config.yaml
+DEFAULT_WHISPER_CONFIG = {
+    "model_size": "base",
+    "quantize": False,
+    "rtf_target": 0.5,
+    "calibration_sizes": ["tiny", "base", "small"],
+    "calibration_audio": None,
+    "cache_dir": "models/whisper-int8",
+    "decoding_profile": None
+}
+
+# Named decoding profiles, selected by models.whisper.decoding_profile in config.yaml
+# time_budget: max seconds spent on one 30 s window across temperature fallbacks
+DECODING_PROFILES = {
+    "realtime": {
+        "beam_size": None, "best_of": None, "temperatures": [0.0],
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False, "time_budget": 1.0
+    },
+    "balanced": {
+        "beam_size": 3, "best_of": 3, "temperatures": [0.0, 0.4, 0.8],
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": False, "time_budget": 4.0
+    },
+    "archive": {
+        "beam_size": 5, "best_of": 5, "temperatures": [0.0, 0.2, 0.4, 0.6, 0.8, 1.0],
+        "compression_ratio_threshold": 2.4, "logprob_threshold": -1.0, "no_speech_threshold": 0.6,
+        "condition_on_previous_text": True, "time_budget": 30.0
+    }
+}
+
+
+def resample_audio(audio: np.ndarray, orig_sr: int, target_sr: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Resample a float32 signal in memory
+    Uses torchaudio's windowed-sinc resampler when available, linear interpolation otherwise
+    """
+    if orig_sr == target_sr or len(audio) == 0:
+        return audio
+
+    try:
+        import torch
+        import torchaudio.functional as AF
+        resampled = AF.resample(torch.from_numpy(audio), orig_sr, target_sr)
+        return resampled.numpy().astype(np.float32, copy=False)
+    except ImportError:
+        duration = len(audio) / orig_sr
+        target_len = int(round(duration * target_sr))
+        src_times = np.arange(len(audio)) / orig_sr
+        dst_times = np.arange(target_len) / target_sr
+        return np.interp(dst_times, src_times, audio).astype(np.float32)
+
+
+def prepare_audio(audio_data: np.ndarray, sample_rate: int = WHISPER_SAMPLE_RATE) -> np.ndarray:
+    """
+    Convert any decoded audio array into what Whisper expects
+    Args:
+        audio_data: np.ndarray - samples, (n,) or (n, channels), float or int16
+        sample_rate: int - sample rate of audio_data
+    Returns:
+        np.ndarray - contiguous float32 mono at 16 kHz in [-1, 1]
+    """
+    audio = np.asarray(audio_data)
+
+    if audio.dtype == np.int16:
+        audio = audio.astype(np.float32) / 32768.0
+    else:
+        audio = audio.astype(np.float32, copy=False)
+
+    # Downmix (soundfile returns frames x channels)
+    if audio.ndim > 1:
+        audio = audio.mean(axis=1)
+
+    audio = resample_audio(audio, sample_rate)
+    return np.ascontiguousarray(audio, dtype=np.float32)
+
+
+def encode_audio(model, audio: np.ndarray):
+    """
+    Run only the Whisper encoder on the first 30 s of audio
+    Args:
+        model: loaded whisper model
+        audio: np.ndarray - float32 mono 16 kHz
+    Returns:
+        torch.Tensor - encoder output of shape (1, n_audio_ctx, n_audio_state)
+    """
+    return encode_batch(model, [audio])
+
+
+def encode_batch(model, audios: List[np.ndarray]):
+    """
+    Pad/trim each array to a 30 s window and encode them as one batch
+    Returns: torch.Tensor of shape (len(audios), n_audio_ctx, n_audio_state)
+    """
+    import torch
+    import whisper
+
+    n_mels = getattr(model.dims, "n_mels", 80)
+    mels = torch.stack([
+        whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), n_mels=n_mels)
+        for audio in audios
+    ])
+    dtype = next(model.encoder.parameters()).dtype
+    with torch.no_grad():
+        return model.encoder(mels.to(model.device, dtype))
+
+
+def split_windows(audio: np.ndarray, window_seconds: float = WHISPER_WINDOW_SECONDS) -> List[np.ndarray]:
+    """Split audio into consecutive Whisper-sized windows (last one may be short)"""
+    size = int(window_seconds * WHISPER_SAMPLE_RATE)
+    return [audio[i:i + size] for i in range(0, max(len(audio), 1), size)]
+
+
+def detect_language_probs(model, audio_features) -> dict:
+    """
+    Read language-token probabilities from encoder output (one decoder step)
+    Returns: dict mapping language code to probability, for the first item
+    """
+    _, probs = model.detect_language(audio_features)
+    return probs[0]
+
+
+def decode_features(model, audio_features, language: str = None, task: str = "transcribe"):
+    """
+    Decode a 30 s window from precomputed encoder output (no second encoder pass)
+    Returns: whisper DecodingResult (list of them for batched features)
+    """
+    import torch
+    import whisper
+
+    options = whisper.DecodingOptions(
+        task=task,
+        language=language,
+        fp16=audio_features.dtype == torch.float16
+    )
+    result = whisper.decode(model, audio_features, options)
+    return result[0] if isinstance(result, list) and len(result) == 1 else result
+
+
+def load_whisper_config(config_path: str = "config.yaml") -> dict:
+    """models.whisper section of config.yaml merged over the defaults"""
+    whisper_config = dict(DEFAULT_WHISPER_CONFIG)
+    try:
+        import yaml
+        with open(config_path, 'r') as file:
+            config = yaml.safe_load(file)
+        whisper_config.update(config['models']['whisper'])
+    except Exception:
+        pass
+    return whisper_config
+
+
+def load_decoding_profile(name: str) -> dict:
+    """Copy of a named decoding profile (realtime, balanced or archive)"""
+    if name not in DECODING_PROFILES:
+        raise ValueError(f"Unknown decoding profile: {name} (expected one of {', '.join(DECODING_PROFILES)})")
+    return dict(DECODING_PROFILES[name])
+
+
+def _quantize_int8(model):
+    """int8 dynamic quantization of every Linear layer"""
+    import torch
+
+    # Whisper's Linear subclass only adds dtype casting; quantize_dynamic needs plain nn.Linear
+    for module in model.modules():
+        if isinstance(module, torch.nn.Linear):
+            module.__class__ = torch.nn.Linear
+    model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+    return model.eval()
+
+
+def load_whisper_model(model_size: str = "base", quantize: bool = False,
+                       cache_dir: str = DEFAULT_WHISPER_CONFIG["cache_dir"]):
+    """
+    Load a Whisper model, optionally as an int8 dynamic-quantized CPU model
+    The quantized weights are converted once and cached as a state dict plus a
+    JSON file with the model dimensions; later loads rebuild the architecture
+    and load the weights with torch.load(weights_only=True), so no pickled code runs
+    """
+    import dataclasses
+    import torch
+    import whisper
+    from whisper.model import ModelDimensions, Whisper
+
+    if not quantize:
+        return whisper.load_model(model_size)
+
+    weights_path = os.path.join(cache_dir, f"{model_size}-int8.pt")
+    meta_path = os.path.join(cache_dir, f"{model_size}-int8.json")
+    if os.path.exists(weights_path) and os.path.exists(meta_path):
+        try:
+            with open(meta_path, 'r') as file:
+                meta = json.load(file)
+            model = _quantize_int8(Whisper(ModelDimensions(**meta["dims"])))
+            model.load_state_dict(torch.load(weights_path, map_location="cpu", weights_only=True))
+            if meta.get("alignment_heads") in getattr(whisper, "_ALIGNMENT_HEADS", {}):
+                model.set_alignment_heads(whisper._ALIGNMENT_HEADS[meta["alignment_heads"]])
+            return model
+        except Exception as e:
+            print(f"⚠️ Ignoring int8 cache for {model_size}: {e}")
+
+    model = _quantize_int8(whisper.load_model(model_size, device="cpu"))
+
+    # Atomic writes so a crashed conversion never leaves a truncated cache file
+    os.makedirs(cache_dir, exist_ok=True)
+    temp_path = f"{weights_path}.tmp"
+    torch.save(model.state_dict(), temp_path)
+    os.replace(temp_path, weights_path)
+    temp_path = f"{meta_path}.tmp"
+    with open(temp_path, 'w') as file:
+        json.dump({"dims": dataclasses.asdict(model.dims), "alignment_heads": model_size}, file, indent=2)
+    os.replace(temp_path, meta_path)
+    return model
+
+
+def speech_like_audio(seconds: float = 10.0, sample_rate: int = WHISPER_SAMPLE_RATE, seed: int = 0) -> np.ndarray:
+    """
+    Synthetic babble for RTF calibration when no speech clip is configured
+    Voiced syllables (harmonic source shaped by vowel formants, 3-6 per second)
+    with fricative bursts and pauses; unlike low noise, Whisper treats it as
+    speech and runs its decoder, so the measured RTF is not underestimated
+    """
+    rng = np.random.default_rng(seed)
+    formants = [(730, 1090, 2440), (270, 2290, 3010), (300, 870, 2240), (530, 1840, 2480), (570, 840, 2410)]
+    audio = []
+    total = int(seconds * sample_rate)
+    produced = 0
+
+    while produced < total:
+        if rng.random() < 0.1:
+            pause = np.zeros(int(rng.uniform(0.15, 0.4) * sample_rate), dtype=np.float32)
+            audio.append(pause)
+            produced += len(pause)
+            continue
+
+        if rng.random() < 0.4:
+            burst = rng.standard_normal(int(0.06 * sample_rate))
+            burst = np.diff(burst, prepend=0.0) * np.hanning(len(burst)) * 0.05
+            audio.append(burst.astype(np.float32))
+            produced += len(burst)
+
+        n = int(rng.uniform(0.15, 0.3) * sample_rate)
+        t = np.arange(n) / sample_rate
+        f0 = rng.uniform(100, 200) * (1 + 0.1 * np.linspace(-1, 1, n) * rng.choice([-1, 1]))
+        phase = 2 * np.pi * np.cumsum(f0) / sample_rate
+        vowel = formants[rng.integers(len(formants))]
+        syllable = np.zeros(n)
+        for k in range(1, int(4000 / f0.max()) + 1):
+            freq = k * f0.mean()
+            gain = sum(1.0 / (1 + ((freq - f) / 80.0) ** 2) for f in vowel) / k
+            syllable += gain * np.sin(k * phase)
+        syllable *= np.sin(np.pi * t / t[-1]) ** 2
+        audio.append((0.3 * syllable / max(np.abs(syllable).max(), 1e-6)).astype(np.float32))
+        produced += n
+
+    return np.concatenate(audio)[:total].astype(np.float32)
+
+
+def calibration_input(calibration_audio: Optional[str] = None, seconds: float = 10.0) -> np.ndarray:
+    """Configured speech clip, else espeak-rendered speech, else synthetic babble"""
+    if calibration_audio:
+        import whisper
+        return whisper.load_audio(calibration_audio)
+
+    try:
+        from pcm_io import espeak_to_array
+        text = ("The quick brown fox jumps over the lazy dog while the weather report "
+                "says it will rain tomorrow afternoon, so please remember to bring an umbrella.")
+        result = espeak_to_array(text, "en")
+        if result is not None:
+            audio = prepare_audio(*result)
+            repeats = int(np.ceil(seconds * WHISPER_SAMPLE_RATE / max(len(audio), 1)))
+            return np.tile(audio, repeats)[:int(seconds * WHISPER_SAMPLE_RATE)]
+    except Exception:
+        pass
+    return speech_like_audio(seconds)
+
+
+def measure_rtf(model, audio: np.ndarray, runs: int = 1) -> float:
+    """Real-time factor (processing seconds per audio second) of model.transcribe"""
+    import torch
+
+    with torch.no_grad():
+        model.transcribe(audio[:WHISPER_SAMPLE_RATE], fp16=False)  # warm-up
+        start = time.perf_counter()
+        for _ in range(runs):
+            model.transcribe(audio, fp16=False, temperature=0.0)
+        elapsed = (time.perf_counter() - start) / runs
+    return elapsed / (len(audio) / WHISPER_SAMPLE_RATE)
+
+
+def select_model_size(rtf_target: float = 0.5, sizes: Sequence[str] = ("tiny", "base", "small"),
+                      quantize: bool = True, calibration_audio: Optional[str] = None,
+                      cache_dir: str = DEFAULT_WHISPER_CONFIG["cache_dir"]) -> str:
+    """
+    Pick the largest model size that meets rtf_target on this host
+    Measurements are cached per host in cache_dir/calibration.json
+    Args:
+        rtf_target: float - maximum acceptable real-time factor
+        sizes: model sizes to try, smallest first
+        calibration_audio: optional speech clip; see calibration_input for the fallbacks
+    Returns:
+        str - chosen model size (the smallest one if none meets the target)
+    """
+    calibration_path = os.path.join(cache_dir, "calibration.json")
+    # "speech" marks measurements taken on speech-like input (older noise-based ones are re-run)
+    host_key = f"{platform.node()}-{os.cpu_count()}-{'int8' if quantize else 'fp32'}-speech"
+
+    try:
+        with open(calibration_path, 'r') as file:
+            calibration = json.load(file)
+    except Exception:
+        calibration = {}
+    measured = calibration.setdefault(host_key, {})
+
+    audio = calibration_input(calibration_audio)
+
+    chosen = sizes[0]
+    for size in sizes:
+        if size not in measured:
+            print(f"🔄 Calibrating Whisper {size}{' (int8)' if quantize else ''}...")
+            model = load_whisper_model(size, quantize=quantize, cache_dir=cache_dir)
+            measured[size] = measure_rtf(model, audio)
+            del model
+        print(f"📊 Whisper {size}: RTF {measured[size]:.2f}")
+        if measured[size] > rtf_target:
+            break
+        chosen = size
+
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        with open(calibration_path, 'w') as file:
+            json.dump(calibration, file, indent=2)
+    except Exception as e:
+        print(f"⚠️ Could not save calibration: {e}")
+
+    print(f"✓ Selected Whisper {chosen} (RTF target {rtf_target})")
+    return chosen
+
+
+def load_configured_model(config_path: str = "config.yaml", model_size: Optional[str] = None,
+                          quantize: Optional[bool] = None):
+    """
+    Load the Whisper model described by config.yaml
+    model_size "auto" runs the RTF calibration; explicit arguments override the config
+    Returns: (model, model_size)
+    """
+    config = load_whisper_config(config_path)
+    size = model_size or config["model_size"]
+    use_int8 = config["quantize"] if quantize is None else quantize
+
+    if size == "auto":
+        size = select_model_size(
+            rtf_target=config["rtf_target"],
+            sizes=config["calibration_sizes"],
+            quantize=use_int8,
+            calibration_audio=config["calibration_audio"],
+            cache_dir=config["cache_dir"]
+        )
+    return load_whisper_model(size, quantize=use_int8, cache_dir=config["cache_dir"]), size
+
+
+def transcribe_options(profile: dict) -> dict:
+    """
+    model.transcribe() keyword arguments for a decoding profile
+    transcribe() keeps its own timestamp-based seeking, so the per-window
+    time_budget does not apply; the temperature list still caps the fallbacks
+    """
+    return {
+        "temperature": tuple(profile["temperatures"]),
+        "beam_size": profile["beam_size"],
+        "best_of": profile["best_of"],
+        "compression_ratio_threshold": profile["compression_ratio_threshold"],
+        "logprob_threshold": profile["logprob_threshold"],
+        "no_speech_threshold": profile["no_speech_threshold"],
+        "condition_on_previous_text": profile["condition_on_previous_text"]
+    }
+
+
+def decode_with_profile(model, audio_features, profile: dict, language: Optional[str] = None,
+                        prompt: Optional[str] = None):
+    """
+    Decode one 30 s window with temperature fallback bounded by the profile's time budget
+    Another temperature is only tried if the previous attempt failed the
+    compression/logprob checks and the budget still has room for one more attempt.
+    Returns: whisper DecodingResult (best attempt so far when the budget runs out)
+    """
+    import torch
+    import whisper
+
+    start = time.perf_counter()
+    best = None
+    for temperature in profile["temperatures"]:
+        attempt_start = time.perf_counter()
+        options = whisper.DecodingOptions(
+            language=language,
+            temperature=temperature,
+            beam_size=profile["beam_size"] if temperature == 0 else None,
+            best_of=profile["best_of"] if temperature > 0 else None,
+            prompt=prompt,
+            without_timestamps=True,
+            fp16=audio_features.dtype == torch.float16
+        )
+        result = whisper.decode(model, audio_features, options)
+        result = result[0] if isinstance(result, list) else result
+
+        if best is None or result.avg_logprob > best.avg_logprob:
+            best = result
+
+        too_repetitive = result.compression_ratio > profile["compression_ratio_threshold"]
+        too_unlikely = result.avg_logprob < profile["logprob_threshold"]
+        silent = result.no_speech_prob > profile["no_speech_threshold"] and too_unlikely
+        if silent or not (too_repetitive or too_unlikely):
+            return result
+
+        # Stop if another attempt of the same cost would overrun the budget
+        elapsed = time.perf_counter() - start
+        if elapsed + (time.perf_counter() - attempt_start) > profile["time_budget"]:
+            break
+
+    return best
+
+
+def transcribe_with_profile(model, audio: np.ndarray, profile: dict, language: Optional[str] = None,
+                            gate=None) -> dict:
+    """
+    transcribe()-style result using a decoding profile, one 30 s window at a time
+    With a NoSpeechGate, silent/noise windows are skipped before decoding and
+    speech windows reuse the gate's encoder output
+    Returns: dict with text, language, segments (each with its decode latency)
+    """
+    segments = []
+    prompt = None
+
+    for index, window in enumerate(split_windows(audio)):
+        start = time.perf_counter()
+        segment = {
+            "id": index,
+            "start": index * WHISPER_WINDOW_SECONDS,
+            "end": index * WHISPER_WINDOW_SECONDS + len(window) / WHISPER_SAMPLE_RATE,
+        }
+
+        if gate is not None:
+            decision = gate.check(window)
+            if not decision["speech"]:
+                segment.update(text="", skipped=decision["reason"], no_speech_prob=decision["no_speech_prob"],
+                               latency=time.perf_counter() - start)
+                segments.append(segment)
+                continue
+            features = decision["audio_features"]
+            if language is None:
+                probs = decision["language_probs"]
+                language = max(probs, key=probs.get)
+        else:
+            features = encode_audio(model, window)
+
+        result = decode_with_profile(model, features, profile, language=language, prompt=prompt)
+        latency = time.perf_counter() - start
+
+        if language is None:
+            language = result.language
+        silent = (result.no_speech_prob > profile["no_speech_threshold"]
+                  and result.avg_logprob < profile["logprob_threshold"])
+        text = "" if silent else result.text
+
+        segment.update(
+            text=text,
+            temperature=result.temperature,
+            avg_logprob=result.avg_logprob,
+            compression_ratio=result.compression_ratio,
+            no_speech_prob=result.no_speech_prob,
+            latency=latency
+        )
+        segments.append(segment)
+        if profile["condition_on_previous_text"] and text:
+            prompt = text
+
+    return {
+        "text": " ".join(seg["text"].strip() for seg in segments if seg["text"].strip()),
+        "language": language or "en",
+        "segments": segments
+    }
+
+
+def benchmark_profiles(model, audios, profiles=tuple(DECODING_PROFILES)) -> dict:
+    """
+    Per-segment decode latency for each profile, pooled over all clips
+    (p99 needs many 30 s segments to mean anything, so pass a corpus rather than one file)
+    Returns: dict mapping profile name to p50/p99 seconds
+    """
+    if isinstance(audios, np.ndarray):
+        audios = [audios]
+    stats = {}
+    for name in profiles:
+        profile = load_decoding_profile(name)
+        latencies = sorted(
+            seg["latency"]
+            for audio in audios
+            for seg in transcribe_with_profile(model, audio, profile)["segments"]
+        )
+        stats[name] = {
+            "segments": len(latencies),
+            "p50": float(np.percentile(latencies, 50)),
+            "p99": float(np.percentile(latencies, 99))
+        }
+    return stats
+
+
+def benchmark_io_overhead(seconds: float = 5.0, runs: int = 20, sample_rate: int = 44100) -> dict:
+    """
+    Measure the per-call cost the temporary WAV round trip used to add
+    Compares sf.write + whisper.load_audio (ffmpeg decode) against prepare_audio
+    Returns: dict with mean milliseconds per call for each path
+    """
+    import os
+    import tempfile
+    import soundfile as sf
+    import whisper
+
+    audio = (0.1 * np.random.randn(int(seconds * sample_rate))).astype(np.float32)
+    temp_path = os.path.join(tempfile.gettempdir(), "whisper_bench.wav")
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        sf.write(temp_path, audio, sample_rate)
+        whisper.load_audio(temp_path)
+        os.remove(temp_path)
+    file_ms = (time.perf_counter() - start) * 1000 / runs
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        prepare_audio(audio, sample_rate)
+    memory_ms = (time.perf_counter() - start) * 1000 / runs
+
+    return {
+        "audio_seconds": seconds,
+        "temp_file_ms": file_ms,
+        "in_memory_ms": memory_ms,
+        "saved_ms": file_ms - memory_ms
+    }
+
+
+def main():
+    """Run Whisper helper benchmarks"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Whisper helper benchmarks")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio length per call")
+    parser.add_argument("--runs", type=int, default=20, help="Calls to average over")
+    parser.add_argument("--sample-rate", type=int, default=44100, help="Input sample rate")
+    parser.add_argument("--profiles", type=str, nargs="+",
+                        help="Audio files to measure decoding profile p50/p99 latency on")
+    parser.add_argument("--model", type=str, default=None, help="Whisper model size for --profiles (default: config)")
+
+    args = parser.parse_args()
+
+    if args.profiles:
+        import whisper
+        model, size = load_configured_model(model_size=args.model)
+        audios = [whisper.load_audio(path) for path in args.profiles]
+        print(f"🔄 Whisper {size}, {sum(len(a) for a in audios) / WHISPER_SAMPLE_RATE:.0f}s of audio")
+        for name, stats in benchmark_profiles(model, audios).items():
+            print(f"📊 {name:<9} p50 {stats['p50']:.2f}s  p99 {stats['p99']:.2f}s  "
+                  f"({stats['segments']} segments)")
+        return
+
+    result = benchmark_io_overhead(args.seconds, args.runs, args.sample_rate)
+    print(f"📊 Temp WAV + ffmpeg decode: {result['temp_file_ms']:.1f} ms/call")
+    print(f"📊 In-memory preparation:    {result['in_memory_ms']:.1f} ms/call")
+    print(f"✓ Saved per call: {result['saved_ms']:.1f} ms ({result['audio_seconds']:.1f}s audio)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Tests for self-echo suppression
+"""
+import sys
+import time
+
+# Add src to path
+sys.path.append('src')
+
+from echo_gate import EchoGate
+
+
+class Playback:
+    """Stand-in for a TTS worker's playback state"""
+
+    def __init__(self):
+        self.is_speaking = False
+        self.last_spoken_end = 0.0
+
+
+FRAME = b"\x01\x00" * 1600
+
+
+def test_frames_pass_before_any_playback():
+    gate = EchoGate(Playback(), tail_seconds=0.2)
+    assert gate.process(FRAME) == FRAME
+
+
+def test_frames_dropped_while_speaking_and_during_tail():
+    playback = Playback()
+    gate = EchoGate(playback, tail_seconds=0.2)
+
+    playback.is_speaking = True
+    assert gate.process(FRAME) is None
+
+    playback.is_speaking = False
+    playback.last_spoken_end = time.perf_counter()
+    assert gate.process(FRAME) is None
+
+    playback.last_spoken_end = time.perf_counter() - 0.3
+    assert gate.process(FRAME) == FRAME
+
+    stats = gate.get_stats()
+    assert stats["discarded_frames"] == 2
+    assert abs(stats["discarded_seconds"] - 0.2) < 1e-9
@@ -0,0 +1,58 @@
+"""
+Tests for text/acoustic language fusion
+"""
+import sys
+
+# Add src to path
+sys.path.append('src')
+
+from language_fusion import LanguageFusion
+from language_detector_simple import SimpleLanguageDetector
+
+
+class FixedAcousticDetector:
+    """Acoustic detector stand-in that always reports the same language"""
+
+    def __init__(self, language, confidence):
+        self.result = (language, confidence)
+        self.calls = 0
+
+    def detect_language(self, audio_tensor, features=None):
+        self.calls += 1
+        return self.result
+
+
+def test_decisive_text_cannot_skip_ecapa_forever():
+    """A recognizer that only writes Devanagari must not lock out the acoustic pass"""
+    acoustic = FixedAcousticDetector("en", 0.6)
+    fusion = LanguageFusion(acoustic, max_consecutive_skips=2)
+
+    for _ in range(9):
+        fusion.detect_acoustic(None)
+        fusion.update_text("यह एक परीक्षण वाक्य है और कुछ नहीं")
+
+    stats = fusion.get_stats()
+    assert acoustic.calls == 3
+    assert stats["ecapa_skipped"] == 6
+    assert stats["ecapa_forced"] == 2
+
+
+def test_confident_acoustic_overrules_script_of_other_language():
+    """After a forced acoustic pass the system can switch back"""
+    fusion = LanguageFusion(FixedAcousticDetector("en", 0.95), max_consecutive_skips=1)
+
+    fusion.detect_acoustic(None)
+    language, _ = fusion.update_text("यह एक परीक्षण वाक्य है")
+    assert language == "en"
+
+
+def test_latin_text_scores_by_whole_words():
+    """Substrings like "el" in "hello" must not count as Spanish"""
+    detector = SimpleLanguageDetector()
+
+    language, confidence = detector._detect_from_text("hello how are you doing today")
+    assert language == "en" and confidence >= 0.9
+
+    assert detector._detect_from_text("hola como estas, estoy muy bien")[0] == "es"
+    assert detector._detect_from_text("je ne sais pas ce que tu veux")[0] == "fr"
+    assert detector._detect_from_text("ich habe das nicht gesehen")[0] == "de"
@@ -0,0 +1,48 @@
+"""
+Tests for template splicing of spoken responses
+"""
+import sys
+import numpy as np
+
+# Add src to path
+sys.path.append('src')
+
+from response_templates import ResponseRenderer, crossfade
+
+
+class ConstantTTS:
+    """Each text renders as a constant tone whose length and level depend on the text"""
+
+    def __init__(self):
+        self.calls = []
+
+    def synthesize_to_array(self, text, language="en", dtype="float32"):
+        self.calls.append(text)
+        return np.full(100 * len(text), 0.1 * len(text.split()), dtype=np.float32), 1000
+
+
+def test_static_part_is_rendered_once():
+    tts = ConstantTTS()
+    renderer = ResponseRenderer(tts, templates={"heard": {"en": "I heard: {text}"}}, crossfade_ms=0)
+    renderer.prerender(["en"])
+    renderer.render("heard", "en", text="one")
+    renderer.render("heard", "en", text="two")
+    assert tts.calls == ["I heard:", "one", "two"]
+
+
+def test_render_crossfades_static_and_slot():
+    tts = ConstantTTS()
+    renderer = ResponseRenderer(tts, templates={"heard": {"en": "I heard: {text}"}}, crossfade_ms=10)
+    pcm, sample_rate = renderer.render("heard", "en", text="good morning")
+
+    static, _ = tts.synthesize_to_array("I heard:")
+    slot, _ = tts.synthesize_to_array("good morning")
+    assert sample_rate == 1000
+    np.testing.assert_allclose(pcm, crossfade(static, slot, 10), atol=1e-6)
+    assert len(pcm) == len(static) + len(slot) - 10
+
+
+def test_unknown_language_falls_back_to_english_template():
+    renderer = ResponseRenderer(ConstantTTS(), templates={"heard": {"en": "I heard: {text}"}}, crossfade_ms=0)
+    pcm, _ = renderer.render("heard", "xx", text="hi")
+    assert len(pcm) == len("I heard:") * 100 + len("hi") * 100
@@ -0,0 +1,32 @@
+"""
+Tests for sentence/clause splitting ahead of streamed synthesis
+"""
+import sys
+import pytest
+
+# Add src to path
+sys.path.append('src')
+
+pytest.importorskip("TTS")
+from text_to_speech import split_text
+
+
+def test_sentences_become_separate_chunks():
+    assert split_text("Hello there. How are you? Fine!") == ["Hello there.", "How are you?", "Fine!"]
+
+
+def test_first_chunk_is_kept_short():
+    """Long opening sentences break at a clause so playback can start early"""
+    text = "When the meeting finally started, everyone had already read the report, " \
+           "so the discussion moved quickly to the budget."
+    chunks = split_text(text, max_chars=150, first_chars=40)
+    assert len(chunks[0]) <= 40
+    assert " ".join(chunks) == text
+
+
+def test_devanagari_danda_ends_a_sentence():
+    assert split_text("मैं ठीक हूँ। आप कैसे हैं?") == ["मैं ठीक हूँ।", "आप कैसे हैं?"]
+
+
+def test_empty_text_gives_no_chunks():
+    assert split_text("   ") == []
@@ -0,0 +1,40 @@
+"""
+Tests for the disk-backed synthesis cache
+"""
+import os
+import sys
+
+# Add src to path
+sys.path.append('src')
+
+from tts_cache import SynthesisCache
+
+
+def test_least_recently_used_entry_is_evicted(tmp_path):
+    """A hit refreshes an entry, so the untouched one goes first"""
+    cache = SynthesisCache(str(tmp_path), max_bytes=2500)
+    cache.put("a", b"x" * 1000)
+    cache.put("b", b"x" * 1000)
+    assert cache.get("a") is not None
+
+    cache.put("c", b"x" * 1000)
+    assert sorted(os.listdir(tmp_path)) == ["a.wav", "c.wav"]
+    assert cache.get("b") is None
+    assert cache.get_stats()["evictions"] == 1
+
+
+def test_budget_covers_files_from_other_processes(tmp_path):
+    """Two caches on one directory (batch workers) share a single disk budget"""
+    first = SynthesisCache(str(tmp_path), max_bytes=2500)
+    second = SynthesisCache(str(tmp_path), max_bytes=2500)
+    first.put("a", b"x" * 1000)
+    first.put("b", b"x" * 1000)
+
+    second.put("c", b"x" * 1000)
+    assert len(os.listdir(tmp_path)) == 2
+    assert "c.wav" in os.listdir(tmp_path)
+
+
+def test_key_ignores_whitespace_but_not_language():
+    assert SynthesisCache.make_key("hello  world ", "en") == SynthesisCache.make_key("hello world", "en")
+    assert SynthesisCache.make_key("hello", "en") != SynthesisCache.make_key("hello", "es")
@@ -0,0 +1,108 @@
+"""
+Tests for the prioritized TTS worker
+"""
+import sys
+import threading
+
+# Add src to path
+sys.path.append('src')
+
+from tts_worker import TTSWorker, PRIORITY_HIGH, PRIORITY_NORMAL, PRIORITY_LOW
+
+
+class BlockingEngine:
+    """speak_fn stand-in: records texts, holds "block" until released, stops on request"""
+
+    def __init__(self):
+        self.spoken = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.stopped = threading.Event()
+
+    def speak(self, _engine, text, language):
+        self.spoken.append(text)
+        if text == "block":
+            self.started.set()
+            self.release.wait(5)
+        elif text == "long":
+            self.started.set()
+            self.stopped.wait(5)
+
+    def stop(self, _engine):
+        self.stopped.set()
+
+
+def _worker(engine):
+    worker = TTSWorker(engine_factory=None, speak_fn=engine.speak, stop_fn=engine.stop)
+    assert worker.start()
+    return worker
+
+
+def _statuses():
+    statuses = {}
+
+    def on_done(utterance, status):
+        statuses[utterance.text] = status
+    return statuses, on_done
+
+
+def test_higher_priority_is_spoken_first():
+    """Utterances queued behind a busy worker come out by priority, not arrival"""
+    engine = BlockingEngine()
+    worker = _worker(engine)
+    worker.speak("block")
+    assert engine.started.wait(5)
+
+    worker.speak("low", priority=PRIORITY_LOW)
+    worker.speak("normal", priority=PRIORITY_NORMAL)
+    worker.speak("high", priority=PRIORITY_HIGH)
+    engine.release.set()
+
+    assert worker.call("last", priority=PRIORITY_LOW + 1) == "done"
+    assert engine.spoken == ["block", "high", "normal", "low", "last"]
+    worker.stop()
+
+
+def test_cancel_skips_a_queued_utterance():
+    engine = BlockingEngine()
+    worker = _worker(engine)
+    statuses, on_done = _statuses()
+    worker.speak("block")
+    assert engine.started.wait(5)
+
+    dropped = worker.speak("dropped", on_done=on_done)
+    worker.speak("kept", on_done=on_done)
+    worker.cancel(dropped)
+    engine.release.set()
+
+    assert worker.call("last") == "done"
+    assert statuses == {"dropped": "cancelled", "kept": "done"}
+    assert "dropped" not in engine.spoken
+    worker.stop()
+
+
+def test_barge_in_interrupts_current_and_clears_queue():
+    engine = BlockingEngine()
+    worker = _worker(engine)
+    statuses, on_done = _statuses()
+    worker.speak("long", on_done=on_done)
+    assert engine.started.wait(5)
+    worker.speak("queued", on_done=on_done)
+
+    worker.barge_in()
+    assert worker.call("after", timeout=5) == "done"
+    assert statuses == {"long": "interrupted", "queued": "cancelled"}
+    assert engine.spoken == ["long", "after"]
+    worker.stop()
+
+
+def test_call_times_out_instead_of_hanging():
+    engine = BlockingEngine()
+    worker = _worker(engine)
+    worker.speak("block")
+    assert engine.started.wait(5)
+
+    assert worker.call("waits", timeout=0.2) == "error"
+    engine.release.set()
+    worker.stop()
+    assert worker.call("stopped") == "error"
@@ -0,0 +1,35 @@
+"""
+Tests for local-agreement commits in streaming Whisper
+"""
+import sys
+
+# Add src to path
+sys.path.append('src')
+
+from whisper_streaming import HypothesisBuffer
+
+
+def test_words_commit_once_two_hypotheses_agree():
+    buffer = HypothesisBuffer()
+    buffer.insert([(0.0, 0.4, "hello"), (0.4, 0.9, "word")])
+    assert buffer.flush() == []
+
+    buffer.insert([(0.0, 0.4, "Hello,"), (0.4, 0.9, "world"), (0.9, 1.3, "again")])
+    committed = buffer.flush()
+    assert [w[2] for w in committed] == ["Hello,"]
+    assert buffer.committed_until == 0.4
+    assert [w[2] for w in buffer.pending()] == ["world", "again"]
+
+
+def test_committed_word_repeated_after_drift_is_dropped():
+    """Timestamps shift between decodes; a re-decoded committed word must not commit twice"""
+    buffer = HypothesisBuffer()
+    buffer.insert([(0.0, 0.5, "good"), (0.5, 1.0, "morning")])
+    buffer.flush()
+    buffer.insert([(0.0, 0.5, "good"), (0.5, 1.0, "morning")])
+    assert [w[2] for w in buffer.flush()] == ["good", "morning"]
+
+    buffer.insert([(0.95, 1.2, "morning"), (1.2, 1.6, "everyone")])
+    assert buffer.flush() == []
+    buffer.insert([(1.2, 1.6, "everyone")])
+    assert [w[2] for w in buffer.flush()] == ["everyone"]